@@ -1,5 +1,6 @@
 """FastAPI application for the chatbot."""
 import os # Necesario para getenv
+import asyncio
 import logging # Necesario para configurar logging
 import time
 from fastapi import FastAPI, Request
@@ -13,6 +14,8 @@ from ..rag.retrieval.retriever import RAGRetriever
 # Asegurarse de que la ruta de importación es correcta después de mover pdf_utils.py
 # from ..utils.pdf_utils import PDFProcessor # Ruta antigua
 from ..file_system.pdf_file_manager import PDFFileManager # Nueva ruta y nombre
+from ..database.client_registry import mongo_registry
+from .startup import StartupTracker
 
 # --- Importar Routers --- 
 # Ajusta estas rutas si la estructura de tus routers es diferente.
@@ -25,55 +28,74 @@ from .routes.chat.chat_routes import router as chat_router
 
 # Dependencias para inicializar managers (ejemplo, deben ajustarse a la refactorización previa)
 from ..bot import Bot
-from ..memory import MemoryTypes, MEM_TO_CLASS # Para configurar el Bot con memoria
-from ..rag.pdf_processor.pdf_loader import PDFContentLoader
+from ..memory import ConversationLog, MemoryTypes, MEM_TO_CLASS, create_hot_session_cache # Para configurar el Bot con memoria
+from ..database.mongodb import MongodbClient
+from ..rag.pdf_processor.pdf_loader import ChunkingModes, PDFContentLoader
+from ..rag.pdf_processor.token_counter import TokenCounter
+from ..rag.pdf_processor.page_cache import ParsedPageCache
 from ..rag.embeddings.embedding_manager import EmbeddingManager
 # Asumiendo que VectorStore es la clase base o una específica como ChromaVectorStore
 from ..rag.vector_store.vector_store import VectorStore # Asumiendo que es ChromaVectorStore o similar
 from ..rag.ingestion.ingestor import RAGIngestor
+from ..rag.ingestion.manifest import IngestionManifest
+from ..rag.ingestion.job_queue import IngestionJobQueue
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan context manager for setup and teardown."""
     logger = logging.getLogger(__name__)
     logger.info("Iniciando aplicación y configurando recursos...")
+    startup = StartupTracker()
+    app.state.startup = startup
     
     try:
         s = get_settings()
         app.state.settings = s
 
-        # Inicializar componentes
-        app.state.pdf_file_manager = PDFFileManager(base_dir=Path(s.base_data_dir).resolve() if s.base_data_dir else None)
-        logger.info(f"PDFFileManager inicializado. Directorio de PDFs: {app.state.pdf_file_manager.pdf_dir}")
-
-        app.state.pdf_content_loader = PDFContentLoader(chunk_size=s.chunk_size, chunk_overlap=s.chunk_overlap)
-        logger.info(f"PDFContentLoader inicializado con chunk_size={s.chunk_size}, overlap={s.chunk_overlap}")
+        # Cliente MongoDB compartido por ChatManager y las memorias (un solo pool por proceso)
+        app.state.mongo_registry = mongo_registry
+        startup.run("mongo_client", mongo_registry.get_client, s)
 
-        app.state.embedding_manager = EmbeddingManager(model_name=s.embedding_model)
-        logger.info(f"EmbeddingManager inicializado con modelo: {s.embedding_model}")
+        # El modelo de embeddings no se carga aquí: se calienta en segundo plano al final
+        app.state.embedding_manager = startup.run("embedding_manager", EmbeddingManager, model_name=s.embedding_model)
+        logger.info(f"EmbeddingManager creado con modelo: {s.embedding_model} (carga diferida)")
 
+        token_counter = TokenCounter(
+            tokenizer_provider=app.state.embedding_manager.get_tokenizer,
+            max_seq_length_provider=app.state.embedding_manager.get_max_seq_length
+        )
+        token_mode = s.chunking_mode == ChunkingModes.TOKENS.value
         vector_store_path = Path(s.vector_store_path).resolve()
         vector_store_path.mkdir(parents=True, exist_ok=True)
-        app.state.vector_store = VectorStore(
-            persist_directory=str(vector_store_path),
-            embedding_function=app.state.embedding_manager
-        )
-        logger.info(f"VectorStore inicializado en: {vector_store_path}")
 
-        app.state.rag_ingestor = RAGIngestor(
-            pdf_file_manager=app.state.pdf_file_manager,
-            pdf_content_loader=app.state.pdf_content_loader,
-            embedding_manager=app.state.embedding_manager,
-            vector_store=app.state.vector_store
-        )
-        logger.info("RAGIngestor inicializado.")
-
-        app.state.rag_retriever = RAGRetriever(
-            vector_store=app.state.vector_store,
-            embedding_manager=app.state.embedding_manager
-        )
-        logger.info("RAGRetriever inicializado.")
+        # Componentes independientes (disco, Chroma, SQLite, Redis) en paralelo
+        parallel_components = {
+            "pdf_file_manager": startup.run_in_thread(
+                "pdf_file_manager", PDFFileManager,
+                base_dir=Path(s.base_data_dir).resolve() if s.base_data_dir else None
+            ),
+            "pdf_content_loader": startup.run_in_thread(
+                "pdf_content_loader", PDFContentLoader,
+                chunk_size=s.chunk_token_budget if token_mode else s.chunk_size,
+                chunk_overlap=s.chunk_token_overlap if token_mode else s.chunk_overlap,
+                min_chunk_length=s.min_chunk_length,
+                extractor_type=s.pdf_extractor,
+                page_cache=ParsedPageCache(Path(s.page_cache_dir).resolve()) if s.enable_page_cache else None,
+                chunking_mode=s.chunking_mode,
+                token_counter=token_counter
+            ),
+            "vector_store": startup.run_in_thread(
+                "vector_store", VectorStore,
+                persist_directory=str(vector_store_path),
+                embedding_function=app.state.embedding_manager
+            ),
+            "ingestion_manifest": startup.run_in_thread(
+                "ingestion_manifest", IngestionManifest, Path(s.ingestion_manifest_path).resolve()
+            ),
+        }
+        pending_components = {name: asyncio.create_task(coro) for name, coro in parallel_components.items()}
 
+        # Mientras tanto, el Bot se crea en el event loop (sus clientes de Mongo se asocian a él)
         bot_memory_type = MemoryTypes.BASE_MEMORY
         if s.memory_type:
             try:
@@ -81,19 +103,94 @@ async def lifespan(app: FastAPI):
             except KeyError:
                 logger.warning(f"Tipo de memoria '{s.memory_type}' no válido en settings. Usando BASE_MEMORY.")
 
-        app.state.bot_instance = Bot(
+        # Registro de conversaciones único: la memoria del Bot y ChatManager leen y escriben en él
+        app.state.conversation_log = ConversationLog(
+            MongodbClient(s),
+            window_size=s.chat_history_window,
+            ttl_seconds=s.memory_session_ttl,
+            max_sessions=s.memory_max_sessions,
+            hot_cache=create_hot_session_cache(s, window_size=s.chat_history_window)
+        )
+
+        app.state.bot_instance = startup.run(
+            "bot", Bot,
             settings=settings,
             memory_type=bot_memory_type,
-            memory_kwargs={"conversation_id": "default_session"},
+            memory_kwargs={
+                "conversation_id": "default_session",
+                "conversation_log": app.state.conversation_log,
+                "embedding_manager": app.state.embedding_manager  # Memoria a largo plazo (long-term-memory)
+            },
             cache=None
         )
         logger.info(f"Instancia de Bot creada con tipo de memoria: {bot_memory_type}")
 
-        app.state.chat_manager = ChatManager(
+        await asyncio.gather(*pending_components.values())
+        for name, task in pending_components.items():
+            setattr(app.state, name, task.result())
+        logger.info(f"PDFFileManager inicializado. Directorio de PDFs: {app.state.pdf_file_manager.pdf_dir}")
+        logger.info(f"PDFContentLoader inicializado con chunking_mode={s.chunking_mode}, extractor={s.pdf_extractor}")
+        logger.info(f"VectorStore inicializado en: {vector_store_path}")
+        logger.info(f"IngestionManifest inicializado en: {app.state.ingestion_manifest.db_path}")
+
+        app.state.rag_ingestor = startup.run(
+            "rag_ingestor", RAGIngestor,
+            pdf_file_manager=app.state.pdf_file_manager,
+            pdf_content_loader=app.state.pdf_content_loader,
+            embedding_manager=app.state.embedding_manager,
+            vector_store=app.state.vector_store,
+            manifest=app.state.ingestion_manifest
+        )
+        logger.info("RAGIngestor inicializado.")
+
+        app.state.ingestion_queue = IngestionJobQueue(
+            rag_ingestor=app.state.rag_ingestor,
+            db_path=Path(s.ingestion_jobs_path).resolve(),
+            max_workers=s.ingestion_max_workers,
+            max_attempts=s.ingestion_max_attempts
+        )
+        # La cola arranca (y reanuda los trabajos pendientes) al terminar el warmup de embeddings
+
+        app.state.rag_retriever = startup.run(
+            "rag_retriever", RAGRetriever,
+            vector_store=app.state.vector_store,
+            embedding_manager=app.state.embedding_manager
+        )
+        logger.info("RAGRetriever inicializado.")
+
+        app.state.chat_manager = startup.run(
+            "chat_manager", ChatManager,
             bot_instance=app.state.bot_instance,
-            rag_retriever_instance=app.state.rag_retriever
+            rag_retriever_instance=app.state.rag_retriever,
+            conversation_log=app.state.conversation_log
         )
         logger.info("ChatManager inicializado.")
+        await app.state.chat_manager.db.ensure_indexes()
+
+        # Cargar el modelo de embeddings y calentarlo en segundo plano (incluye el ajuste
+        # de hilos): la app responde ya, pero /ready no indica "listo" hasta que termine
+        def warm_up_embeddings():
+            if not s.embedding_warmup_enabled:
+                app.state.embedding_manager.load()
+                app.state.embedding_manager.embed_query("Documento de inicialización del sistema")
+                return
+            report = app.state.embedding_manager.warmup()
+            startup.record("embedding_model", warmup=report)
+            logger.info(
+                f"Warmup de embeddings: {report['num_threads']} hilos, "
+                f"consulta {report['query_latency_ms']:.1f} ms, latencias {report['latency_ms']}"
+            )
+
+        startup.start_background("embedding_model", warm_up_embeddings)
+
+        # Sin ingestas compitiendo por la CPU durante el warmup: el ajuste de hilos mide
+        # el modelo solo y los trabajos no pagan la inicialización perezosa
+        async def start_ingestion_queue():
+            await app.state.ingestion_queue.start()
+            logger.info(f"Cola de ingesta iniciada con {s.ingestion_max_workers} workers.")
+
+        startup.start_background("ingestion_queue", start_ingestion_queue, after="embedding_model")
+        startup.finish_setup()
 
         logger.info("Todos los managers y procesadores inicializados y disponibles en app.state.")
 
@@ -105,6 +202,14 @@ async def lifespan(app: FastAPI):
     
     logger.info("Cerrando aplicación y liberando recursos...")
     try:
+        # Cancelar el calentamiento si sigue en curso
+        await startup.close()
+
+        # Detener la cola de ingesta (los trabajos en curso se reanudan al reiniciar)
+        if hasattr(app.state, 'ingestion_queue'):
+            await app.state.ingestion_queue.close()
+            logger.info("Cola de ingesta detenida.")
+
         # Cerrar ChatManager
         if hasattr(app.state, 'chat_manager'):
             if hasattr(app.state.chat_manager, 'close'):
@@ -114,6 +219,9 @@ async def lifespan(app: FastAPI):
                     app.state.chat_manager.close()
             logger.info("ChatManager cerrado.")
 
+        # Cerrar el cliente MongoDB compartido (después de ChatManager y el Bot)
+        mongo_registry.close()
+
         # Cerrar VectorStore
         if hasattr(app.state, 'vector_store'):
             if hasattr(app.state.vector_store, 'close'):
@@ -132,6 +240,11 @@ async def lifespan(app: FastAPI):
                     app.state.embedding_manager.close()
             logger.info("EmbeddingManager cerrado.")
 
+        # Cerrar manifiesto de ingesta
+        if hasattr(app.state, 'ingestion_manifest'):
+            app.state.ingestion_manifest.close()
+            logger.info("IngestionManifest cerrado.")
+
     except Exception as e:
         logger.error(f"Error durante la limpieza de recursos: {e}", exc_info=True)
     finally:
@@ -1,11 +1,40 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Request, Response, status
 
 # Importar modelo Pydantic
-from .schemas import HealthResponse
+from .schemas import DatabaseHealthResponse, HealthResponse, ReadinessResponse
+from ..database.client_registry import mongo_registry
 
 router = APIRouter()
 
 @router.get("/health", status_code=status.HTTP_200_OK, response_model=HealthResponse)
 async def health_check():
     """Health check endpoint for the API."""
-    return HealthResponse(status="healthy", service="chatbot-backend") 
\ No newline at end of file
+    return HealthResponse(status="healthy", service="chatbot-backend")
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness_check(request: Request, response: Response):
+    """Readiness: 200 solo cuando los componentes críticos (incluido el modelo de embeddings) están listos."""
+    startup = getattr(request.app.state, "startup", None)
+    if startup is None:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return ReadinessResponse(status="starting", ready=False)
+    report = startup.report()
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return ReadinessResponse(status="ready" if report["ready"] else "starting", **report)
+
+@router.get("/health/database", response_model=DatabaseHealthResponse)
+async def database_health_check(request: Request, response: Response):
+    """Ping a MongoDB con el cliente compartido, estadísticas de su pool y de la caché de sesiones activas."""
+    conversation_log = getattr(request.app.state, "conversation_log", None)
+    log_stats = conversation_log.get_stats() if conversation_log is not None else {}
+    try:
+        ping_ms = await mongo_registry.ping()
+    except Exception as e:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return DatabaseHealthResponse(
+            status="unavailable", pool=mongo_registry.get_stats(), conversation_log=log_stats, error=str(e)
+        )
+    return DatabaseHealthResponse(
+        status="healthy", ping_ms=round(ping_ms, 2), pool=mongo_registry.get_stats(), conversation_log=log_stats
+    )
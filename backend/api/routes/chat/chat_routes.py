@@ -110,11 +110,11 @@ async def clear_history(request: Request, conversation_id: str):
     """Endpoint para limpiar el historial de una conversación."""
     chat_manager = request.app.state.chat_manager
     try:
-        if hasattr(chat_manager, 'db') and hasattr(chat_manager.db, 'clear_conversation'):
-            await chat_manager.db.clear_conversation(conversation_id)
+        if hasattr(chat_manager, 'clear_history'):
+            await chat_manager.clear_history(conversation_id)
             return ClearHistoryResponse(message="Historial limpiado exitosamente")
         else:
-            logger.error("Error: chat_manager.db o clear_conversation no están disponibles.")
+            logger.error("Error: chat_manager.clear_history no está disponible.")
             raise HTTPException(status_code=500, detail="Error interno del servidor: Configuración de base de datos incorrecta.")
     except Exception as e:
         logger.error(f"Error al limpiar historial '{conversation_id}': {str(e)}", exc_info=True)
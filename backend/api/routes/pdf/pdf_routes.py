@@ -9,7 +9,8 @@ from .schemas import ( # Cambio aquí: ...schemas -> .schemas
     PDFListResponse, 
     PDFUploadResponse, 
     PDFDeleteResponse,
-    PDFListItem
+    PDFListItem,
+    IngestionJobResponse
 )
 
 # Remove Pydantic v1
@@ -41,12 +42,11 @@ router = APIRouter(tags=["PDFs"])
 # @rate_limit(max_requests=10, window_seconds=60) # Comentado temporalmente
 async def upload_pdf(
     request: Request,
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
 ):
     """Endpoint para subir y procesar PDFs de forma asíncrona."""
     pdf_file_manager = request.app.state.pdf_file_manager
-    rag_ingestor = request.app.state.rag_ingestor
+    ingestion_queue = request.app.state.ingestion_queue
     
     try:
         # Validar tamaño del archivo
@@ -64,8 +64,8 @@ async def upload_pdf(
         # Guardar archivo
         file_path = await pdf_file_manager.save_pdf(file)
         
-        # Procesar PDF en segundo plano
-        background_tasks.add_task(rag_ingestor.ingest_single_pdf, file_path)
+        # Encolar la ingesta en la cola persistente de trabajos
+        job = await ingestion_queue.submit(file_path)
         
         # Listar PDFs actualizados
         pdfs_in_dir = await pdf_file_manager.list_pdfs()
@@ -73,7 +73,8 @@ async def upload_pdf(
         return PDFUploadResponse(
             message="PDF subido exitosamente. El procesamiento continuará en segundo plano.",
             file_path=str(file_path),
-            pdfs_in_directory=[p["filename"] for p in pdfs_in_dir]
+            pdfs_in_directory=[p["filename"] for p in pdfs_in_dir],
+            job_id=job["id"]
         )
         
     except HTTPException:
@@ -85,6 +86,26 @@ async def upload_pdf(
             detail=f"Error interno del servidor al procesar PDF: {str(e)}"
         )
 
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(request: Request, job_id: str):
+    """Endpoint para consultar el estado y progreso de un trabajo de ingesta."""
+    job = request.app.state.ingestion_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo de ingesta '{job_id}' no encontrado")
+    return IngestionJobResponse(
+        id=job["id"],
+        filename=job["filename"],
+        status=job["status"],
+        attempts=job["attempts"],
+        pages_parsed=job["pages_parsed"],
+        chunks_total=job["chunks_total"],
+        chunks_embedded=job["chunks_embedded"],
+        chunks_written=job["chunks_written"],
+        error=job["error"],
+        created_at=datetime.datetime.fromtimestamp(job["created_at"]),
+        updated_at=datetime.datetime.fromtimestamp(job["updated_at"])
+    )
+
 @router.get("/list", response_model=PDFListResponse)
 # @cache_response(expire=60)  # Cache por 1 minuto # Comentado temporalmente
 # @rate_limit(max_requests=30, window_seconds=60) # Comentado temporalmente
@@ -121,15 +142,15 @@ async def delete_pdf(
     rag_ingestor = request.app.state.rag_ingestor
     
     try:
+        # Los trabajos de ingesta pendientes del archivo ya no tienen nada que procesar
+        request.app.state.ingestion_queue.cancel_file(filename)
+
         # Eliminar archivo del sistema de archivos
         await pdf_file_manager.delete_pdf(filename)
         
         # Eliminar documentos asociados del vector store en segundo plano
-        # Asumiendo que los documentos tienen metadata {"source": filename}
-        background_tasks.add_task(
-            rag_ingestor.vector_store.delete_documents, 
-            filter={"source": filename}
-        )
+        # Los IDs de los chunks se obtienen del manifiesto de ingesta
+        background_tasks.add_task(rag_ingestor.remove_pdf, filename)
         
         return PDFDeleteResponse(
             message=f"PDF '{filename}' eliminado exitosamente. La actualización del índice continuará en segundo plano."
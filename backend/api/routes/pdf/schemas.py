@@ -1,5 +1,5 @@
 """API Schema for PDF routes."""
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 import datetime
 
@@ -17,7 +17,21 @@ class PDFUploadResponse(BaseModel):
     message: str
     file_path: str
     pdfs_in_directory: List[str]
+    job_id: Optional[str] = None
 
 class PDFDeleteResponse(BaseModel):
     status: str = "success"
-    message: str 
\ No newline at end of file
+    message: str
+
+class IngestionJobResponse(BaseModel):
+    id: str
+    filename: str
+    status: str
+    attempts: int
+    pages_parsed: int
+    chunks_total: int
+    chunks_embedded: int
+    chunks_written: int
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    updated_at: datetime.datetime 
\ No newline at end of file
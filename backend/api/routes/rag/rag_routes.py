@@ -1,6 +1,8 @@
 """API routes for RAG management."""
+import asyncio
 import logging
 import datetime # Para convertir timestamp
+from pathlib import Path
 from fastapi import APIRouter, HTTPException, Request
 
 # from ..utils.pdf_utils import PDFProcessor # Se inyectará desde el estado de la app
@@ -20,25 +22,32 @@ router = APIRouter()
 @router.get("/rag-status", response_model=RAGStatusResponse)
 async def rag_status(request: Request):
     """Endpoint para obtener el estado actual del RAG."""
-    pdf_processor = request.app.state.pdf_processor
+    pdf_file_manager = request.app.state.pdf_file_manager
+    manifest = request.app.state.ingestion_manifest
     # rag_retriever = request.app.state.rag_retriever # No se usa directamente en este endpoint
     try:
-        pdfs_raw = pdf_processor.list_pdfs()
-        vector_store_info_raw = pdf_processor.get_vector_store_info()
+        pdfs_raw = await pdf_file_manager.list_pdfs()
+        # El estado de ingesta sale del manifiesto local, sin consultar la colección de Chroma
+        manifest_entries = {entry["source"]: entry for entry in manifest.list_entries()}
         
-        pdf_details_list = [
-            RAGStatusPDFDetail(
+        pdf_details_list = []
+        for p in pdfs_raw:
+            entry = manifest_entries.get(p["filename"], {})
+            pdf_details_list.append(RAGStatusPDFDetail(
                 filename=p["filename"],
                 path=str(p["path"]),
                 size=p["size"],
-                last_modified=datetime.datetime.fromtimestamp(p["last_modified"])
-            ) for p in pdfs_raw
-        ]
+                last_modified=datetime.datetime.fromtimestamp(p["last_modified"]),
+                ingestion_status=entry.get("status"),
+                chunk_count=entry.get("chunk_count")
+            ))
         
+        vector_store_path = Path(request.app.state.settings.vector_store_path).resolve()
         vector_store_detail = RAGStatusVectorStoreDetail(
-            path=str(vector_store_info_raw.get("path", "N/A")),
-            exists=vector_store_info_raw.get("exists", False),
-            size=vector_store_info_raw.get("size", 0)
+            path=str(vector_store_path),
+            exists=vector_store_path.exists(),
+            size=await asyncio.to_thread(request.app.state.vector_store.count_documents),
+            embedding_cache=request.app.state.vector_store.get_embedding_cache_stats()
         )
         
         return RAGStatusResponse(
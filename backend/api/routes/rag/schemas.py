@@ -1,15 +1,17 @@
 """API Schema for RAG routes."""
-from typing import List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 from ..pdf.schemas import PDFListItem # Corregido: .pdf.schemas -> ..pdf.schemas
 
 class RAGStatusPDFDetail(PDFListItem):
-    pass
+    ingestion_status: Optional[str] = None
+    chunk_count: Optional[int] = None
 
 class RAGStatusVectorStoreDetail(BaseModel):
     path: str
     exists: bool
     size: int
+    embedding_cache: Optional[Dict[str, Any]] = None
 
 class RAGStatusResponse(BaseModel):
     pdfs: List[RAGStatusPDFDetail]
@@ -1,8 +1,23 @@
 """API models for chatbot requests and responses."""
-from typing import Optional
+from typing import Any, Dict, Optional
 from pydantic import BaseModel
 
 # Modelo para Health Check (opcional, pero bueno para consistencia)
 class HealthResponse(BaseModel):
     status: str = "healthy"
-    service: Optional[str] = None 
\ No newline at end of file
+    service: Optional[str] = None 
+# Modelo para el endpoint de readiness (estado y duración del arranque por componente)
+class ReadinessResponse(BaseModel):
+    status: str
+    ready: bool
+    startup_seconds: Optional[float] = None
+    elapsed_seconds: Optional[float] = None
+    components: Dict[str, Dict[str, Any]] = {}
+
+# Modelo para el estado de la conexión a MongoDB y su pool
+class DatabaseHealthResponse(BaseModel):
+    status: str
+    ping_ms: Optional[float] = None
+    pool: Dict[str, Any] = {}
+    conversation_log: Dict[str, Any] = {}  # Lecturas en caché/MongoDB, tasa de aciertos y buffer de escritura
+    error: Optional[str] = None
@@ -0,0 +1,144 @@
+"""Seguimiento del arranque de la aplicación por componente."""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+
+class StartupTracker:
+    """Mide la inicialización de cada componente y decide cuándo la app está lista.
+
+    Los componentes independientes se inicializan en hilos en paralelo y los pesados
+    (p. ej. el modelo de embeddings) se calientan en segundo plano. La app se
+    considera lista cuando todos los componentes críticos han terminado bien.
+    """
+
+    def __init__(self):
+        self._started_at = time.perf_counter()
+        self._ready_at: Optional[float] = None
+        self._setup_done = False
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self._background_tasks: Dict[str, asyncio.Task] = {}
+
+    def _begin(self, name: str, critical: bool) -> float:
+        self.components[name] = {"status": STATUS_PENDING, "critical": critical, "seconds": None}
+        return time.perf_counter()
+
+    def _finish(self, name: str, start: float, error: Optional[BaseException] = None) -> None:
+        seconds = round(time.perf_counter() - start, 3)
+        component = self.components[name]
+        component["seconds"] = seconds
+        if error is None:
+            component["status"] = STATUS_READY
+            logger.info(f"Componente '{name}' inicializado en {seconds:.2f}s")
+        else:
+            component["status"] = STATUS_FAILED
+            component["error"] = str(error)
+            logger.error(f"Error inicializando componente '{name}' tras {seconds:.2f}s: {error}")
+        self._check_ready()
+
+    def _check_ready(self) -> None:
+        if self._ready_at is None and self.is_ready:
+            self._ready_at = time.perf_counter()
+            logger.info(f"Aplicación lista en {self._ready_at - self._started_at:.2f}s")
+
+    def finish_setup(self) -> None:
+        """Indica que ya se registraron todos los componentes (los de fondo pueden seguir en curso)."""
+        self._setup_done = True
+        self._check_ready()
+
+    def record(self, name: str, **details: Any) -> None:
+        """Añade información al informe de un componente (p. ej. la configuración elegida)."""
+        self.components[name].setdefault("details", {}).update(details)
+
+    def run(self, name: str, func: Callable[..., Any], *args, critical: bool = True, **kwargs) -> Any:
+        """Inicializa un componente en el hilo actual (para los que deben crearse en el event loop)."""
+        start = self._begin(name, critical)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._finish(name, start, e)
+            raise
+        self._finish(name, start)
+        return result
+
+    async def run_in_thread(self, name: str, func: Callable[..., Any], *args, critical: bool = True, **kwargs) -> Any:
+        """Inicializa un componente en un hilo para poder solaparlo con otros."""
+        start = self._begin(name, critical)
+        try:
+            result = await asyncio.to_thread(func, *args, **kwargs)
+        except Exception as e:
+            self._finish(name, start, e)
+            raise
+        self._finish(name, start)
+        return result
+
+    def start_background(
+        self,
+        name: str,
+        func: Callable[..., Any],
+        *args,
+        critical: bool = True,
+        after: Optional[str] = None,
+        **kwargs
+    ) -> None:
+        """Lanza la inicialización de un componente en segundo plano sin esperarla.
+
+        Si falla, el error queda registrado y, si es crítico, la app no pasa a lista.
+        `func` puede ser una corrutina (se ejecuta en el event loop) o una función
+        (se ejecuta en un hilo). Con `after`, espera a que termine (bien o mal) el
+        componente en segundo plano con ese nombre.
+        """
+        dependency = self._background_tasks.get(after) if after else None
+
+        async def runner():
+            if dependency is not None:
+                await dependency
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    start = self._begin(name, critical)
+                    try:
+                        await func(*args, **kwargs)
+                    except Exception as e:
+                        self._finish(name, start, e)
+                        raise
+                    self._finish(name, start)
+                else:
+                    await self.run_in_thread(name, func, *args, critical=critical, **kwargs)
+            except Exception:
+                pass  # Registrado en _finish
+
+        # Registrar el componente antes de que arranque la tarea para que cuente como pendiente
+        self.components[name] = {"status": STATUS_PENDING, "critical": critical, "seconds": None}
+        self._background_tasks[name] = asyncio.create_task(runner())
+
+    @property
+    def is_ready(self) -> bool:
+        return self._setup_done and all(
+            component["status"] == STATUS_READY
+            for component in self.components.values() if component["critical"]
+        )
+
+    def report(self) -> Dict[str, Any]:
+        """Estado y duración de cada componente y tiempo total hasta estar lista."""
+        return {
+            "ready": self.is_ready,
+            "startup_seconds": round(self._ready_at - self._started_at, 3) if self._ready_at else None,
+            "elapsed_seconds": round(time.perf_counter() - self._started_at, 3),
+            "components": {name: dict(component) for name, component in self.components.items()},
+        }
+
+    async def close(self) -> None:
+        """Cancela las inicializaciones en segundo plano que sigan en curso."""
+        for task in self._background_tasks.values():
+            if not task.done():
+                task.cancel()
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks.values(), return_exceptions=True)
+        self._background_tasks.clear()
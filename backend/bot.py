@@ -1,15 +1,12 @@
 import asyncio
 import logging
 from queue import Queue
-from typing import Optional, Dict, Union, List, Any
+from typing import Optional, Dict, Union, List, Any, TYPE_CHECKING
 from operator import itemgetter
 
-from langchain.agents import AgentExecutor
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.runnables import RunnableLambda, RunnableMap, Runnable
-from langchain.agents.format_scratchpad import format_log_to_str
-from langchain.agents.output_parsers import ReActSingleInputOutputParser
 # from langchain_core.tracers.context import wait_for_all_tracers # COMMENTED OUT
 
 from .memory import (
@@ -17,7 +14,8 @@ from .memory import (
     MEM_TO_CLASS, 
     AbstractChatbotMemory,
     BaseChatbotMemory,  # Asegurar que esta importación esté presente
-    CustomMongoChatbotMemory
+    CustomMongoChatbotMemory,
+    ConversationSummarizer
 )
 from .models import ModelTypes
 from .common.objects import Message, MessageTurn
@@ -28,6 +26,10 @@ from .utils import BotAnonymizer, CacheTypes, ChatbotCache
 from .tools import CustomSearchTool
 from .config import Settings, get_settings
 
+if TYPE_CHECKING:
+    # langchain.agents es pesado de importar: se importa al construir el agente
+    from langchain.agents import AgentExecutor
+
 
 class Bot:
     def __init__(
@@ -51,7 +53,7 @@ class Bot:
         self._cache = ChatbotCache.create(cache_type=cache)
         self.anonymizer = BotAnonymizer(settings=self.settings)
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.agent_executor: Optional[AgentExecutor] = None
+        self.agent_executor: Optional["AgentExecutor"] = None
         
         # Inicializar tools
         self.tools = []
@@ -64,6 +66,17 @@ class Bot:
             model_type=model_type,
             tools_list=self.tools
         )
+
+        # Resumen incremental del historial (se genera en segundo plano con el mismo modelo)
+        self.summarizer: Optional[ConversationSummarizer] = None
+        if getattr(self.settings, "memory_summary_enabled", False):
+            self.summarizer = ConversationSummarizer(
+                llm=self.chain_manager._base_model,
+                token_budget=self.settings.memory_summary_token_budget,
+                keep_recent=self.settings.memory_summary_keep_recent,
+                max_summary_words=self.settings.memory_summary_max_words,
+                max_sessions=self.settings.memory_max_sessions
+            )
         
         self.start_agent()
 
@@ -72,13 +85,21 @@ class Bot:
         return self._memory
 
     def start_agent(self):
+        from langchain.agents import AgentExecutor
+        from langchain.agents.format_scratchpad import format_log_to_str
+        from langchain.agents.output_parsers import ReActSingleInputOutputParser
+
         agent_runnable_core: Runnable = self.chain_manager.runnable_chain
 
         async def get_history_async(x):
+            # El AgentExecutor ejecuta esta cadena en cada iteración: se reutiliza el
+            # historial que __call__ ya cargó para el turno (sin volver a codificar la
+            # consulta ni contar otra compactación del resumidor)
+            if x.get("history") is not None:
+                return x["history"]
             # Asegurarnos de que conversation_id esté disponible
             conversation_id = x.get("conversation_id", "default_session")
-            history = await self.memory.get_history(conversation_id)
-            return self._format_history_to_string(history)
+            return await self._load_history_string(conversation_id, query=x.get("raw_input") or x.get("input"))
 
         def format_scratchpad(x):
             # Formatear el scratchpad para el agente
@@ -97,7 +118,8 @@ class Bot:
 
         if self.settings.enable_anonymizer:
             anonymizer_runnable = self.anonymizer.get_runnable_anonymizer().with_config(run_name="AnonymizeSentence")
-            de_anonymizer = RunnableLambda(self.anonymizer.anonymizer.deanonymize).with_config(run_name="DeAnonymizeResponse")
+            # Acceso diferido: no construir Presidio (spaCy) hasta que se desanonimice algo
+            de_anonymizer = RunnableLambda(lambda text: self.anonymizer.anonymizer.deanonymize(text)).with_config(run_name="DeAnonymizeResponse")
             self.logger.warning("La integración del anonimizador con AgentExecutor necesita revisión. Omitiéndolo por ahora del ensamblaje del agente.")
             runnable_for_agent = agent_chain_with_history
         else:
@@ -147,6 +169,8 @@ class Bot:
         
         # Configuración específica y valores predeterminados para CustomMongoChatbotMemory
         if memory_class == CustomMongoChatbotMemory:
+            # Persiste en el ConversationLog compartido (si se pasa); no usa embeddings
+            final_params.pop('embedding_manager', None)
             if 'conversation_id' not in final_params:
                 self.logger.debug(f"CustomMongoChatbotMemory: 'conversation_id' no encontrado en final_params. Usando 'default_bot_session'. Claves actuales: {list(final_params.keys())}")
                 final_params['conversation_id'] = 'default_bot_session' 
@@ -191,8 +215,10 @@ class Bot:
             "streaming": True,
         }
 
-    def reset_history(self, conversation_id: str):
-        self.memory.clear(conversation_id=conversation_id)
+    async def reset_history(self, conversation_id: str):
+        await self.memory.clear_history(conversation_id)
+        if self.summarizer is not None:
+            self.summarizer.forget(conversation_id)
 
     async def add_message_to_memory(
             self,
@@ -205,18 +231,10 @@ class Bot:
         if isinstance(ai_message, str):
             ai_message = Message(message=ai_message, role=self.settings.ai_prefix)
 
-        # Añadir mensaje del usuario
-        await self.memory.add_message(
+        # Mensaje del usuario y respuesta del bot en una sola escritura
+        await self.memory.add_messages(
             session_id=conversation_id,
-            role="human",
-            content=human_message.message
-        )
-        
-        # Añadir respuesta del bot
-        await self.memory.add_message(
-            session_id=conversation_id,
-            role="ai",
-            content=ai_message.message
+            messages=[("human", human_message.message), ("ai", ai_message.message)]
         )
 
     async def __call__(self, x: Dict[str, Any]) -> Dict[str, Any]:
@@ -225,16 +243,17 @@ class Bot:
             # Asegurarnos de que conversation_id esté presente
             conversation_id = x.get("conversation_id", "default_session")
             
-            # Obtener el historial y formatearlo
-            history = await self.memory.get_history(conversation_id)
-            history_str = self._format_history_to_string(history)
+            # Obtener el historial (resumido si supera el presupuesto) y formatearlo
+            raw_input = x.get("raw_input") or x["input"]
+            history_str = await self._load_history_string(conversation_id, query=raw_input)
             
             # Preparar el input para el agente
             agent_input = {
                 "input": x["input"],
                 "history": history_str,
                 "context": history_str,  # Añadir el historial como contexto
-                "conversation_id": conversation_id  # Asegurarnos de que conversation_id esté presente
+                "conversation_id": conversation_id,  # Asegurarnos de que conversation_id esté presente
+                "raw_input": raw_input  # Mensaje del usuario sin el contexto RAG (consulta de la memoria)
             }
             
             # Ejecutar el agente
@@ -251,9 +270,9 @@ class Bot:
             else:
                 final_response = str(result)
             
-            # Añadir mensajes a la memoria
+            # Añadir mensajes a la memoria (el texto del usuario sin el contexto RAG añadido)
             await self.add_message_to_memory(
-                human_message=x["input"],
+                human_message=raw_input,
                 ai_message=final_response,
                 conversation_id=conversation_id
             )
@@ -286,6 +305,16 @@ class Bot:
         conversation_id = input_data.get("conversation_id")
         return self.predict(sentence=sentence, conversation_id=conversation_id)
 
+    async def _load_history_string(self, conversation_id: str, query: Optional[str] = None) -> str:
+        """Historial de la conversación para el prompt: resumen de los turnos antiguos y turnos recientes.
+
+        `query` (el mensaje actual) permite a la memoria a largo plazo recuperar los turnos relevantes.
+        """
+        history = await self.memory.get_history(conversation_id, query=query)
+        if self.summarizer is not None:
+            history = self.summarizer.compact(conversation_id, history)
+        return self._format_history_to_string(history)
+
     def _format_history_to_string(self, history: List[Dict[str, Any]]) -> str:
         """Formatea el historial de mensajes a una cadena de texto."""
         formatted_history = []
@@ -296,7 +325,7 @@ class Bot:
                 formatted_history.append(msg["content"])
             else:
                 # Formatear mensajes normales
-                role = "Usuario" if msg["role"] == "human" else "Asistente"
+                role = "Usuario" if msg["role"] in ("human", USER_ROLE) else "Asistente"
                 formatted_history.append(f"{role}: {msg['content']}")
         
         return "\n".join(formatted_history)
@@ -8,6 +8,7 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
 from ..config import settings
 from ..database.mongodb import MongodbClient
+from ..memory.conversation_log import ConversationLog
 from ..common.constants import USER_ROLE, ASSISTANT_ROLE
 from ..common.objects import Message as BotMessage
 from ..rag.retrieval.retriever import RAGRetriever
@@ -20,11 +21,24 @@ class ChatManager:
     
     def __init__(self,
                  bot_instance: Bot,
-                 rag_retriever_instance: RAGRetriever):
+                 rag_retriever_instance: RAGRetriever,
+                 conversation_log: Optional[ConversationLog] = None):
         self.bot = bot_instance
-        self.db = MongodbClient()
+        # Registro de conversaciones compartido con la memoria del Bot (una escritura por mensaje)
+        self.conversation_log = conversation_log or ConversationLog(
+            MongodbClient(),
+            window_size=settings.chat_history_window,
+            ttl_seconds=settings.memory_session_ttl,
+            max_sessions=settings.memory_max_sessions
+        )
+        self.db = self.conversation_log.db
         self.rag_retriever = rag_retriever_instance
 
+    @property
+    def _memory_uses_log(self) -> bool:
+        """True si la memoria del Bot ya escribe en este ConversationLog."""
+        return getattr(self.bot.memory, "conversation_log", None) is self.conversation_log
+
     async def generate_response(self,
                               input_text: str,
                               conversation_id: str):
@@ -59,6 +73,7 @@ class ChatManager:
             # Preparar el input para el bot
             bot_input = {
                 "input": full_input_for_bot,
+                "raw_input": input_text,  # Lo que se guarda en el historial
                 "conversation_id": conversation_id
             }
             
@@ -68,16 +83,13 @@ class ChatManager:
             
             response_content = ai_response_message.message
 
-            await self.db.add_message(
-                conversation_id=conversation_id,
-                role=USER_ROLE,
-                content=input_text
-            )
-            await self.db.add_message(
-                conversation_id=conversation_id,
-                role=ASSISTANT_ROLE,
-                content=response_content
-            )
+            # La memoria del Bot ya guardó el turno en el registro compartido; si usa otro
+            # almacenamiento, se guarda aquí en una sola escritura
+            if not self._memory_uses_log:
+                await self.conversation_log.append_messages(
+                    conversation_id,
+                    [(USER_ROLE, input_text), (ASSISTANT_ROLE, response_content)]
+                )
             
             logger.info(f"Respuesta generada y guardada para conversación {conversation_id}")
             return response_content
@@ -87,12 +99,18 @@ class ChatManager:
             return f"Lo siento, hubo un error al procesar tu solicitud: {str(e)}"
 
     async def clear_history(self, conversation_id: str) -> None:
-        await self.db.clear_conversation_history(conversation_id)
+        # Si la memoria usa el registro compartido, su limpieza ya borra la conversación
+        if not self._memory_uses_log:
+            await self.conversation_log.clear(conversation_id)
         if hasattr(self.bot, 'reset_history'):
-            self.bot.reset_history(conversation_id=conversation_id)
+            await self.bot.reset_history(conversation_id=conversation_id)
             logger.info(f"Memoria del Bot también limpiada para conversación {conversation_id}")
         logger.info(f"Historial de conversación {conversation_id} limpiado en la base de datos.")
+
+    async def get_history(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Historial reciente de la conversación (misma ruta de lectura que la memoria del Bot)."""
+        return await self.conversation_log.get_window(conversation_id, limit)
     
     async def close(self) -> None:
-        await self.db.close()
-        logger.info("MongoDB client cerrado en ChatManager.")
\ No newline at end of file
+        await self.conversation_log.close()
+        logger.info("ConversationLog cerrado en ChatManager (escrituras pendientes guardadas).")
\ No newline at end of file
@@ -70,12 +70,38 @@ class Settings(BaseSettings):
     # Configuraciones de Memoria
     memory_type: str = Field(default="BASE_MEMORY", env="MEMORY_TYPE")
     max_memory_entries: int = Field(default=1000, env="MAX_MEMORY_ENTRIES")
+    memory_session_ttl: int = Field(default=3600, env="MEMORY_SESSION_TTL")  # Segundos de inactividad
+    memory_max_sessions: int = Field(default=10000, env="MEMORY_MAX_SESSIONS")
+    chat_history_window: int = Field(default=50, env="CHAT_HISTORY_WINDOW")  # Mensajes por lectura del historial
+    chat_history_token_budget: int = Field(default=0, env="CHAT_HISTORY_TOKEN_BUDGET")  # 0 = sin límite
+    hot_session_cache: str = Field(default="auto", env="HOT_SESSION_CACHE")  # auto | redis | local
+    hot_session_ttl: int = Field(default=900, env="HOT_SESSION_TTL")  # Segundos hasta degradar la sesión a MongoDB
+    memory_summary_enabled: bool = Field(default=True, env="MEMORY_SUMMARY_ENABLED")
+    memory_summary_token_budget: int = Field(default=1500, env="MEMORY_SUMMARY_TOKEN_BUDGET")  # Tokens del historial antes de resumir
+    memory_summary_keep_recent: int = Field(default=6, env="MEMORY_SUMMARY_KEEP_RECENT")  # Mensajes que nunca se resumen
+    memory_summary_max_words: int = Field(default=200, env="MEMORY_SUMMARY_MAX_WORDS")
+    long_term_memory_top_m: int = Field(default=4, env="LONG_TERM_MEMORY_TOP_M")  # Turnos pasados recuperados por consulta
+    long_term_memory_recent_messages: int = Field(default=4, env="LONG_TERM_MEMORY_RECENT_MESSAGES")
+    long_term_memory_max_turns: int = Field(default=500, env="LONG_TERM_MEMORY_MAX_TURNS")  # Turnos indexados por conversación
+    # Turnos que se reindexan desde MongoDB la primera vez que se usa una conversación (en la petición)
+    long_term_memory_rebuild_turns: int = Field(default=50, env="LONG_TERM_MEMORY_REBUILD_TURNS")
+    long_term_memory_min_similarity: float = Field(default=0.25, env="LONG_TERM_MEMORY_MIN_SIMILARITY")
+    chat_persistence_mode: str = Field(default="buffered", env="CHAT_PERSISTENCE_MODE")  # sync | buffered
+    chat_write_batch_size: int = Field(default=500, env="CHAT_WRITE_BATCH_SIZE")
+    chat_write_flush_interval_ms: int = Field(default=200, env="CHAT_WRITE_FLUSH_INTERVAL_MS")
+    chat_write_max_queue: int = Field(default=10000, env="CHAT_WRITE_MAX_QUEUE")
     
     # Configuraciones de RAG - Procesamiento de PDFs
     chunk_size: int = Field(default=700, env="RAG_CHUNK_SIZE")
     chunk_overlap: int = Field(default=150, env="RAG_CHUNK_OVERLAP")
     min_chunk_length: int = Field(default=100, env="MIN_CHUNK_LENGTH")
     max_file_size_mb: int = Field(default=10, env="MAX_FILE_SIZE_MB")
+    chunking_mode: str = Field(default="characters", env="CHUNKING_MODE")
+    chunk_token_budget: int = Field(default=224, env="CHUNK_TOKEN_BUDGET")
+    chunk_token_overlap: int = Field(default=48, env="CHUNK_TOKEN_OVERLAP")
+    pdf_extractor: str = Field(default="text-layer", env="PDF_EXTRACTOR")
+    enable_page_cache: bool = Field(default=True, env="ENABLE_PAGE_CACHE")
+    page_cache_dir: str = Field(default="./backend/data/page_cache", env="PAGE_CACHE_DIR")
     
     # Configuraciones de RAG - Recuperación
     retrieval_k: int = Field(default=4, env="RETRIEVAL_K")
@@ -87,6 +113,10 @@ class Settings(BaseSettings):
     batch_size: int = Field(default=100, env="BATCH_SIZE")
     deduplication_threshold: float = Field(default=0.95, env="DEDUP_THRESHOLD")
     max_concurrent_tasks: int = Field(default=4, env="MAX_CONCURRENT_TASKS")
+    ingestion_manifest_path: str = Field(default="./backend/data/ingestion/manifest.sqlite3", env="INGESTION_MANIFEST_PATH")
+    ingestion_jobs_path: str = Field(default="./backend/data/ingestion/jobs.sqlite3", env="INGESTION_JOBS_PATH")
+    ingestion_max_workers: int = Field(default=2, env="INGESTION_MAX_WORKERS")
+    ingestion_max_attempts: int = Field(default=3, env="INGESTION_MAX_ATTEMPTS")  # Intentos antes de marcar un trabajo como fallido
     
     # Configuraciones de RAG - Vector Store
     vector_store_path: str = Field(default="./backend/data/vector_store/chroma_db")
@@ -94,7 +124,19 @@ class Settings(BaseSettings):
     
     # Configuraciones de RAG - Embeddings
     embedding_model: str = Field(default="sentence-transformers/all-MiniLM-L6-v2")
+    embedding_backend: str = Field(default="sentence_transformers", env="EMBEDDING_BACKEND")
     embedding_batch_size: int = Field(default=32, env="EMBEDDING_BATCH_SIZE")
+    embedding_length_bucketing: bool = Field(default=True, env="EMBEDDING_LENGTH_BUCKETING")
+    embedding_bulk_workers: int = Field(default=0, env="EMBEDDING_BULK_WORKERS")
+    # Caché de embeddings de los candidatos del reranking/MMR (adicional al índice de Chroma, que sigue en float32).
+    # Se llena solo al reordenar (<= 20 candidatos por consulta): 5000 entradas de dim 384 son ~7.7 MB en float32
+    embedding_cache_precision: str = Field(default="float32", env="EMBEDDING_CACHE_PRECISION")  # float32 | float16 | int8
+    embedding_cache_max_entries: int = Field(default=5000, env="EMBEDDING_CACHE_MAX_ENTRIES")
+    embedding_warmup_enabled: bool = Field(default=True, env="EMBEDDING_WARMUP_ENABLED")
+    embedding_warmup_batch_sizes: List[int] = Field(default=[1, 8, 32], env="EMBEDDING_WARMUP_BATCH_SIZES")
+    embedding_warmup_seq_lengths: List[int] = Field(default=[16, 128, 256], env="EMBEDDING_WARMUP_SEQ_LENGTHS")
+    embedding_warmup_tune_threads: bool = Field(default=True, env="EMBEDDING_WARMUP_TUNE_THREADS")
+    embedding_num_threads: int = Field(default=0, env="EMBEDDING_NUM_THREADS")  # 0 = automático
     
     # Configuraciones de RAG - Caché
     enable_cache: bool = Field(default=False, env="ENABLE_CACHE")
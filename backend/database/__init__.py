@@ -1,4 +1,5 @@
 """Database access module for the chatbot."""
 from .mongodb import MongodbClient
+from .client_registry import MongoClientRegistry, get_mongo_client, mongo_registry
 
-__all__ = ["MongodbClient"] 
\ No newline at end of file
+__all__ = ["MongodbClient", "MongoClientRegistry", "get_mongo_client", "mongo_registry"] 
\ No newline at end of file
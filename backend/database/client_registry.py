@@ -0,0 +1,160 @@
+"""Registro de clientes de MongoDB (Motor) compartidos por todo el proceso."""
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring, uri_parser
+
+from ..config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Contadores del pool de conexiones a partir de los eventos de pymongo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pools = 0
+        self.connections_open = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+
+    def _add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def pool_created(self, event):
+        self._add(pools=1)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        self._add(pools=-1)
+
+    def connection_created(self, event):
+        self._add(connections_open=1, connections_created=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._add(connections_open=-1, connections_closed=1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._add(checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._add(checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "pools": self.pools,
+                "connections_open": self.connections_open,
+                "connections_in_use": self.checked_out,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+            }
+
+
+def default_database_name(mongo_uri: str, fallback: str) -> str:
+    """Base de datos indicada en la URI o `fallback` si no tiene (sin abrir conexiones)."""
+    try:
+        return uri_parser.parse_uri(mongo_uri).get("database") or fallback
+    except Exception as e:
+        logger.error(f"No se pudo parsear la URI de MongoDB: {e}. Usando la base de datos '{fallback}'.")
+        return fallback
+
+
+class MongoClientRegistry:
+    """Un AsyncIOMotorClient por URI, compartido por todas las clases de persistencia.
+
+    Cada cliente mantiene su propio pool de conexiones, así que crear uno por
+    instancia de memoria multiplica conexiones y handshakes. El cliente se crea en
+    el lifespan (o en el primer uso) con el tamaño de pool y los timeouts de las
+    settings, y solo se cierra al apagar la aplicación.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, AsyncIOMotorClient] = {}
+        self._lock = threading.Lock()
+        self.pool_stats = PoolStatsListener()
+
+    def get_client(self, settings: Optional[Settings] = None) -> AsyncIOMotorClient:
+        """Cliente compartido para la URI de las settings (se crea en la primera llamada)."""
+        settings = settings or get_settings()
+        mongo_uri = settings.mongo_uri.get_secret_value()
+        client = self._clients.get(mongo_uri)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(mongo_uri)
+            if client is None:
+                client = AsyncIOMotorClient(
+                    mongo_uri,
+                    maxPoolSize=settings.mongo_max_pool_size,
+                    serverSelectionTimeoutMS=settings.mongo_timeout_ms,
+                    connectTimeoutMS=settings.mongo_timeout_ms,
+                    waitQueueTimeoutMS=settings.mongo_timeout_ms,
+                    event_listeners=[self.pool_stats]
+                )
+                self._clients[mongo_uri] = client
+                logger.info(
+                    f"Cliente MongoDB compartido creado (maxPoolSize={settings.mongo_max_pool_size}, "
+                    f"timeout={settings.mongo_timeout_ms}ms)"
+                )
+        return client
+
+    def get_database(self, settings: Optional[Settings] = None, database_name: Optional[str] = None):
+        """Base de datos del cliente compartido (por defecto, la de la URI o mongo_database_name)."""
+        settings = settings or get_settings()
+        if database_name is None:
+            database_name = default_database_name(settings.mongo_uri.get_secret_value(), settings.mongo_database_name)
+        return self.get_client(settings)[database_name]
+
+    async def ping(self, settings: Optional[Settings] = None) -> float:
+        """Latencia en ms de un ping al servidor; lanza la excepción si no responde."""
+        start = time.perf_counter()
+        await self.get_client(settings).admin.command("ping")
+        return (time.perf_counter() - start) * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"clients": len(self._clients), **self.pool_stats.snapshot()}
+
+    def close(self) -> None:
+        """Cierra todos los clientes (solo al apagar la aplicación)."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            closed = len(self._clients)
+            self._clients.clear()
+        if closed:
+            logger.info(f"{closed} cliente(s) MongoDB cerrados")
+
+
+# Registro del proceso
+mongo_registry = MongoClientRegistry()
+
+
+def get_mongo_client(settings: Optional[Settings] = None) -> AsyncIOMotorClient:
+    """Cliente Motor compartido del proceso."""
+    return mongo_registry.get_client(settings)
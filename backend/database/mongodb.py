@@ -1,98 +1,237 @@
 """MongoDB client for chat history."""
-from typing import List, Dict, Any, Optional, cast
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Tuple, cast
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
 import logging
 
+from bson import ObjectId
+
 from ..config import get_settings, Settings
+from .client_registry import mongo_registry
+from .write_buffer import MessageWriteBuffer, PersistenceModes
 
 logger = logging.getLogger(__name__)
 
+# Campos que se leen de cada mensaje (evita traer el documento completo); _id desempata el orden
+HISTORY_PROJECTION = {"_id": 1, "role": 1, "content": 1, "timestamp": 1}
+# Orden total de los mensajes: BSON guarda milisegundos y varios mensajes pueden compartir timestamp
+NEWEST_FIRST = [("timestamp", -1), ("_id", -1)]
+OLDEST_FIRST = [("timestamp", 1), ("_id", 1)]
+
+
+def approximate_token_count(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for history budgets."""
+    return len(text) // 4 + 1
+
+
+def _to_message(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """History message from a stored document ("id" is the string form of its _id)."""
+    return {
+        "role": doc["role"],
+        "content": doc["content"],
+        "timestamp": doc.get("timestamp"),
+        "id": str(doc["_id"]) if doc.get("_id") is not None else None,
+    }
+
+
 class MongodbClient:
     """MongoDB client for chat history."""
     
-    def __init__(self, settings: Settings = get_settings()):
-        """Initialize MongoDB client."""
+    def __init__(
+        self,
+        settings: Settings = get_settings(),
+        token_counter: Optional[Callable[[str], int]] = None
+    ):
+        """Initialize MongoDB client.
+
+        Args:
+            settings: Application settings.
+            token_counter: Function that counts the tokens of a text, used for
+                token-budget history reads (defaults to approximate_token_count).
+        """
         self.settings = settings
+        self.token_counter = token_counter or approximate_token_count
         try:
-            self.client = AsyncIOMotorClient(settings.mongo_uri.get_secret_value())
+            # Cliente compartido del proceso (pool configurado con las settings)
+            self.client = mongo_registry.get_client(settings)
             self.db = self.client[settings.mongo_database_name]
             self.messages = self.db.messages
-            logger.info("Conexión a MongoDB establecida exitosamente.")
+            # Inserts de mensajes por lotes fuera del camino de la respuesta (o directos en modo sync)
+            self.write_buffer = MessageWriteBuffer(
+                self.messages,
+                mode=settings.chat_persistence_mode,
+                max_batch_size=settings.chat_write_batch_size,
+                flush_interval=settings.chat_write_flush_interval_ms / 1000,
+                max_queue_size=settings.chat_write_max_queue
+            )
+            logger.info("Cliente MongoDB compartido asignado.")
         except Exception as e:
             logger.error(f"Error conectando a MongoDB: {str(e)}")
             raise
 
-    async def get_conversation_history(self, conversation_id: str) -> List[Dict[str, Any]]:
-        """Get conversation history."""
+    async def ensure_indexes(self) -> None:
+        """Create the (conversation_id, timestamp, _id) index used by every history read."""
         try:
-            # Usar find().to_list() para obtener todos los documentos de una vez
-            cursor = self.messages.find(
-                {"conversation_id": conversation_id}
-            ).sort("timestamp", 1)
-            
-            # Convertir el cursor a lista de manera asíncrona
-            docs = await cursor.to_list(length=None)
-            
-            # Formatear los mensajes
-            messages = []
-            for doc in docs:
-                messages.append({
-                    "role": doc["role"],
-                    "content": doc["content"]
-                })
-            return messages
+            await self.messages.create_index([("conversation_id", 1), *NEWEST_FIRST])
+            logger.info("Índice (conversation_id, timestamp, _id) asegurado en messages.")
+        except Exception as e:
+            logger.error(f"Error creando índices de messages: {str(e)}")
+
+    async def get_conversation_history(
+        self,
+        conversation_id: str,
+        limit: Optional[int] = None,
+        before: Optional[datetime] = None,
+        max_tokens: Optional[int] = None,
+        before_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a window of the conversation history in chronological order.
+
+        Messages are read newest first through the (conversation_id, timestamp, _id)
+        index, so the cost depends on the window and not on the conversation length.
+
+        Args:
+            conversation_id: ID of the conversation.
+            limit: Maximum number of messages (defaults to settings.chat_history_window;
+                0 or less means no limit).
+            before: Only messages older than this timestamp (pagination: pass the
+                timestamp of the oldest message of the previous page).
+            max_tokens: Stop once the window would exceed this many tokens (defaults
+                to settings.chat_history_token_budget; 0 or None means no budget).
+            before_id: Id of the oldest message of the previous page. With `before`,
+                pages on the unique (timestamp, _id) key, so messages that share the
+                boundary timestamp are not skipped.
+
+        Returns:
+            List of {"role", "content", "timestamp", "id"} dicts.
+        """
+        if limit is None:
+            limit = self.settings.chat_history_window
+        if max_tokens is None:
+            max_tokens = self.settings.chat_history_token_budget
+        # Lectura de las propias escrituras: vaciar antes lo encolado de esta conversación
+        await self.write_buffer.flush(conversation_id)
+        query: Dict[str, Any] = {"conversation_id": conversation_id}
+        if before is not None and before_id is not None:
+            query["$or"] = [
+                {"timestamp": {"$lt": before}},
+                {"timestamp": before, "_id": {"$lt": ObjectId(before_id)}},
+            ]
+        elif before is not None:
+            query["timestamp"] = {"$lt": before}
+        try:
+            cursor = self.messages.find(query, HISTORY_PROJECTION).sort(NEWEST_FIRST)
+            if limit and limit > 0:
+                cursor = cursor.limit(limit)
+
+            if max_tokens:
+                docs = []
+                used_tokens = 0
+                async for doc in cursor:
+                    used_tokens += self.token_counter(doc.get("content", ""))
+                    if docs and used_tokens > max_tokens:
+                        break
+                    docs.append(doc)
+                await cursor.close()
+            else:
+                docs = await cursor.to_list(length=limit if limit and limit > 0 else None)
+
+            # Los documentos llegan del más reciente al más antiguo
+            return [_to_message(doc) for doc in reversed(docs)]
         except Exception as e:
             logger.error(f"Error al obtener historial: {str(e)}")
             return []
 
+    async def iter_conversation(
+        self,
+        conversation_id: str,
+        batch_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the whole conversation in chronological order (for exports) as history messages.
+
+        Documents are fetched from the server in batches of `batch_size`, so the
+        conversation is never loaded in memory at once.
+        """
+        await self.write_buffer.flush(conversation_id)
+        cursor = self.messages.find(
+            {"conversation_id": conversation_id}, HISTORY_PROJECTION
+        ).sort(OLDEST_FIRST).batch_size(batch_size)
+        try:
+            async for doc in cursor:
+                yield _to_message(doc)
+        finally:
+            await cursor.close()
+
     async def add_message(self, conversation_id: str, role: str, content: str) -> None:
         """Add a message to the conversation history."""
-        try:
-            await self.messages.insert_one({
+        await self.add_messages(conversation_id, [(role, content)])
+
+    async def add_messages(self, conversation_id: str, messages: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Add several (role, content) messages to the conversation in one write.
+
+        In buffered mode the messages are queued and inserted in batches by the
+        write buffer; in sync mode a failed insert is raised to the caller.
+        Timestamps are taken now (at the millisecond precision BSON
+        stores) and each message gets an ObjectId generated in order, so
+        (timestamp, _id) keeps the order of messages written in the same call.
+
+        Returns:
+            The stored messages as history dicts (see get_conversation_history).
+        """
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        documents = [
+            {
+                "_id": ObjectId(),
                 "conversation_id": conversation_id,
                 "role": role,
                 "content": content,
-                "timestamp": datetime.now(timezone.utc)
-            })
-            logger.info(f"Mensaje agregado a la conversación {conversation_id}")
+                "timestamp": now
+            }
+            for role, content in messages
+        ]
+        try:
+            await self.write_buffer.add_many(documents)
+            logger.info(f"{len(documents)} mensaje(s) agregados a la conversación {conversation_id}")
         except Exception as e:
-            logger.error(f"Error al agregar mensaje: {str(e)}")
+            logger.error(f"Error al agregar mensajes: {str(e)}")
+            if self.write_buffer.mode == PersistenceModes.SYNC:
+                raise
+        return [_to_message(document) for document in documents]
 
     async def clear_conversation_history(self, conversation_id: str) -> None:
         """Clear conversation history."""
         try:
+            # Escribir antes lo encolado para que no reaparezca tras el borrado
+            await self.write_buffer.flush(conversation_id)
             await self.messages.delete_many({"conversation_id": conversation_id})
             logger.info(f"Historial de conversación {conversation_id} limpiado")
         except Exception as e:
             logger.error(f"Error al limpiar historial: {str(e)}")
     
-    async def format_history(self, conversation_id: str) -> str:
+    async def format_history(
+        self,
+        conversation_id: str,
+        limit: Optional[int] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
         """Format the chat history for use in prompts.
         
         Args:
             conversation_id: ID of the conversation.
+            limit: Maximum number of messages (see get_conversation_history).
+            max_tokens: Token budget for the history (see get_conversation_history).
             
         Returns:
             Formatted history string.
         """
-        messages = await self.get_conversation_history(conversation_id)
-        
-        if not messages:
-            return ""
-        
-        formatted_history = ""
-        for msg in messages:
-            role = msg.get("role", "")
-            content = msg.get("content", "")
-            formatted_history += f"{role}: {content}\n\n"
-        
-        return formatted_history.strip()
+        messages = await self.get_conversation_history(conversation_id, limit=limit, max_tokens=max_tokens)
+        return "\n\n".join(f"{msg.get('role', '')}: {msg.get('content', '')}" for msg in messages).strip()
     
     async def close(self) -> None:
-        """Close the MongoDB connection."""
-        try:
-            self.client.close()
-            logger.info("Conexión a MongoDB cerrada")
-        except Exception as e:
-            logger.error(f"Error cerrando conexión a MongoDB: {str(e)}") 
\ No newline at end of file
+        """Flush pending writes and release this client.
+
+        The underlying Motor client is shared by the whole process and is closed
+        by the application lifespan (mongo_registry.close()), not here.
+        """
+        await self.write_buffer.close()
+        logger.info("MongodbClient liberado (el cliente compartido sigue abierto)") 
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""Write-behind buffer that batches message inserts off the request path."""
+import asyncio
+import logging
+from collections import Counter
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PersistenceModes(str, Enum):
+    SYNC = "sync"          # Cada escritura espera a MongoDB (máxima durabilidad)
+    BUFFERED = "buffered"  # Las escrituras se encolan y se insertan por lotes en segundo plano
+
+
+class MessageWriteBuffer:
+    """Cola acotada de documentos que un worker inserta con insert_many por lotes.
+
+    Los mensajes de todas las conversaciones se agrupan en el mismo lote: el worker
+    espera el primer documento y recoge los que lleguen durante `flush_interval`
+    segundos (hasta `max_batch_size`). Si la cola está llena, add() espera
+    (backpressure) en lugar de crecer sin límite. En modo sync se inserta
+    directamente y no hay cola.
+
+    Se lleva la cuenta de documentos pendientes por conversación para que las
+    lecturas puedan esperar solo a los de su conversación antes de consultar
+    (lectura de las propias escrituras). Un lote fallido se reintenta una vez antes
+    de descartarse; en modo sync el error llega al llamador.
+    """
+
+    def __init__(
+        self,
+        collection: Any,
+        mode: str = PersistenceModes.BUFFERED.value,
+        max_batch_size: int = 500,
+        flush_interval: float = 0.2,
+        max_queue_size: int = 10000,
+        key_field: str = "conversation_id",
+        retry_delay: float = 0.5
+    ):
+        """Inicializa el buffer.
+
+        Args:
+            collection: Colección de Motor donde se insertan los documentos.
+            mode: PersistenceModes (sync o buffered).
+            max_batch_size: Documentos máximos por insert_many.
+            flush_interval: Segundos que se esperan para completar un lote.
+            max_queue_size: Documentos máximos en cola antes de bloquear a los productores.
+            key_field: Campo que identifica la conversación de cada documento.
+            retry_delay: Segundos de espera antes de reintentar un lote fallido.
+        """
+        self.collection = collection
+        self.mode = PersistenceModes(mode)
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.key_field = key_field
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Counter = Counter()
+        # Futures de quienes esperan a que se escriba lo pendiente de una conversación
+        self._waiters: Dict[Any, List[asyncio.Future]] = {}
+        self.stats = {"documents": 0, "batches": 0, "retries": 0, "failed_documents": 0}
+
+    def _ensure_worker(self) -> None:
+        # La cola y el worker se crean en el event loop que los usa
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def add_many(self, documents: Iterable[Dict[str, Any]]) -> None:
+        """Encola los documentos (o los inserta ya en modo sync)."""
+        documents = list(documents)
+        if not documents:
+            return
+        if self.mode == PersistenceModes.SYNC:
+            await self._insert(documents)
+            return
+        self._ensure_worker()
+        for document in documents:
+            self._pending[document.get(self.key_field)] += 1
+            await self._queue.put(document)
+
+    async def add(self, document: Dict[str, Any]) -> None:
+        await self.add_many([document])
+
+    def has_pending(self, key: Any) -> bool:
+        """Indica si quedan documentos sin escribir para la conversación."""
+        return self._pending.get(key, 0) > 0
+
+    async def _insert(self, documents: List[Dict[str, Any]]) -> None:
+        attempts = 1 if self.mode == PersistenceModes.SYNC else 2
+        for attempt in range(1, attempts + 1):
+            try:
+                await self.collection.insert_many(documents, ordered=True)
+                self.stats["documents"] += len(documents)
+                self.stats["batches"] += 1
+                return
+            except Exception as e:
+                # Con ordered=True los documentos anteriores al error ya están escritos
+                inserted = (getattr(e, "details", None) or {}).get("nInserted", 0)
+                self.stats["documents"] += inserted
+                documents = documents[inserted:]
+                if self.mode == PersistenceModes.SYNC:
+                    self.stats["failed_documents"] += len(documents)
+                    raise
+                if attempt < attempts:
+                    self.stats["retries"] += 1
+                    logger.warning(f"Error insertando lote de {len(documents)} mensajes, reintentando: {str(e)}")
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+                self.stats["failed_documents"] += len(documents)
+                logger.error(f"Error insertando lote de {len(documents)} mensajes, se descarta: {str(e)}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._insert(batch)
+            finally:
+                for document in batch:
+                    key = document.get(self.key_field)
+                    self._pending[key] -= 1
+                    if self._pending[key] <= 0:
+                        del self._pending[key]
+                        for waiter in self._waiters.pop(key, []):
+                            if not waiter.done():
+                                waiter.set_result(None)
+                    self._queue.task_done()
+
+    async def _wait(self, waiter: "asyncio.Future") -> None:
+        """Espera `waiter` y reinicia el worker si termina antes (error o cancelación)."""
+        try:
+            while not waiter.done():
+                self._ensure_worker()
+                await asyncio.wait({waiter, self._worker}, return_when=asyncio.FIRST_COMPLETED)
+                if self._worker.done() and not self._worker.cancelled() and self._worker.exception():
+                    logger.error(f"El worker del buffer de escritura terminó con error: {self._worker.exception()}")
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+
+    async def flush(self, key: Any = None) -> None:
+        """Espera a que se escriban los documentos encolados hasta ahora.
+
+        Con `key` solo se espera a los de esa conversación, sin depender de las
+        escrituras de las demás.
+        """
+        if self._queue is None:
+            return
+        if key is not None:
+            if not self.has_pending(key):
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(key, []).append(waiter)
+        else:
+            if not self._pending:
+                return
+            waiter = asyncio.ensure_future(self._queue.join())
+        await self._wait(waiter)
+
+    async def close(self) -> None:
+        """Vacía la cola y detiene el worker (al apagar la aplicación)."""
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        logger.info(f"Buffer de escritura cerrado: {self.stats}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode.value,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            **self.stats,
+        }
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+"""Benchmark del cálculo de calidad de chunks (implementación anterior vs ChunkQualityScorer).
+
+Verifica que los scores sean idénticos en todo el corpus y compara el tiempo total.
+
+Uso:
+    python backend/examples/chunk_quality_benchmark.py [directorio_con_pdfs] [--chunks 20000]
+
+Con un directorio se usan los chunks reales del pipeline (antes del filtro de
+calidad); sin él se genera un corpus sintético en español con listas, énfasis,
+definiciones y palabras clave.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from backend.rag.pdf_processor.chunk_scorer import ChunkQualityScorer
+
+
+def legacy_extract_important_terms(text: str):
+    """Implementación original de PDFContentLoader._extract_important_terms."""
+    important_terms = set()
+    patterns = [
+        r'(?:importante|requisito|necesario|requiere|debe|obligatorio)[:\s]+([^.\n]+)',
+        r'(?:proceso|procedimiento|instrucciones)[:\s]+([^.\n]+)',
+        r'(?:nota|atención|consideración)[:\s]+([^.\n]+)',
+        r'(?:requisitos|documentación)[:\s]+([^.\n]+)',
+        r'(?:definición|concepto|término)[:\s]+([^.\n]+)',
+        r'(?:objetivo|meta|propósito)[:\s]+([^.\n]+)',
+        r'(?:característica|propiedad|atributo)[:\s]+([^.\n]+)',
+        r'(?:clasificación|categoría|tipo)[:\s]+([^.\n]+)'
+    ]
+    for pattern in patterns:
+        for match in re.finditer(pattern, text.lower()):
+            term = match.group(1).strip()
+            if len(term.split()) <= 4:
+                important_terms.add(term)
+    list_items = re.findall(r'(?:^|\n)[•\-\*]\s*([^.\n]+)', text)
+    important_terms.update(item.strip() for item in list_items)
+    colon_terms = re.findall(r':\s*([^.\n]+)', text)
+    important_terms.update(term.strip() for term in colon_terms if len(term.split()) <= 4)
+    emphasis_terms = re.findall(r'\*\*([^*]+)\*\*|\*([^*]+)\*', text)
+    for term in emphasis_terms:
+        if isinstance(term, tuple):
+            term = term[0] or term[1]
+        if term and len(term.split()) <= 4:
+            important_terms.add(term.strip())
+    return list(important_terms)
+
+
+def legacy_score(content: str) -> float:
+    """Implementación original de PDFContentLoader._calculate_chunk_quality."""
+    score = 1.0
+    if len(content) < 50:
+        score *= 0.7
+    if len(content.split()) < 10:
+        score *= 0.8
+    if len(re.findall(r'[^\w\s]', content)) / len(content) > 0.3:
+        score *= 0.8
+    if content[0].isupper() and content[-1] in '.!?':
+        score *= 1.1
+    important_terms = legacy_extract_important_terms(content)
+    if important_terms:
+        score *= (1 + len(important_terms) * 0.1)
+    if re.search(r'(?:^|\n)[•\-\*]|\d+\.', content):
+        score *= 1.2
+    if re.search(r'(?:es|son|se define|se refiere)', content.lower()):
+        score *= 1.1
+    if re.search(r'(?:por ejemplo|ejemplo|como|tales como)', content.lower()):
+        score *= 1.1
+    return min(score, 1.0)
+
+
+KEYWORDS = ("importante requisito necesario requiere debe obligatorio proceso procedimiento "
+            "instrucciones nota atención consideración requisitos documentación definición "
+            "concepto término objetivo meta propósito característica propiedad atributo "
+            "clasificación categoría tipo").split()
+WORDS = ("la el de que y en los las del se por un una para con no su al lo como más pero "
+         "sus ya o este porque esta entre cuando muy sin sobre también hasta hay donde desde "
+         "todo durante universidad estudiante matrícula plazo carrera facultad beca crédito "
+         "solicitud semestre curso docente programa admisión pago cuota certificado título "
+         "grado posgrado investigación laboratorio biblioteca horario sede oficina trámite "
+         "reglamento evaluación examen promedio").split()
+
+
+def synthetic_corpus(total_chunks: int, seed: int = 42):
+    """Genera chunks sintéticos; una parte son cortos o ruidosos para forzar el cálculo completo."""
+    rng = random.Random(seed)
+
+    def sentence():
+        words = []
+        for _ in range(rng.randint(6, 22)):
+            r = rng.random()
+            if r < 0.03:
+                words.append(rng.choice(KEYWORDS) + (":" if rng.random() < 0.3 else ""))
+            elif r < 0.05:
+                words.append(str(rng.randint(1, 2024)))
+            else:
+                words.append(rng.choice(WORDS))
+        text = " ".join(words)
+        return text[0].upper() + text[1:] + rng.choice(".....:;?")
+
+    chunks = []
+    for _ in range(total_chunks):
+        r = rng.random()
+        if r < 0.1:
+            # Fragmentos cortos (penalizados)
+            chunks.append(" ".join(rng.choice(WORDS + KEYWORDS) for _ in range(rng.randint(2, 9))))
+        elif r < 0.15:
+            # Tablas/índices con muchos signos (penalizados)
+            chunks.append(" ".join(f"{rng.choice(WORDS)}....{rng.randint(1, 99)}" for _ in range(20)))
+        else:
+            parts, target = [], rng.randint(400, 1000)
+            while sum(len(p) for p in parts) < target:
+                r = rng.random()
+                if r < 0.05:
+                    parts.append(f"{rng.randint(1, 9)}. {sentence()}")
+                elif r < 0.08:
+                    parts.append(f"\n• {sentence()}")
+                elif r < 0.1:
+                    parts.append(f"**{rng.choice(WORDS)}**")
+                else:
+                    parts.append(sentence())
+            chunks.append(" ".join(parts))
+    return chunks
+
+
+def pdf_corpus(directory: Path):
+    """Chunks reales tras el splitter, antes del filtro de calidad."""
+    from backend.rag.pdf_processor.pdf_loader import PDFContentLoader
+
+    loader = PDFContentLoader()
+    chunks = []
+    for pdf_file in sorted(directory.glob("*.pdf")):
+        pages = loader._preprocess_documents(loader.extractor.extract_pages(pdf_file))
+        chunks.extend(
+            chunk.page_content for chunk in loader.text_splitter.split_documents(pages)
+            if chunk.page_content.strip()
+        )
+    return chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Directorio con PDFs para usar como corpus")
+    parser.add_argument("--chunks", type=int, default=20000, help="Número de chunks del corpus sintético")
+    args = parser.parse_args()
+
+    chunks = pdf_corpus(Path(args.directory)) if args.directory else synthetic_corpus(args.chunks)
+    print(f"Corpus: {len(chunks)} chunks, {sum(len(c) for c in chunks) / max(len(chunks), 1):.0f} caracteres de media")
+
+    start = time.perf_counter()
+    legacy_scores = [legacy_score(chunk) for chunk in chunks]
+    legacy_time = time.perf_counter() - start
+
+    scorer = ChunkQualityScorer()
+    start = time.perf_counter()
+    new_scores = scorer.score_batch(chunks)
+    new_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(legacy_scores, new_scores) if a != b)
+    print(f"Anterior:           {legacy_time:.2f}s ({len(chunks) / legacy_time:.0f} chunks/s)")
+    print(f"ChunkQualityScorer: {new_time:.2f}s ({len(chunks) / new_time:.0f} chunks/s)")
+    print(f"Aceleración: {legacy_time / new_time:.1f}x")
+    print(f"Chunks con score distinto: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Benchmark de la caché de embeddings con precisión reducida (float16/int8).
+
+Para cada precisión informa la memoria ocupada, el ahorro frente a float32, el
+tiempo de puntuación por consulta y el recall@k respecto a la búsqueda exacta en
+float32 (qué fracción de los k vecinos exactos se recuperan).
+
+Uso:
+    python backend/examples/embedding_quantization_benchmark.py [directorio_con_pdfs] [--vectors 50000] [--queries 200] [--k 10]
+
+Con un directorio se generan los embeddings reales de los chunks (y se usan como
+consultas chunks perturbados); sin él se generan vectores sintéticos agrupados en
+temas, con dimensión 384 como all-MiniLM-L6-v2.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Agregar el directorio raíz al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from backend.rag.embeddings.quantization import EmbeddingPrecisions, QuantizedEmbeddingCache, normalize_rows
+
+
+def synthetic_embeddings(total: int, queries: int, dimension: int = 384, topics: int = 200, seed: int = 42):
+    """Vectores alrededor de centros de tema; las consultas son vectores del corpus con ruido."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dimension))
+    corpus = centers[rng.integers(0, topics, total)] + rng.normal(scale=0.8, size=(total, dimension))
+    query_rows = corpus[rng.integers(0, total, queries)] + rng.normal(scale=0.5, size=(queries, dimension))
+    return normalize_rows(corpus), normalize_rows(query_rows)
+
+
+def pdf_embeddings(directory: Path, queries: int, seed: int = 42):
+    from backend.config import get_settings
+    from backend.rag.embeddings.embedding_manager import EmbeddingManager
+    from backend.rag.pdf_processor.pdf_loader import PDFContentLoader
+
+    settings = get_settings()
+    loader = PDFContentLoader(chunk_size=settings.chunk_size, chunk_overlap=settings.chunk_overlap)
+    texts = []
+    for pdf_file in sorted(directory.glob("*.pdf")):
+        texts.extend(doc.page_content for doc in loader.load_and_split_pdf(pdf_file))
+    manager = EmbeddingManager(model_name=settings.embedding_model)
+    corpus = np.asarray(manager.embed_documents(texts), dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    # Consultas: la primera mitad de chunks elegidos al azar
+    sample = rng.integers(0, len(texts), queries)
+    query_rows = manager.embed_documents([texts[i][:len(texts[i]) // 2] for i in sample])
+    return normalize_rows(corpus), normalize_rows(np.asarray(query_rows, dtype=np.float32))
+
+
+def top_k(scores: np.ndarray, k: int) -> set:
+    return set(np.argpartition(-scores, k)[:k].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Directorio con PDFs para usar como corpus")
+    parser.add_argument("--vectors", type=int, default=50000, help="Número de vectores sintéticos")
+    parser.add_argument("--queries", type=int, default=200, help="Número de consultas")
+    parser.add_argument("--k", type=int, default=10, help="Vecinos para el recall@k")
+    args = parser.parse_args()
+
+    if args.directory:
+        corpus, queries = pdf_embeddings(Path(args.directory), args.queries)
+    else:
+        corpus, queries = synthetic_embeddings(args.vectors, args.queries)
+    k = min(args.k, len(corpus) - 1)
+    keys = list(range(len(corpus)))
+    exact = [top_k(corpus @ query, k) for query in queries]
+    print(f"Vectores: {corpus.shape[0]} x {corpus.shape[1]} | consultas: {len(queries)} | k={k}")
+
+    modes = [
+        (EmbeddingPrecisions.FLOAT32, False),
+        (EmbeddingPrecisions.FLOAT16, False),
+        (EmbeddingPrecisions.INT8, False),
+        (EmbeddingPrecisions.INT8, True),
+    ]
+    baseline_bytes = None
+    for precision, integer_dot in modes:
+        cache = QuantizedEmbeddingCache(precision=precision.value, max_entries=len(corpus))
+        cache.put_many(keys, corpus)
+        memory = cache.memory_bytes()
+        baseline_bytes = baseline_bytes or memory
+
+        recall, start = 0.0, time.perf_counter()
+        for query, expected in zip(queries, exact):
+            _, scores = cache.similarities(query, keys, integer_dot=integer_dot)
+            recall += len(top_k(scores, k) & expected) / k
+        elapsed = (time.perf_counter() - start) / len(queries)
+
+        name = f"{precision.value}{' (dot entero)' if integer_dot else ''}"
+        print(f"{name:20} {memory / 2**20:8.1f} MiB  x{baseline_bytes / memory:.1f} vectores/RAM  "
+              f"{elapsed * 1000:7.2f} ms/consulta  recall@{k}={recall / len(queries):.4f}")
+
+
+if __name__ == "__main__":
+    main()
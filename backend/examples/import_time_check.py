@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Control de regresión del tiempo de importación del backend (python -X importtime).
+
+Importa el módulo indicado en un proceso limpio, muestra los módulos con mayor
+tiempo acumulado y falla (código de salida 1) si el total supera el presupuesto
+o si se importa de forma anticipada alguna dependencia pesada que debería
+cargarse solo al usarse (scikit-learn, Presidio, proveedores de modelos, torch...).
+
+Uso:
+    python backend/examples/import_time_check.py [--module backend.api.app] [--budget-ms 3000] [--top 20]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+
+# Módulos que no deben importarse al cargar la app (se importan bajo demanda)
+LAZY_MODULES = (
+    "sklearn",
+    "langchain_experimental",
+    "presidio_analyzer",
+    "presidio_anonymizer",
+    "spacy",
+    "langdetect",
+    "vertexai",
+    "llama_cpp",
+    "gptcache",
+    "sentence_transformers",
+    "torch",
+    "langchain.agents",
+)
+
+
+def measure_imports(module: str):
+    """Ejecuta el import con -X importtime y devuelve [(módulo, propio_us, acumulado_us, nivel)].
+
+    Sin módulo mide solo el arranque del intérprete (site, encodings...).
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT_DIR), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}" if module else "pass"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"Error importando {module}:")
+        print("\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))[-3000:])
+        sys.exit(2)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        level = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), level))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend.api.app", help="Módulo a importar")
+    parser.add_argument("--budget-ms", type=float, default=3000.0, help="Tiempo máximo de importación en ms")
+    parser.add_argument("--top", type=int, default=20, help="Módulos más costosos a mostrar")
+    args = parser.parse_args()
+
+    # Descontar los módulos que importa el propio intérprete al arrancar
+    startup_modules = {name for name, _, _, _ in measure_imports("")}
+    entries = [entry for entry in measure_imports(args.module) if entry[0] not in startup_modules]
+    # Las entradas de nivel 0 son las importadas directamente por "-c import ..."
+    min_level = min(level for _, _, _, level in entries)
+    total_ms = sum(cumulative for _, _, cumulative, level in entries if level == min_level) / 1000
+
+    print(f"Importación de {args.module}: {total_ms:.0f} ms ({len(entries)} módulos), presupuesto {args.budget_ms:.0f} ms")
+    print("\nMódulos con mayor tiempo acumulado:")
+    for name, self_us, cumulative_us, _ in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (propio {self_us / 1000:6.1f} ms)  {name}")
+
+    imported = {name for name, _, _, _ in entries}
+    eager = sorted(
+        lazy for lazy in LAZY_MODULES
+        if lazy in imported or any(name.startswith(lazy + ".") for name in imported)
+    )
+
+    failed = False
+    if eager:
+        print(f"\nMódulos que deberían importarse bajo demanda: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nPresupuesto superado en {total_ms - args.budget_ms:.0f} ms")
+        failed = True
+    print("\nResultado: " + ("FALLO" if failed else "OK"))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
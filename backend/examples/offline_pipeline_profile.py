@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""Perfilado de la ingesta y la recuperación sin descargar ningún modelo.
+
+Usa el backend de embeddings determinista por hashing (EMBEDDING_BACKEND=hashing)
+con un vector store temporal, de modo que el pipeline completo (chunking,
+puntuación de calidad, embeddings, deduplicación, escritura en Chroma, MMR y
+reranking) se puede medir en CI sin red.
+
+Uso:
+    python backend/examples/offline_pipeline_profile.py [directorio_con_pdfs] [--pages 200] [--queries 50] [--profile]
+
+Con un directorio se ingestan sus PDFs con RAGIngestor; sin él se generan páginas
+sintéticas en español y se procesan con el mismo PDFContentLoader e ingestor.
+Con --profile se muestra además el perfil de cProfile de las funciones más costosas.
+"""
+import argparse
+import asyncio
+import cProfile
+import logging
+import pstats
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from langchain_core.documents import Document
+
+from backend.config import get_settings
+from backend.file_system.pdf_file_manager import PDFFileManager
+from backend.rag.embeddings.backends import EmbeddingBackendTypes
+from backend.rag.embeddings.embedding_manager import EmbeddingManager
+from backend.rag.ingestion.ingestor import RAGIngestor
+from backend.rag.ingestion.manifest import IngestionManifest
+from backend.rag.pdf_processor.pdf_loader import PDFContentLoader
+from backend.rag.pdf_processor.token_counter import TokenCounter
+from backend.rag.retrieval.retriever import RAGRetriever
+from backend.rag.vector_store.vector_store import VectorStore
+
+logging.basicConfig(level=logging.WARNING)
+
+WORDS = ("la universidad ofrece programas de pregrado y posgrado los estudiantes deben presentar "
+         "documentación requerida antes del plazo establecido por la oficina de admisiones el proceso "
+         "de matrícula se realiza en línea y requiere el pago de los derechos académicos cada carrera "
+         "tiene un plan de estudios con cursos obligatorios electivos y prácticas preprofesionales "
+         "las becas se otorgan según el promedio ponderado y la situación socioeconómica").split()
+QUERIES = [
+    "¿Cuáles son los requisitos para obtener una beca?",
+    "¿Cómo puedo inscribirme en un curso?",
+    "¿Qué documentos necesito para la matrícula?",
+    "¿Cuál es el plazo de admisión en posgrado?",
+    "¿Cómo se realiza el pago de los derechos académicos?",
+]
+
+
+def synthetic_pages(total: int, seed: int = 42):
+    """Páginas de ~2500 caracteres con párrafos, listas y definiciones."""
+    rng = random.Random(seed)
+
+    def sentence():
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24)))
+        return text[0].upper() + text[1:] + "."
+
+    pages = []
+    for number in range(1, total + 1):
+        paragraphs = []
+        while sum(len(p) for p in paragraphs) < 2500:
+            if rng.random() < 0.15:
+                paragraphs.append("\n".join(f"• {sentence()}" for _ in range(rng.randint(2, 5))))
+            else:
+                paragraphs.append(" ".join(sentence() for _ in range(rng.randint(3, 6))))
+        pages.append(Document(page_content="\n\n".join(paragraphs), metadata={"page": number}))
+    return pages
+
+
+class StageTimer:
+    """Acumula el tiempo de cada etapa del pipeline."""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+
+async def run_pipeline(args, workdir: Path, timer: StageTimer):
+    settings = get_settings()
+    with timer.measure("inicialización"):
+        embedding_manager = EmbeddingManager(model_name=settings.embedding_model, backend=args.backend)
+        token_counter = TokenCounter(
+            tokenizer_provider=embedding_manager.get_tokenizer,
+            max_seq_length_provider=embedding_manager.get_max_seq_length
+        )
+        loader = PDFContentLoader(
+            chunk_size=settings.chunk_size,
+            chunk_overlap=settings.chunk_overlap,
+            min_chunk_length=settings.min_chunk_length,
+            token_counter=token_counter
+        )
+        vector_store = VectorStore(
+            persist_directory=str(workdir / "chroma"),
+            embedding_function=embedding_manager,
+            cache_enabled=False
+        )
+        ingestor = RAGIngestor(
+            pdf_file_manager=PDFFileManager(base_dir=workdir),
+            pdf_content_loader=loader,
+            embedding_manager=embedding_manager,
+            vector_store=vector_store,
+            manifest=IngestionManifest(workdir / "manifest.sqlite3")
+        )
+
+    total_chunks = 0
+    if args.directory:
+        with timer.measure("ingesta"):
+            for pdf_file in sorted(Path(args.directory).glob("*.pdf")):
+                result = await ingestor.ingest_single_pdf(pdf_file, force_update=True)
+                total_chunks += result.get("chunks_added", 0)
+    else:
+        source = Path("sintetico.pdf")
+        with timer.measure("chunking"):
+            pages = loader._preprocess_documents(synthetic_pages(args.pages))
+            chunks = loader._postprocess_chunks(loader.text_splitter.split_documents(pages), source)
+        with timer.measure("ingesta"):
+            ingestor.manifest.begin(source.name, "sintetico")
+            _, total_chunks, _ = await ingestor._embed_and_write(source.name, chunks, {}, set())
+            ingestor.manifest.complete(source.name)
+
+    retriever = RAGRetriever(vector_store=vector_store, embedding_manager=embedding_manager, cache_enabled=False)
+    retrieved = 0
+    with timer.measure("recuperación"):
+        for i in range(args.queries):
+            docs = await retriever.retrieve_documents(QUERIES[i % len(QUERIES)], k=4)
+            retrieved += len(docs)
+    return total_chunks, retrieved, vector_store.get_embedding_cache_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Directorio con PDFs a ingestar")
+    parser.add_argument("--pages", type=int, default=200, help="Páginas sintéticas (sin directorio)")
+    parser.add_argument("--queries", type=int, default=50, help="Consultas de recuperación")
+    parser.add_argument("--backend", default=EmbeddingBackendTypes.HASHING.value,
+                        choices=[b.value for b in EmbeddingBackendTypes], help="Backend de embeddings")
+    parser.add_argument("--profile", action="store_true", help="Mostrar el perfil de cProfile")
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    profiler = cProfile.Profile() if args.profile else None
+    with tempfile.TemporaryDirectory() as tmp:
+        if profiler:
+            profiler.enable()
+        total_chunks, retrieved, cache_stats = asyncio.run(run_pipeline(args, Path(tmp), timer))
+        if profiler:
+            profiler.disable()
+
+    print(f"Backend: {args.backend} | chunks escritos: {total_chunks} | documentos recuperados: {retrieved}")
+    for stage, seconds in timer.stages.items():
+        print(f"  {stage:16} {seconds:8.2f}s")
+    if "ingesta" in timer.stages and total_chunks:
+        print(f"  {'ingesta/chunk':16} {timer.stages['ingesta'] / total_chunks * 1000:8.2f}ms")
+    if args.queries:
+        print(f"  {'consulta':16} {timer.stages['recuperación'] / args.queries * 1000:8.2f}ms")
+    print(f"Caché de embeddings: {cache_stats}")
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import logging
 import time
@@ -13,27 +14,32 @@ from backend.rag.vector_store.vector_store import VectorStore
 from backend.rag.embeddings.embedding_manager import EmbeddingManager
 from backend.utils.chain_cache import ChatbotCache, CacheTypes
 from backend.config import get_settings
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from backend.rag.embeddings.backends import EmbeddingBackendTypes
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def test_rag_performance():
-    """Prueba el rendimiento del RAG con diferentes escenarios."""
+async def test_rag_performance(backend: str = None):
+    """Prueba el rendimiento del RAG con diferentes escenarios.
+
+    Args:
+        backend: Backend de embeddings (por defecto settings.embedding_backend). Con
+            "hashing" la prueba se ejecuta sin descargar el modelo.
+    """
     settings = get_settings()
     
     # Inicializar componentes
-    embedding_model = HuggingFaceEmbeddings(model_name=settings.embedding_model)
+    embedding_manager = EmbeddingManager(model_name=settings.embedding_model, backend=backend)
     vector_store = VectorStore(
         persist_directory=settings.vector_store_path,
-        embedding_function=embedding_model
+        embedding_function=embedding_manager
     )
     
     # Crear instancia del retriever
     retriever = RAGRetriever(
         vector_store=vector_store,
-        embedding_manager=embedding_model,
+        embedding_manager=embedding_manager,
         cache_enabled=True
     )
     
@@ -97,8 +103,12 @@ async def test_rag_performance():
 
 async def main():
     """Función principal de prueba."""
+    parser = argparse.ArgumentParser(description="Prueba de rendimiento del RAG")
+    parser.add_argument("--backend", default=None, choices=[b.value for b in EmbeddingBackendTypes],
+                        help="Backend de embeddings (por defecto EMBEDDING_BACKEND)")
+    args = parser.parse_args()
     try:
-        await test_rag_performance()
+        await test_rag_performance(args.backend)
     except Exception as e:
         logger.error(f"Error durante las pruebas: {e}", exc_info=True)
 
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""Benchmark del resumen incremental del historial (tamaño del prompt y latencia del LLM).
+
+Simula una sesión larga turno a turno y, en cada turno, compara el historial
+completo con el historial compactado por ConversationSummarizer:
+  - tokens del historial que se envían en el prompt,
+  - latencia del LLM respondiendo con cada historial (opcional, --llm-every N).
+
+Los resúmenes se generan en segundo plano con el modelo configurado, como en el Bot.
+
+Uso:
+    python backend/examples/summarization_benchmark.py [--turns 40] [--budget 1500] [--llm-every 10]
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from backend.chain import ChainManager
+from backend.config import get_settings
+from backend.database.mongodb import approximate_token_count
+from backend.memory import ConversationSummarizer
+
+logging.basicConfig(level=logging.WARNING)
+
+QUESTIONS = [
+    "Me llamo Ana y estudio ingeniería de sistemas, ¿cuáles son los requisitos para la matrícula?",
+    "¿Hasta qué fecha puedo pagar los derechos académicos sin recargo?",
+    "¿Qué cursos electivos recomiendas para el quinto ciclo?",
+    "¿Cómo solicito la convalidación de un curso aprobado en otra universidad?",
+    "¿Dónde encuentro el horario de las prácticas preprofesionales?",
+    "¿Puedo llevar cursos de otra facultad como electivos?",
+]
+
+ANSWER = ("Según el reglamento académico, el proceso se realiza en línea a través del portal del estudiante. "
+          "Debes presentar la documentación requerida antes del plazo establecido por la oficina de "
+          "admisiones y verificar que no tengas deudas pendientes. ")
+
+
+def format_history(history):
+    return "\n".join(
+        message["content"] if message["role"] == "system"
+        else f"{'Usuario' if message['role'] == 'human' else 'Asistente'}: {message['content']}"
+        for message in history
+    )
+
+
+async def timed_invoke(llm, history_str: str, question: str) -> float:
+    start = time.perf_counter()
+    await llm.ainvoke(f"Conversación actual:\n{history_str}\n\nHumano: {question}\nAsistente:")
+    return (time.perf_counter() - start) * 1000
+
+
+async def main(args):
+    settings = get_settings()
+    llm = ChainManager(settings=settings)._base_model
+    summarizer = ConversationSummarizer(
+        llm=llm,
+        token_budget=args.budget,
+        keep_recent=args.keep_recent,
+        max_summary_words=settings.memory_summary_max_words
+    )
+    rng = random.Random(42)
+    history = []
+    latencies = {"full": [], "compacted": []}
+
+    print(f"{'turno':>5} {'tokens completo':>16} {'tokens compactado':>18}")
+    for turn in range(1, args.turns + 1):
+        question = rng.choice(QUESTIONS)
+        # Con id, como los mensajes de ConversationLog (el resumidor los localiza por posición)
+        history.append({"role": "human", "content": question, "id": f"{turn}-human"})
+        history.append({"role": "ai", "content": ANSWER * rng.randint(1, 3), "id": f"{turn}-ai"})
+
+        full_str = format_history(history)
+        compacted_str = format_history(summarizer.compact("benchmark", list(history)))
+        if turn % 5 == 0 or turn == args.turns:
+            print(f"{turn:>5} {approximate_token_count(full_str):>16} {approximate_token_count(compacted_str):>18}")
+
+        if args.llm_every and turn % args.llm_every == 0:
+            latencies["full"].append(await timed_invoke(llm, full_str, question))
+            latencies["compacted"].append(await timed_invoke(llm, compacted_str, question))
+        # Dar tiempo a que termine el resumen en segundo plano, como entre turnos reales
+        await summarizer.wait_idle()
+
+    stats = summarizer.get_stats()
+    print("\nEstadísticas del resumidor:")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+    if latencies["full"]:
+        full_ms = sum(latencies["full"]) / len(latencies["full"])
+        compacted_ms = sum(latencies["compacted"]) / len(latencies["compacted"])
+        print(f"\nLatencia media del LLM: completo {full_ms:.0f} ms, compactado {compacted_ms:.0f} ms "
+              f"({(1 - compacted_ms / full_ms) * 100:.1f}% menos)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="Turnos de la conversación simulada")
+    parser.add_argument("--budget", type=int, default=1500, help="Tokens del historial antes de resumir")
+    parser.add_argument("--keep-recent", type=int, default=6, help="Mensajes recientes que nunca se resumen")
+    parser.add_argument("--llm-every", type=int, default=10, help="Medir la latencia del LLM cada N turnos (0 = no medir)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""Benchmark de la normalización de texto por página (implementación anterior vs compilada).
+
+Verifica que la salida sea idéntica byte a byte y compara el throughput.
+
+Uso:
+    python backend/examples/text_normalization_benchmark.py [directorio_con_pdfs] [--mb 50]
+
+Sin directorio se genera un corpus sintético con comillas/guiones tipográficos,
+caracteres de control, tabulaciones y saltos de línea.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from backend.rag.pdf_processor.text_normalizer import normalize_page_text
+
+
+def legacy_normalize(text: str) -> str:
+    """Secuencia original _clean_text → _normalize_text → _preserve_structures."""
+    text = ''.join(char for char in text if char == '\n' or char.isprintable())
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
+    text = '\n'.join(line.strip() for line in text.splitlines())
+    text = text.strip()
+    text = re.sub(r'[\s]*([.,!?;:])', r'\1', text)
+    text = re.sub(r'([.,!?;:])([^\s])', r'\1 \2', text)
+    text = re.sub(r'[\u2010-\u2015]', '-', text)
+    text = re.sub(r'[\u2018\u2019]', "'", text)
+    text = re.sub(r'[\u201C\u201D]', '"', text)
+    text = re.sub(r'(\d+\.\s*)(\n\s*)', r'\1', text)
+    text = re.sub(r'([•\-*]\s*)(\n\s*)', r'\1', text)
+    text = re.sub(r'([A-Z][^.!?]*:)(\n\s*)', r'\1 ', text)
+    return text
+
+
+def synthetic_corpus(total_mb: float, seed: int = 42):
+    """Genera páginas sintéticas con el ruido típico de la extracción de PDFs."""
+    rng = random.Random(seed)
+    words = ("requisito matrícula estudiante universidad beca proceso documentación "
+             "Importante Nota: plazo solicitud crédito carrera facultad 2024 1. 2. •").split()
+    noise = ["\n", "\n\n", "\t", "  ", " .", " ,", "\u2013", "\u2014", "\u201c", "\u201d",
+             "\u2018", "\u2019", "\x0c", "\xa0", "\u200b", ":", ";", "!", "?"]
+    pages, size = [], 0
+    while size < total_mb * 1024 * 1024:
+        parts = []
+        for _ in range(rng.randint(300, 600)):
+            parts.append(rng.choice(words))
+            parts.append(rng.choice(noise) if rng.random() < 0.15 else " ")
+        page = "".join(parts)
+        pages.append(page)
+        size += len(page.encode("utf-8"))
+    return pages
+
+
+def pdf_corpus(directory: Path):
+    from backend.rag.pdf_processor.extractors import TextLayerPDFExtractor
+
+    extractor = TextLayerPDFExtractor()
+    pages = []
+    for pdf_file in sorted(directory.glob("*.pdf")):
+        pages.extend(doc.page_content for doc in extractor.extract_pages(pdf_file))
+    return pages
+
+
+def bench(func, pages):
+    start = time.perf_counter()
+    output = [func(page) for page in pages]
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Directorio con PDFs para usar como corpus")
+    parser.add_argument("--mb", type=float, default=50.0, help="Tamaño del corpus sintético en MB")
+    args = parser.parse_args()
+
+    pages = pdf_corpus(Path(args.directory)) if args.directory else synthetic_corpus(args.mb)
+    corpus_mb = sum(len(p.encode("utf-8")) for p in pages) / (1024 * 1024)
+    print(f"Corpus: {len(pages)} páginas, {corpus_mb:.1f} MB")
+
+    legacy_time, legacy_out = bench(legacy_normalize, pages)
+    new_time, new_out = bench(normalize_page_text, pages)
+
+    mismatches = sum(1 for a, b in zip(legacy_out, new_out) if a != b)
+    print(f"Anterior:  {legacy_time:.2f}s ({corpus_mb / legacy_time:.1f} MB/s)")
+    print(f"Compilada: {new_time:.2f}s ({corpus_mb / new_time:.1f} MB/s)")
+    print(f"Aceleración: {legacy_time / new_time:.1f}x")
+    print(f"Páginas con salida distinta: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
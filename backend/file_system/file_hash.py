@@ -0,0 +1,21 @@
+"""Utilidades para calcular huellas (hashes) de archivos."""
+import hashlib
+from pathlib import Path
+from typing import Union
+
+
+def compute_file_hash(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """Calcula el hash SHA-256 de un archivo leyéndolo por bloques.
+
+    Args:
+        file_path: Ruta al archivo.
+        chunk_size: Tamaño del bloque de lectura (1MB por defecto).
+
+    Returns:
+        Hash SHA-256 en hexadecimal.
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while block := f.read(chunk_size):
+            sha256.update(block)
+    return sha256.hexdigest()
@@ -1,6 +1,16 @@
 from .base_memory import AbstractChatbotMemory, BaseChatbotMemory
+from .session_store import SessionMessageStore
+from .hot_session_cache import (
+    HotSessionCacheTypes,
+    LocalHotSessionCache,
+    RedisHotSessionCache,
+    create_hot_session_cache,
+)
+from .conversation_log import ConversationLog
+from .summarizer import ConversationSummarizer
 from .mongo_memory import MongoChatbotMemory
 from .custom_memory import CustomMongoChatbotMemory
+from .long_term_memory import LongTermChatbotMemory
 from .memory_types import MemoryTypes  # <--- Añadir esta importación
 
 # Asegurar que este diccionario coincida con el de memory_types.py
@@ -8,13 +18,22 @@ MEM_TO_CLASS = {
     MemoryTypes.BASE_MEMORY.value: BaseChatbotMemory,  # Usar BaseChatbotMemory para el tipo base
     MemoryTypes.MONGO_MEMORY.value: MongoChatbotMemory,
     MemoryTypes.CUSTOM_MEMORY.value: CustomMongoChatbotMemory,
+    MemoryTypes.LONG_TERM_MEMORY.value: LongTermChatbotMemory,
 }
 
 __all__ = [
     "AbstractChatbotMemory",
     "BaseChatbotMemory",
+    "SessionMessageStore",
+    "HotSessionCacheTypes",
+    "LocalHotSessionCache",
+    "RedisHotSessionCache",
+    "create_hot_session_cache",
+    "ConversationLog",
+    "ConversationSummarizer",
     "MongoChatbotMemory",
     "CustomMongoChatbotMemory",
+    "LongTermChatbotMemory",
     "MemoryTypes",
     "MEM_TO_CLASS"
 ]
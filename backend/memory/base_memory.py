@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List, Protocol, Union
+from typing import Optional, Dict, Any, List, Protocol, Set, Tuple, Union
 from datetime import datetime, timezone
 import logging
 import re
@@ -17,6 +17,53 @@ class ContextManager(Protocol):
 
 from pydantic import BaseModel, ConfigDict, Field
 
+from .session_store import SessionMessageStore
+
+# Patrones para extraer información del usuario (se aplican sobre el texto en minúsculas)
+_USER_INFO_PATTERNS = {
+    key: re.compile(pattern) for key, pattern in {
+        'name': r'(?:me llamo|mi nombre es|soy)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)',
+        'age': r'(?:tengo|mi edad es|soy de)\s+(\d+)\s+(?:años|año)',
+        'city': r'(?:vivo en|soy de|estoy en)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)',
+        'profession': r'(?:soy|trabajo como|mi profesión es)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)',
+        'likes': r'(?:me gusta|disfruto de|me interesa)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s,]+)',
+        'preferences': r'(?:prefiero|me gusta más|me interesa más)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s,]+)'
+    }.items()
+}
+
+# Palabras clave que indican temas
+TOPIC_KEYWORDS = {
+    'trabajo': ['trabajo', 'empleo', 'profesión', 'carrera'],
+    'estudios': ['estudio', 'universidad', 'escuela', 'carrera'],
+    'familia': ['familia', 'padres', 'hermanos', 'hijos'],
+    'hobbies': ['hobby', 'pasatiempo', 'interés', 'gusto'],
+    'viajes': ['viaje', 'viajar', 'turismo', 'destino'],
+    'tecnología': ['tecnología', 'computadora', 'software', 'hardware'],
+    'deportes': ['deporte', 'ejercicio', 'fútbol', 'baloncesto'],
+    'música': ['música', 'canción', 'artista', 'banda'],
+    'películas': ['película', 'cine', 'serie', 'actor']
+}
+
+_KEYWORD_TO_TOPICS: Dict[str, List[str]] = {}
+for _topic, _keywords in TOPIC_KEYWORDS.items():
+    for _keyword in _keywords:
+        _KEYWORD_TO_TOPICS.setdefault(_keyword, []).append(_topic)
+
+# Temas de cada palabra clave y de las palabras clave que contiene: en cada posición
+# solo se captura la más larga, y las que son prefijo o subcadena suya también cuentan
+_KEYWORD_TO_ALL_TOPICS: Dict[str, Set[str]] = {
+    keyword: {topic for other, topics in _KEYWORD_TO_TOPICS.items() if other in keyword for topic in topics}
+    for keyword in _KEYWORD_TO_TOPICS
+}
+
+# Una sola alternancia con todas las palabras clave (las más largas primero) dentro
+# de una búsqueda anticipada: no consume texto, así que se prueba en cada posición y
+# se encuentran también las coincidencias solapadas ("cinestudio" -> "cine", "estudio")
+_TOPIC_KEYWORDS_RE = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_TO_TOPICS, key=len, reverse=True)) + "))"
+)
+
+
 class AbstractChatbotMemory(ABC):
     """Clase base abstracta para la memoria del chatbot"""
     def __init__(
@@ -42,9 +89,18 @@ class AbstractChatbotMemory(ABC):
         """Añade un mensaje de forma asíncrona"""
         pass
 
+    async def add_messages(self, session_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Añade varios mensajes (role, content), p. ej. un turno completo.
+
+        Las implementaciones con almacenamiento persistente lo sobrescriben para
+        guardarlos en una sola escritura.
+        """
+        for role, content in messages:
+            await self.add_message(session_id, role, content)
+
     @abstractmethod
-    async def get_history(self, session_id: str) -> str:
-        """Recupera el historial de forma asíncrona"""
+    async def get_history(self, session_id: str, query: Optional[str] = None) -> str:
+        """Recupera el historial de forma asíncrona (query: mensaje actual, para memorias que lo usen)"""
         pass
 
     @abstractmethod
@@ -62,6 +118,7 @@ class BaseChatbotMemory(AbstractChatbotMemory):
         settings = None,
         session_id: str = "default_session",
         k: Optional[int] = None,
+        conversation_log: Optional[Any] = None,
         **kwargs
     ):
         super().__init__(
@@ -74,136 +131,162 @@ class BaseChatbotMemory(AbstractChatbotMemory):
             **kwargs
         )
         self._session_context = {}  # Diccionario para mantener el contexto de la sesión
-        self._message_history = []  # Lista para mantener el historial de mensajes en memoria
+        # Historial en memoria: una ventana de k mensajes por sesión; las sesiones inactivas
+        # (TTL) o que exceden el límite se descartan junto con su contexto
+        self._message_history = SessionMessageStore(
+            capacity=self.k_history,
+            ttl_seconds=getattr(settings, 'memory_session_ttl', 3600),
+            max_sessions=getattr(settings, 'memory_max_sessions', 10000),
+            on_evict=lambda evicted_id: self._session_context.pop(evicted_id, None)
+        )
+        # Con un ConversationLog (compartido con ChatManager) el historial se persiste y se
+        # lee allí, y el contexto de cada sesión vive mientras su ventana siga en memoria
+        self.conversation_log = conversation_log
+        if conversation_log is not None:
+            conversation_log.add_eviction_listener(lambda evicted_id: self._session_context.pop(evicted_id, None))
 
     def _extract_user_info(self, content: str) -> Dict[str, str]:
         """Extrae información del usuario del mensaje usando expresiones regulares."""
         user_info = {}
-        
-        # Patrones para extraer información
-        patterns = {
-            'name': r'(?:me llamo|mi nombre es|soy)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)',
-            'age': r'(?:tengo|mi edad es|soy de)\s+(\d+)\s+(?:años|año)',
-            'city': r'(?:vivo en|soy de|estoy en)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)',
-            'profession': r'(?:soy|trabajo como|mi profesión es)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s]+)',
-            'likes': r'(?:me gusta|disfruto de|me interesa)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s,]+)',
-            'preferences': r'(?:prefiero|me gusta más|me interesa más)\s+([A-Za-zÁáÉéÍíÓóÚúÑñ\s,]+)'
-        }
-        
-        # Buscar cada patrón en el contenido
-        for key, pattern in patterns.items():
-            match = re.search(pattern, content.lower())
+        content_lower = content.lower()
+        for key, pattern in _USER_INFO_PATTERNS.items():
+            match = pattern.search(content_lower)
             if match:
                 user_info[key] = match.group(1).strip()
-        
         return user_info
 
     def _extract_topics(self, content: str) -> List[str]:
-        """Extrae temas de conversación del mensaje."""
-        topics = []
-        
-        # Palabras clave que indican temas
-        topic_keywords = {
-            'trabajo': ['trabajo', 'empleo', 'profesión', 'carrera'],
-            'estudios': ['estudio', 'universidad', 'escuela', 'carrera'],
-            'familia': ['familia', 'padres', 'hermanos', 'hijos'],
-            'hobbies': ['hobby', 'pasatiempo', 'interés', 'gusto'],
-            'viajes': ['viaje', 'viajar', 'turismo', 'destino'],
-            'tecnología': ['tecnología', 'computadora', 'software', 'hardware'],
-            'deportes': ['deporte', 'ejercicio', 'fútbol', 'baloncesto'],
-            'música': ['música', 'canción', 'artista', 'banda'],
-            'películas': ['película', 'cine', 'serie', 'actor']
-        }
-        
-        content_lower = content.lower()
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in content_lower for keyword in keywords):
-                topics.append(topic)
-        
-        return topics
+        """Extrae temas de conversación del mensaje con una sola pasada sobre el texto."""
+        found = set()
+        for match in _TOPIC_KEYWORDS_RE.finditer(content.lower()):
+            found.update(_KEYWORD_TO_ALL_TOPICS[match.group(1)])
+        # Conservar el orden de TOPIC_KEYWORDS
+        return [topic for topic in TOPIC_KEYWORDS if topic in found]
 
     def _update_session_context(self, session_id: str, content: str) -> None:
-        """Actualiza el contexto de la sesión con nueva información."""
+        """Actualiza el contexto de la sesión con nueva información.
+
+        La versión del contexto solo aumenta cuando cambia algo de lo que se muestra
+        en get_history, de modo que el texto renderizado se reutiliza mientras tanto.
+        """
         if session_id not in self._session_context:
             self._session_context[session_id] = {
                 'user_info': {},
                 'conversation_topics': set(),
                 'last_message': content,
-                'conversation_summary': []
+                'conversation_summary': [],
+                'version': 0,
+                'rendered': None  # (versión, texto) del último renderizado
             }
+        context = self._session_context[session_id]
+        changed = False
         
         # Extraer y actualizar información del usuario
-        user_info = self._extract_user_info(content)
-        if user_info:
-            self._session_context[session_id]['user_info'].update(user_info)
-            # Añadir al resumen de la conversación
-            for key, value in user_info.items():
-                summary = f"El usuario mencionó que {key}: {value}"
-                self._session_context[session_id]['conversation_summary'].append(summary)
+        for key, value in self._extract_user_info(content).items():
+            if context['user_info'].get(key) != value:
+                context['user_info'][key] = value
+                # Añadir al resumen de la conversación
+                context['conversation_summary'].append(f"El usuario mencionó que {key}: {value}")
+                changed = True
         
         # Extraer y actualizar temas de conversación
-        topics = self._extract_topics(content)
-        if topics:
-            self._session_context[session_id]['conversation_topics'].update(topics)
-            # Añadir al resumen de la conversación
-            for topic in topics:
-                if topic not in self._session_context[session_id]['conversation_summary']:
-                    summary = f"Se discutió sobre {topic}"
-                    self._session_context[session_id]['conversation_summary'].append(summary)
+        for topic in self._extract_topics(content):
+            if topic not in context['conversation_topics']:
+                context['conversation_topics'].add(topic)
+                # Añadir al resumen de la conversación
+                context['conversation_summary'].append(f"Se discutió sobre {topic}")
+                changed = True
+        
+        # Actualizar último mensaje (no forma parte del texto renderizado)
+        context['last_message'] = content
+        if changed:
+            context['version'] += 1
+
+    @staticmethod
+    def _render_context(context: Dict[str, Any]) -> str:
+        """Texto del mensaje de sistema "Contexto actual" para un contexto de sesión."""
+        parts = ["Contexto actual:\n"]
+        
+        # Añadir información del usuario
+        if context["user_info"]:
+            parts.append("Información del usuario:\n")
+            parts.extend(f"- {key}: {value}\n" for key, value in context["user_info"].items())
         
-        # Actualizar último mensaje
-        self._session_context[session_id]['last_message'] = content
+        # Añadir temas de conversación
+        if context["conversation_topics"]:
+            parts.append("\nTemas de conversación:\n")
+            parts.extend(f"- {topic}\n" for topic in context["conversation_topics"])
+        
+        # Añadir resumen de la conversación
+        if context["conversation_summary"]:
+            parts.append("\nResumen de la conversación:\n")
+            # Últimos 5 puntos del resumen
+            parts.extend(f"- {summary}\n" for summary in context["conversation_summary"][-5:])
+        
+        return "".join(parts)
+
+    def _get_rendered_context(self, session_id: str) -> Optional[str]:
+        """Texto del contexto de la sesión, renderizado de nuevo solo si cambió su versión."""
+        context = self._session_context.get(session_id)
+        if context is None:
+            return None
+        rendered = context['rendered']
+        if rendered is None or rendered[0] != context['version']:
+            rendered = (context['version'], self._render_context(context))
+            context['rendered'] = rendered
+        return rendered[1]
 
     async def add_message(self, session_id: str, role: str, content: str) -> None:
         """Implementación para añadir un mensaje y mantener el contexto"""
-        self.logger.debug(f"Mensaje añadido a la sesión {session_id}: {role}: {content[:50]}...")
-        
-        # Añadir mensaje al historial
-        self._message_history.append({
-            "role": role,
-            "content": content,
-            "session_id": session_id,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        })
+        await self.add_messages(session_id, [(role, content)])
+
+    async def add_messages(self, session_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Añade los mensajes (role, content) de un turno y mantiene el contexto.
+
+        Con ConversationLog se persisten en una sola escritura.
+        """
+        for role, content in messages:
+            self.logger.debug(f"Mensaje añadido a la sesión {session_id}: {role}: {content[:50]}...")
         
-        # Mantener solo los últimos k mensajes
-        if len(self._message_history) > self.k_history:
-            self._message_history = self._message_history[-self.k_history:]
+        # Añadir mensajes al historial de la sesión (la ventana descarta los más antiguos)
+        if self.conversation_log is not None:
+            await self.conversation_log.append_messages(session_id, messages)
+        else:
+            for role, content in messages:
+                self._message_history.store(session_id, {
+                    "role": role,
+                    "content": content,
+                    "session_id": session_id,
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                })
         
         # Extraer y actualizar el contexto solo para mensajes del usuario
-        if role == "human":
+        user_contents = [content for role, content in messages if role == "human"]
+        if not user_contents:
+            return
+        previous = self._session_context.get(session_id)
+        previous_version = previous['version'] if previous is not None else None
+        for content in user_contents:
             self._update_session_context(session_id, content)
+        if self.conversation_log is not None and self._session_context[session_id]['version'] != previous_version:
+            # Write-through del contexto renderizado a la caché de sesiones activas
+            await self.conversation_log.set_context(session_id, self._get_rendered_context(session_id))
     
-    async def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+    async def get_history(self, session_id: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
         """Implementación para obtener el historial con contexto"""
         self.logger.debug(f"Obteniendo historial para la sesión {session_id}")
         
-        # Filtrar mensajes por session_id
-        session_messages = [msg for msg in self._message_history if msg["session_id"] == session_id]
+        if self.conversation_log is not None:
+            session_messages = await self.conversation_log.get_window(session_id, self.k_history)
+        else:
+            session_messages = self._message_history.retrieve(session_id)
         
         # Añadir el contexto actual al historial
-        if session_id in self._session_context:
-            context = self._session_context[session_id]
-            context_str = "Contexto actual:\n"
-            
-            # Añadir información del usuario
-            if context["user_info"]:
-                context_str += "Información del usuario:\n"
-                for key, value in context["user_info"].items():
-                    context_str += f"- {key}: {value}\n"
-            
-            # Añadir temas de conversación
-            if context["conversation_topics"]:
-                context_str += "\nTemas de conversación:\n"
-                for topic in context["conversation_topics"]:
-                    context_str += f"- {topic}\n"
-            
-            # Añadir resumen de la conversación
-            if context["conversation_summary"]:
-                context_str += "\nResumen de la conversación:\n"
-                for summary in context["conversation_summary"][-5:]:  # Últimos 5 puntos del resumen
-                    context_str += f"- {summary}\n"
-            
+        context_str = self._get_rendered_context(session_id)
+        if context_str is None and self.conversation_log is not None:
+            # El contexto pudo renderizarse en otro worker o antes de salir de memoria
+            context_str = await self.conversation_log.get_context(session_id)
+        if context_str is not None:
             context_message = {
                 "role": "system",
                 "content": context_str,
@@ -215,6 +298,8 @@ class BaseChatbotMemory(AbstractChatbotMemory):
     
     async def clear_history(self, session_id: str) -> None:
         """Limpia el historial y el contexto de una sesión específica"""
-        self._message_history = [msg for msg in self._message_history if msg["session_id"] != session_id]
+        if self.conversation_log is not None:
+            await self.conversation_log.clear(session_id)
+        self._message_history.clear(session_id)
         if session_id in self._session_context:
             del self._session_context[session_id]
@@ -0,0 +1,135 @@
+"""Registro único de conversaciones compartido por la memoria del Bot y ChatManager."""
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..common.constants import ASSISTANT_ROLE, USER_ROLE
+from ..database.mongodb import MongodbClient
+from .hot_session_cache import BaseHotSessionCache, LocalHotSessionCache
+from .session_store import SessionMessageStore
+
+logger = logging.getLogger(__name__)
+
+# Roles de la memoria del Bot -> roles persistidos en MongoDB
+_ROLE_ALIASES = {"human": USER_ROLE, "ai": ASSISTANT_ROLE}
+
+
+def normalize_role(role: str) -> str:
+    """Rol tal como se persiste ("human" -> "user", "ai" -> "assistant")."""
+    return _ROLE_ALIASES.get(role, role)
+
+
+class ConversationLog:
+    """Una escritura por mensaje y una sola ruta de lectura para cada conversación.
+
+    Los mensajes se persisten una vez en MongoDB (MongodbClient, con su buffer de
+    escritura) y la ventana reciente de cada conversación activa, junto con su
+    contexto renderizado, se mantiene en la caché de sesiones activas (Redis o LRU
+    local). Las lecturas dentro de la ventana no tocan MongoDB; si la conversación no
+    está en caché se carga su ventana una vez y a partir de ahí se mantiene con cada
+    escritura (write-through).
+    """
+
+    def __init__(
+        self,
+        db: MongodbClient,
+        window_size: int = 50,
+        ttl_seconds: Optional[float] = 3600,
+        max_sessions: int = 10000,
+        hot_cache: Optional[BaseHotSessionCache] = None
+    ):
+        """Inicializa el registro.
+
+        Args:
+            db: Cliente de MongoDB donde se persisten los mensajes.
+            window_size: Mensajes recientes por conversación que se mantienen en caché.
+            ttl_seconds: Inactividad tras la que una conversación deja de estar activa en este proceso.
+            max_sessions: Conversaciones activas máximas en este proceso.
+            hot_cache: Caché de sesiones activas (por defecto, LRU local con el mismo TTL).
+        """
+        self.db = db
+        self.window_size = window_size
+        self.hot_cache = hot_cache or LocalHotSessionCache(
+            window_size=window_size, ttl_seconds=ttl_seconds or 0, max_sessions=max_sessions
+        )
+        self._eviction_listeners: List[Callable[[str], Any]] = []
+        # Actividad por conversación en este proceso: avisa a los listeners aunque la caché esté en Redis
+        self._active = SessionMessageStore(
+            capacity=1, ttl_seconds=ttl_seconds, max_sessions=max_sessions, on_evict=self._on_evict
+        )
+        self.stats = {"hot_reads": 0, "cold_reads": 0, "writes": 0}
+
+    def add_eviction_listener(self, listener: Callable[[str], Any]) -> None:
+        """Registra una función que recibe el id de cada conversación que sale de memoria."""
+        self._eviction_listeners.append(listener)
+
+    def _on_evict(self, conversation_id: str) -> None:
+        for listener in self._eviction_listeners:
+            listener(conversation_id)
+
+    def _touch(self, conversation_id: str) -> None:
+        self._active.store(conversation_id, {})
+
+    async def append_messages(self, conversation_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Persiste los mensajes (role, content) en una sola escritura y actualiza la ventana."""
+        messages = [(normalize_role(role), content) for role, content in messages]
+        # Invalida las cargas de la ventana desde MongoDB que estén en curso
+        await self.hot_cache.begin_write(conversation_id)
+        stored = await self.db.add_messages(conversation_id, messages)
+        self.stats["writes"] += 1
+        self._touch(conversation_id)
+        # La ventana guarda los mismos timestamp e id que MongoDB
+        await self.hot_cache.append(conversation_id, stored)
+
+    async def append(self, conversation_id: str, role: str, content: str) -> None:
+        await self.append_messages(conversation_id, [(role, content)])
+
+    async def get_window(self, conversation_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Últimos `limit` mensajes (por defecto toda la ventana) en orden cronológico."""
+        limit = self.window_size if limit is None else limit
+        self._touch(conversation_id)
+        if limit > self.window_size:
+            # Fuera de la ventana en caché: leer directamente de MongoDB
+            self.stats["cold_reads"] += 1
+            return await self.db.get_conversation_history(conversation_id, limit=limit, max_tokens=0)
+        window = await self.hot_cache.get_window(conversation_id)
+        if window is not None:
+            self.stats["hot_reads"] += 1
+        else:
+            self.stats["cold_reads"] += 1
+            version = await self.hot_cache.begin_load(conversation_id)
+            window = await self.db.get_conversation_history(conversation_id, limit=self.window_size, max_tokens=0)
+            if not await self.hot_cache.set_window(conversation_id, window, version):
+                # Hubo una escritura durante la carga: la ventana leída puede no incluirla.
+                # Se relee (sin cachear) y la próxima lectura vuelve a cargarla.
+                window = await self.db.get_conversation_history(
+                    conversation_id, limit=self.window_size, max_tokens=0
+                )
+        return window[-limit:] if limit > 0 else []
+
+    async def get_context(self, conversation_id: str) -> Optional[str]:
+        """Contexto renderizado de la conversación guardado en la caché (p. ej. por otro worker)."""
+        return await self.hot_cache.get_context(conversation_id)
+
+    async def set_context(self, conversation_id: str, context: str) -> None:
+        await self.hot_cache.set_context(conversation_id, context)
+
+    async def clear(self, conversation_id: str) -> None:
+        """Elimina la conversación de MongoDB y de la caché."""
+        self._active.clear(conversation_id)
+        await self.hot_cache.delete(conversation_id)
+        await self.db.clear_conversation_history(conversation_id)
+
+    async def close(self) -> None:
+        """Escribe lo pendiente (el cliente compartido se cierra en el lifespan)."""
+        await self.db.close()
+        close_cache = getattr(self.hot_cache, "close", None)
+        if close_cache is not None:
+            await close_cache()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active_sessions": len(self._active),
+            "hot_cache": self.hot_cache.get_stats(),
+            "write_buffer": self.db.write_buffer.get_stats(),
+        }
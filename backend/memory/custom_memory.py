@@ -1,56 +1,59 @@
 import json
-from typing import List, Optional, Dict, Any
-from pymongo import MongoClient, errors
+from typing import List, Optional, Dict, Any, Tuple
+from pymongo import ReturnDocument, errors
 import logging
 import datetime
 from datetime import timezone
 
 from langchain_core.chat_history import BaseChatMessageHistory
-from langchain_core.messages import BaseMessage, messages_from_dict as lc_messages_from_dict, messages_to_dict as lc_messages_to_dict
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, messages_from_dict as lc_messages_from_dict, messages_to_dict as lc_messages_to_dict
 from langchain.memory.chat_memory import BaseChatMemory
 
 from ..common.objects import MessageTurn # Se usará para la estructura en BD, pero no directamente para ChatMessageHistory
+from ..common.constants import USER_ROLE
 from ..config import Settings
 from .base_memory import AbstractChatbotMemory, BaseChatbotMemory
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from ..database.client_registry import default_database_name, mongo_registry
+
 
 class _CustomMongoPersistence:
-    """Clase interna para manejar la lógica de persistencia directa con MongoDB."""
+    """Clase interna para manejar la lógica de persistencia directa con MongoDB.
+
+    Con un ConversationLog (el registro compartido con ChatManager) los mensajes se
+    leen y escriben allí, en la colección de mensajes única; la colección propia
+    solo se usa cuando la memoria se crea sin él.
+    """
     def __init__(
             self,
             settings: Settings,
             # session_id aquí se refiere al ID de la conversación específica.
             conversation_id: str, 
-            k: int
+            k: int,
+            conversation_log: Optional[Any] = None
     ):
         self.settings = settings
         self.logger = logging.getLogger(self.__class__.__name__)
         self.connection_string = self.settings.mongo_uri.get_secret_value()
         self.conversation_id = conversation_id # ID de la conversación para esta instancia de persistencia
         self.k = k # Límite de mensajes a cargar
+        self.conversation_log = conversation_log
 
-        try:
-            temp_sync_client = MongoClient(self.connection_string)
-            parsed_db_name = temp_sync_client.get_default_database().name
-            self.database_name = parsed_db_name if parsed_db_name else getattr(self.settings, 'mongo_database_name', "chatbot_db")
-            if not parsed_db_name:
-                 self.logger.warning(f"MongoDB URI no especifica una BD. Usando: {self.database_name}")
-            temp_sync_client.close()
-        except Exception as e:
-            self.logger.error(f"Error al parsear nombre de BD de URI MongoDB '{self.connection_string}': {e}. Usando default.")
-            self.database_name = getattr(self.settings, 'mongo_database_name', "chatbot_db")
-            
+        # Sin cliente temporal: el nombre de la BD se toma de la URI sin conectar
+        self.database_name = default_database_name(
+            self.connection_string, getattr(self.settings, 'mongo_database_name', "chatbot_db")
+        )
         self.collection_name = self.settings.mongo_collection_name
 
-        try:
-            self.client: AsyncIOMotorClient = AsyncIOMotorClient(self.connection_string)
-        except Exception as error:
-            self.logger.error(f"Fallo al configurar cliente AsyncIOMotorClient: {error}")
-            raise
+        # Cliente Motor compartido por todas las instancias (un solo pool por proceso)
+        self.client: AsyncIOMotorClient = mongo_registry.get_client(self.settings)
 
         self.db = self.client[self.database_name]
         self.collection = self.db[self.collection_name]
+        # Contador de secuencia por conversación (un documento por ConversationId)
+        self.counters = self.db[f"{self.collection_name}_counters"]
+        self._indexes_ready = False
         # El campo SessionId en el documento de MongoDB podría ser el mismo que ConversationId
         # o un identificador de sesión de usuario más amplio.
         # Para esta implementación, asumiremos que el 'conversation_id' es el identificador principal.
@@ -60,81 +63,127 @@ class _CustomMongoPersistence:
             self.logger.info(f"Asegurando índices para la colección {self.collection_name}...")
             # Índice para buscar por ConversationId y ordenar por timestamp
             await self.collection.create_index([("ConversationId", 1), ("timestamp", -1)])
+            # Orden de los mensajes dentro de la conversación (lecturas por ventana)
+            await self.collection.create_index(
+                [("ConversationId", 1), ("seq", -1)],
+                unique=True,
+                partialFilterExpression={"seq": {"$exists": True}}  # Los mensajes antiguos no tienen seq
+            )
+            self._indexes_ready = True
             self.logger.info("Índices asegurados.")
         except Exception as e:
-            self.logger.error(f"Fallo al crear índice en (ConversationId, timestamp): {e}")
-
-    async def load_messages(self) -> List[Dict[str, Any]]:
-        """Carga los últimos k mensajes para la conversation_id actual y los devuelve como una lista de dicts."""
-        if not self.conversation_id:
+            self.logger.error(f"Fallo al crear índices en {self.collection_name}: {e}")
+
+    async def _ensure_indexes(self) -> None:
+        """Crea los índices la primera vez que se usa la colección (no en el constructor)."""
+        if not self._indexes_ready:
+            await self.create_indexes()
+
+    async def _reserve_seq(self, count: int, conversation_id: str) -> int:
+        """Reserva `count` números de secuencia consecutivos y devuelve el primero.
+
+        El contador por conversación se incrementa de forma atómica con $inc, así que
+        la secuencia es monótona aunque escriban varias instancias a la vez.
+        """
+        counter = await self.counters.find_one_and_update(
+            {"_id": conversation_id},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"] - count + 1
+
+    @staticmethod
+    def _log_to_message_dicts(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mensajes del ConversationLog (role, content) en el formato de lc_messages_to_dict."""
+        return lc_messages_to_dict([
+            HumanMessage(content=message["content"]) if message["role"] in ("human", USER_ROLE)
+            else AIMessage(content=message["content"])
+            for message in messages
+            if message["role"] != "system"
+        ])
+
+    async def load_messages(self, conversation_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Carga los últimos k mensajes de la conversación (por defecto la actual) como una lista de dicts."""
+        conversation_id = conversation_id or self.conversation_id
+        if not conversation_id:
             self.logger.error("No se puede cargar: conversation_id no está configurado.")
             return []
         
         try:
-            # Cargar los 'k' mensajes más recientes para la conversación
+            if self.conversation_log is not None:
+                return self._log_to_message_dicts(await self.conversation_log.get_window(conversation_id, self.k))
+            await self._ensure_indexes()
+            # Ventana de los 'k' mensajes más recientes (índice (ConversationId, seq)).
+            # Cada documento es un mensaje individual serializado con lc_messages_to_dict.
             cursor = self.collection.find(
-                {"ConversationId": self.conversation_id} # Filtrar por el ID de la conversación
-            ).sort("timestamp", -1).limit(self.k) # Ordenar por más reciente y aplicar límite
-            
-            # Los documentos almacenan un MessageTurn completo en 'History'. Necesitamos extraer los mensajes individuales.
-            # O, mejor, almacenar mensajes individuales en MongoDB.
-            # Por ahora, asumimos que 'History' contiene un dict que puede ser convertido a BaseMessage
-            # Esto necesita una revisión de cómo se guardan los mensajes.
-            # Idealmente, cada documento en MongoDB es un mensaje individual, no un MessageTurn.
-            
-            # Asumiendo que cada documento en la colección ES un mensaje individual con campos 'type' y 'content'
-            # y un campo 'timestamp'.
-            # Si 'History' en el documento es una lista de mensajes, la lógica cambiaría.
-            # Si 'History' es un MessageTurn serializado, también.
-
-            # Simplificación: Asumimos que cada documento es un mensaje serializado por lc_messages_to_dict
+                {"ConversationId": conversation_id},
+                {"message_data": 1, "_id": 0}
+            ).sort("seq", -1).limit(self.k)
             raw_messages = await cursor.to_list(length=self.k)
-            # Los mensajes se cargan en orden descendente de tiempo, así que los invertimos para orden cronológico
+            # Los mensajes se cargan en orden descendente, así que los invertimos para orden cronológico
             return [doc["message_data"] for doc in reversed(raw_messages) if "message_data" in doc]
 
         except Exception as e:
-            self.logger.error(f"Error cargando mensajes para conversation_id <{self.conversation_id}>: {e}")
+            self.logger.error(f"Error cargando mensajes para conversation_id <{conversation_id}>: {e}")
             return []
 
-    async def save_messages(self, messages: List[Dict[str, Any]]):
-        """Guarda una lista de mensajes para la conversation_id actual.
-           Reemplaza todos los mensajes existentes para esta conversación con la nueva lista."""
-        if not self.conversation_id:
+    async def append_messages(self, messages: List[Dict[str, Any]], conversation_id: Optional[str] = None):
+        """Añade mensajes nuevos al final de la conversación (registro de solo inserción).
+
+        Solo se escriben los mensajes recibidos, con un número de secuencia creciente;
+        los ya guardados no se tocan, así que el coste no depende del tamaño del historial
+        y un fallo a mitad de escritura no borra nada. Con ConversationLog, todos los
+        mensajes van en una sola escritura al registro compartido.
+        """
+        conversation_id = conversation_id or self.conversation_id
+        if not conversation_id:
             self.logger.error("No se puede guardar: conversation_id no está configurado.")
             return
+        if not messages:
+            return
 
         try:
-            # Eliminar mensajes antiguos para esta conversación
-            self.logger.info(f"Eliminando mensajes antiguos para conversation_id <{self.conversation_id}> antes de guardar los nuevos.")
-            await self.collection.delete_many({"ConversationId": self.conversation_id})
-
-            if not messages:
-                self.logger.info(f"No hay mensajes para guardar para conversation_id <{self.conversation_id}>.")
+            if self.conversation_log is not None:
+                await self.conversation_log.append_messages(
+                    conversation_id,
+                    [(msg_dict["type"], msg_dict["data"]["content"]) for msg_dict in messages]
+                )
                 return
-
-            documents_to_insert = []
-            for msg_dict in messages:
-                documents_to_insert.append({
-                    "ConversationId": self.conversation_id,
+            await self._ensure_indexes()
+            first_seq = await self._reserve_seq(len(messages), conversation_id)
+            now = datetime.datetime.now(timezone.utc)
+            documents_to_insert = [
+                {
+                    "ConversationId": conversation_id,
+                    "seq": first_seq + offset,
                     "message_data": msg_dict, # Guardar el dict del mensaje directamente
-                    "timestamp": datetime.datetime.now(timezone.utc) # Podría tomarse del mensaje si existe
-                })
-            
-            self.logger.info(f"Guardando {len(documents_to_insert)} mensajes para conversation_id <{self.conversation_id}>.")
-            await self.collection.insert_many(documents_to_insert)
+                    "timestamp": now
+                }
+                for offset, msg_dict in enumerate(messages)
+            ]
+            self.logger.debug(f"Añadiendo {len(documents_to_insert)} mensajes a conversation_id <{conversation_id}>.")
+            if len(documents_to_insert) == 1:
+                await self.collection.insert_one(documents_to_insert[0])
+            else:
+                await self.collection.insert_many(documents_to_insert, ordered=True)
         except Exception as e:
-            self.logger.error(f"Error guardando mensajes para conversation_id <{self.conversation_id}>: {e}")
+            self.logger.error(f"Error guardando mensajes para conversation_id <{conversation_id}>: {e}")
 
-    async def clear_messages(self):
-        """Limpia todos los mensajes para la conversation_id actual."""
-        if not self.conversation_id:
+    async def clear_messages(self, conversation_id: Optional[str] = None):
+        """Limpia todos los mensajes de la conversación (por defecto la actual)."""
+        conversation_id = conversation_id or self.conversation_id
+        if not conversation_id:
             self.logger.error("No se puede limpiar: conversation_id no está configurado.")
             return
         try:
-            self.logger.info(f"Eliminando todos los mensajes para conversation_id <{self.conversation_id}>.")
-            await self.collection.delete_many({"ConversationId": self.conversation_id})
+            self.logger.info(f"Eliminando todos los mensajes para conversation_id <{conversation_id}>.")
+            if self.conversation_log is not None:
+                await self.conversation_log.clear(conversation_id)
+                return
+            await self.collection.delete_many({"ConversationId": conversation_id})
         except Exception as e:
-            self.logger.error(f"Error limpiando mensajes para conversation_id <{self.conversation_id}>: {e}")
+            self.logger.error(f"Error limpiando mensajes para conversation_id <{conversation_id}>: {e}")
 
 
 class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
@@ -146,6 +195,7 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
     output_key: Optional[str]
     return_messages: bool
     logger: Optional[Any] = None  # Añadir este campo
+    conversation_log: Optional[Any] = None  # Registro compartido con ChatManager (ConversationLog)
     
     def __init__(self, 
                  settings: Settings, 
@@ -155,6 +205,7 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
                  input_key: Optional[str] = None,
                  output_key: Optional[str] = None,
                  return_messages: bool = False, 
+                 conversation_log: Optional[Any] = None,
                  **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
         
         # Recopilar todos los argumentos para pasarlos a super().__init__()
@@ -167,6 +218,7 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
             "input_key": input_key,
             "output_key": output_key,
             "return_messages": return_messages,
+            "conversation_log": conversation_log,
             **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
         }
         super().__init__(**all_args) 
@@ -177,7 +229,8 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
         self._persistence = _CustomMongoPersistence(
             settings=self.settings, # self.settings ahora está poblado por Pydantic
             conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
+            k=self.k_history, # self.k_history ahora está poblado
+            conversation_log=self.conversation_log
         )
         # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
 
@@ -209,271 +262,53 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
 
 
     async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
+        """Añade el input y output a self.chat_memory y persiste en MongoDB solo esos dos mensajes."""
         # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
         # Esto requiere que input_key y output_key estén definidos si se usan.
         # O podemos añadir manualmente:
         # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
         # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
+        previous_count = len(self.chat_memory.messages)
         await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
+        await self._persist_new_messages(previous_count)
 
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
-
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-# Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
-
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
+    async def _persist_new_messages(self, previous_count: int) -> None:
+        """Guarda solo los mensajes añadidos a self.chat_memory desde previous_count.
 
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
+        Después recorta self.chat_memory a la ventana de k mensajes para que no crezca
+        sin límite (el historial completo queda en MongoDB).
+        """
+        new_messages = self.chat_memory.messages[previous_count:]
+        await self._persistence.append_messages(lc_messages_to_dict(new_messages))
+        if len(self.chat_memory.messages) > self.k_history:
+            self.chat_memory.messages = self.chat_memory.messages[-self.k_history:]
 
     async def aclear(self) -> None:
         """Limpia self.chat_memory y los mensajes en MongoDB."""
         await super().aclear() # Limpia self.chat_memory
         await self._persistence.clear_messages()
 
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-# Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
+    # --- Interfaz de AbstractChatbotMemory (la que usa el Bot, por session_id) ---
+    async def add_message(self, session_id: str, role: str, content: str) -> None:
+        await self.add_messages(session_id, [(role, content)])
 
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
+    async def add_messages(self, session_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Persiste los mensajes (role, content) de un turno en una sola escritura."""
+        lc_messages = [
+            HumanMessage(content=content) if role in ("human", USER_ROLE) else AIMessage(content=content)
+            for role, content in messages
+        ]
+        await self._persistence.append_messages(lc_messages_to_dict(lc_messages), conversation_id=session_id)
 
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
+    async def get_history(self, session_id: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
+        message_dicts = await self._persistence.load_messages(conversation_id=session_id)
+        return [
+            {"role": "human" if msg.type == "human" else "ai", "content": msg.content, "session_id": session_id}
+            for msg in lc_messages_from_dict(message_dicts)
+        ]
 
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
+    async def clear_history(self, session_id: str) -> None:
+        await self._persistence.clear_messages(conversation_id=session_id)
 
     # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
     def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
@@ -492,6 +327,7 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
     # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
     async def add_message_custom(self, role: str, content: str) -> None:
         """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
+        previous_count = len(self.chat_memory.messages)
         if role == "human":
             self.chat_memory.add_user_message(content)
         elif role == "ai":
@@ -499,8 +335,7 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
         else:
             self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
         
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
+        await self._persist_new_messages(previous_count)
 
     async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
         """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
@@ -511,628 +346,3 @@ class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
 # La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
 # para _CustomMongoPersistence si se quiere una separación más formal.
 # Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
-
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
-
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
-
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-# Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
-
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
-
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
-
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-# Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
-
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
-
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
-
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-# Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
-
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
-
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
-
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-# Por ahora, _CustomMongoPersistence está integrada.
-
-class CustomMongoChatbotMemory(BaseChatMemory): # Hereda solo de BaseChatMemory
-    settings: Settings
-    conversation_id: str  # ID de la conversación actual
-    k_history: int        # Número de mensajes a recordar
-    memory_key: str       # Clave para el historial en el prompt. Default se puede poner aquí o en __init__
-    input_key: Optional[str]
-    output_key: Optional[str]
-    return_messages: bool
-    logger: Optional[Any] = None  # Añadir este campo
-    
-    def __init__(self, 
-                 settings: Settings, 
-                 conversation_id: str = "default_conversation",
-                 k_history: int = 10, # MODIFICADO: k a k_history
-                 memory_key: str = "history", 
-                 input_key: Optional[str] = None,
-                 output_key: Optional[str] = None,
-                 return_messages: bool = False, 
-                 **kwargs): # kwargs para campos de BaseChatMemory no listados explícitamente
-        
-        # Recopilar todos los argumentos para pasarlos a super().__init__()
-        # Esto permite que Pydantic (BaseModel en BaseChatMemory) inicialice todos los campos.
-        all_args = {
-            "settings": settings,
-            "conversation_id": conversation_id,
-            "k_history": k_history,
-            "memory_key": memory_key,
-            "input_key": input_key,
-            "output_key": output_key,
-            "return_messages": return_messages,
-            **kwargs  # Incluir cualquier otro argumento destinado a BaseChatMemory
-        }
-        super().__init__(**all_args) 
-        
-        # Inicialización de atributos que no son campos Pydantic o lógica post-inicialización
-        self.logger = logging.getLogger(self.__class__.__name__)
-
-        self._persistence = _CustomMongoPersistence(
-            settings=self.settings, # self.settings ahora está poblado por Pydantic
-            conversation_id=self.conversation_id, # self.conversation_id ahora está poblado
-            k=self.k_history # self.k_history ahora está poblado
-        )
-        # self.chat_memory ya está inicializado por BaseChatMemory como ChatMessageHistory()
-
-    @property
-    def memory_variables(self) -> List[str]:
-        return [self.memory_key]
-
-    async def aload_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """Carga los mensajes desde MongoDB, los pone en self.chat_memory y devuelve el historial formateado."""
-        message_dicts = await self._persistence.load_messages()
-        self.chat_memory.messages = lc_messages_from_dict(message_dicts) # Poblar ChatMessageHistory
-        
-        # Ahora usamos la lógica de BaseChatMemory para obtener el buffer/string
-        # o la lista de mensajes según self.return_messages
-        if self.return_messages:
-            return {self.memory_key: self.chat_memory.messages[-self.k_history:]} # Devolver últimos k mensajes
-        else:
-            # Obtener el buffer de string usando la lógica de la clase base (si es una subclase como ConversationBufferMemory)
-            # o formatearlo manualmente si es necesario.
-            # Para BaseChatMemory simple, podríamos necesitar formatear los mensajes a string aquí.
-            # Por ahora, asumimos que el agente puede manejar una lista de BaseMessage si return_messages=True
-            # o que el prompt espera una cadena formateada que debemos construir.
-            # Si usamos ConversationChain, por ejemplo, espera una cadena.
-            # Vamos a usar un método simple para convertir a string por ahora si return_messages es False.
-            buffer_string = "\n".join(
-                [f"{msg.type.capitalize()}: {msg.content}" for msg in self.chat_memory.messages[-self.k_history:]]
-            )
-            return {self.memory_key: buffer_string}
-
-
-    async def asave_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        """Añade el input y output a self.chat_memory y luego persiste todos los mensajes a MongoDB."""
-        # Usar la lógica de BaseChatMemory para añadir los mensajes a self.chat_memory
-        # Esto requiere que input_key y output_key estén definidos si se usan.
-        # O podemos añadir manualmente:
-        # self.chat_memory.add_user_message(inputs[self.input_key or "input"])
-        # self.chat_memory.add_ai_message(outputs[self.output_key or "output"])
-        await super().asave_context(inputs, outputs) # Esto poblará self.chat_memory
-
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def aclear(self) -> None:
-        """Limpia self.chat_memory y los mensajes en MongoDB."""
-        await super().aclear() # Limpia self.chat_memory
-        await self._persistence.clear_messages()
-
-    # --- Métodos síncronos (opcional, pero BaseChatMemory los tiene) ---
-    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        # No recomendado para uso asíncrono, pero para completar la interfaz
-        self.logger.warning("Llamada síncrona a load_memory_variables. Esta memoria es principalmente asíncrona.")
-        # Debería implementar una carga síncrona si es necesario, o lanzar error.
-        # Por ahora, lanzamos error para forzar el uso asíncrono.
-        raise NotImplementedError("Usa aload_memory_variables en un contexto asíncrono.")
-
-    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
-        raise NotImplementedError("Usa asave_context en un contexto asíncrono.")
-
-    def clear(self) -> None:
-        raise NotImplementedError("Usa aclear en un contexto asíncrono.")
-
-    # --- Métodos adicionales que tenías (adaptados o eliminados si son redundantes) ---
-    async def add_message_custom(self, role: str, content: str) -> None:
-        """Método personalizado para añadir un mensaje (si es necesario fuera del flujo de save_context)."""
-        if role == "human":
-            self.chat_memory.add_user_message(content)
-        elif role == "ai":
-            self.chat_memory.add_ai_message(content)
-        else:
-            self.chat_memory.add_message(BaseMessage(content=content, type=role)) # O un tipo más específico
-        
-        message_dicts_to_save = lc_messages_to_dict(self.chat_memory.messages)
-        await self._persistence.save_messages(message_dicts_to_save)
-
-    async def get_history_custom(self) -> List[BaseMessage]: # Devuelve lista de BaseMessage
-        """Método personalizado para obtener el historial (si es necesario fuera de aload_memory_variables)."""
-        # Recargar desde la persistencia para asegurar frescura, o usar self.chat_memory si se confía que está actualizada.
-        message_dicts = await self._persistence.load_messages()
-        return lc_messages_from_dict(message_dicts)
-
-# La clase MongoMessageStore que tenías antes podría ser una alternativa o inspiración
-# para _CustomMongoPersistence si se quiere una separación más formal.
-#
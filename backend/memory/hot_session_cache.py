@@ -0,0 +1,339 @@
+"""Caché de sesiones activas (últimos mensajes y contexto renderizado) delante de MongoDB."""
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from .session_store import SessionMessageStore
+
+logger = logging.getLogger(__name__)
+
+
+class HotSessionCacheTypes(str, Enum):
+    AUTO = "auto"    # Redis si REDIS_URL está configurada; si no, local
+    REDIS = "redis"
+    LOCAL = "local"
+
+
+class BaseHotSessionCache(ABC):
+    """Ventana de los últimos N mensajes y contexto renderizado de cada conversación activa.
+
+    Las conversaciones que no se usan durante `ttl_seconds` salen de la caché (se
+    degradan a MongoDB) y se vuelven a cargar en la siguiente lectura.
+    """
+
+    def __init__(self, window_size: int, ttl_seconds: int):
+        self.window_size = window_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def _get_window(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        ...
+
+    async def get_window(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Ventana de la conversación, o None si no está en caché."""
+        window = await self._get_window(conversation_id)
+        if window is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return window
+
+    @abstractmethod
+    async def begin_load(self, conversation_id: str) -> int:
+        """Versión de escritura de la conversación antes de leer su ventana de MongoDB."""
+
+    @abstractmethod
+    async def set_window(self, conversation_id: str, messages: List[Dict[str, Any]], version: int) -> bool:
+        """Guarda la ventana cargada de MongoDB solo si no hubo escrituras desde begin_load.
+
+        Una escritura durante la carga no llega a la caché (append no crea ventanas),
+        así que la ventana leída estaría incompleta: en ese caso no se guarda y se
+        devuelve False.
+        """
+
+    @abstractmethod
+    async def begin_write(self, conversation_id: str) -> None:
+        """Incrementa la versión de escritura antes de persistir mensajes en MongoDB."""
+
+    @abstractmethod
+    async def append(self, conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Añade mensajes a la ventana si la conversación está en caché (write-through).
+
+        Incrementa siempre la versión de escritura de la conversación: junto con
+        begin_write, una carga que empiece en cualquier punto de la escritura no se
+        guarda (le faltaría el mensaje o lo tendría duplicado tras el append).
+        """
+
+    @abstractmethod
+    async def get_context(self, conversation_id: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def set_context(self, conversation_id: str, context: str) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, conversation_id: str) -> None:
+        ...
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend_name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "window_size": self.window_size,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+    backend_name = "base"
+
+
+class LocalHotSessionCache(BaseHotSessionCache):
+    """Caché en el proceso (LRU con TTL); se usa cuando no hay Redis."""
+
+    backend_name = HotSessionCacheTypes.LOCAL.value
+
+    def __init__(self, window_size: int = 50, ttl_seconds: int = 900, max_sessions: int = 10000):
+        super().__init__(window_size, ttl_seconds)
+        self._windows = SessionMessageStore(capacity=window_size, ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+        self._contexts = SessionMessageStore(capacity=1, ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+        self.max_sessions = max_sessions
+        # Versión de escritura por conversación (LRU acotado)
+        self._versions: "OrderedDict[str, int]" = OrderedDict()
+
+    async def _get_window(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        # None también si la ventana caducó: ConversationLog la recarga de MongoDB
+        return self._windows.get(conversation_id)
+
+    async def begin_load(self, conversation_id: str) -> int:
+        return self._versions.get(conversation_id, 0)
+
+    async def set_window(self, conversation_id: str, messages: List[Dict[str, Any]], version: int) -> bool:
+        if self._versions.get(conversation_id, 0) != version:
+            return False
+        self._windows.replace(conversation_id, messages)
+        return True
+
+    async def begin_write(self, conversation_id: str) -> None:
+        self._bump_version(conversation_id)
+
+    def _bump_version(self, conversation_id: str) -> None:
+        self._versions[conversation_id] = self._versions.get(conversation_id, 0) + 1
+        self._versions.move_to_end(conversation_id)
+        while len(self._versions) > self.max_sessions:
+            self._versions.popitem(last=False)
+
+    async def append(self, conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+        self._bump_version(conversation_id)
+        for message in messages:
+            if not self._windows.store_if_present(conversation_id, message):
+                return
+
+    async def get_context(self, conversation_id: str) -> Optional[str]:
+        context = self._contexts.get(conversation_id)
+        return context[0]["text"] if context else None
+
+    async def set_context(self, conversation_id: str, context: str) -> None:
+        self._contexts.store(conversation_id, {"text": context})
+
+    async def delete(self, conversation_id: str) -> None:
+        self._windows.clear(conversation_id)
+        self._contexts.clear(conversation_id)
+        self._versions.pop(conversation_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "sessions": len(self._windows)}
+
+
+class RedisHotSessionCache(BaseHotSessionCache):
+    """Caché en Redis compartida por todos los workers.
+
+    Cada conversación es una lista con los mensajes en JSON (RPUSHX + LTRIM para
+    añadir solo a ventanas ya cargadas), una cadena con el contexto renderizado y
+    un contador de escrituras (INCR) con el que una carga desde MongoDB solo se
+    guarda (WATCH/MULTI) si ningún worker escribió mientras tanto.
+    Cada acceso renueva el TTL, así que solo caducan las conversaciones inactivas.
+    Usa únicamente comandos básicos (list/string/expire/watch/pipeline), por lo que en
+    pruebas basta con un Redis local o un sustituto compatible como fakeredis.
+    """
+
+    backend_name = HotSessionCacheTypes.REDIS.value
+
+    def __init__(self, redis_client: Any, window_size: int = 50, ttl_seconds: int = 900, prefix: str = "hot_session"):
+        """Inicializa la caché.
+
+        Args:
+            redis_client: Cliente de redis.asyncio (o compatible).
+            window_size: Mensajes por conversación.
+            ttl_seconds: Inactividad tras la que la conversación sale de Redis.
+            prefix: Prefijo de las claves.
+        """
+        super().__init__(window_size, ttl_seconds)
+        self.redis = redis_client
+        self.prefix = prefix
+
+    def _messages_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}:{conversation_id}:messages"
+
+    def _context_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}:{conversation_id}:context"
+
+    def _version_key(self, conversation_id: str) -> str:
+        return f"{self.prefix}:{conversation_id}:version"
+
+    @staticmethod
+    def _dumps(message: Dict[str, Any]) -> str:
+        timestamp = message.get("timestamp")
+        if isinstance(timestamp, datetime):
+            message = {**message, "timestamp": timestamp.isoformat()}
+        return json.dumps(message, default=str, ensure_ascii=False)
+
+    @staticmethod
+    def _loads(raw: Any) -> Dict[str, Any]:
+        """Mensaje de la ventana con el timestamp como datetime, igual que desde MongoDB."""
+        message = json.loads(raw)
+        timestamp = message.get("timestamp")
+        if isinstance(timestamp, str):
+            try:
+                message["timestamp"] = datetime.fromisoformat(timestamp)
+            except ValueError:
+                pass
+        return message
+
+    async def _get_window(self, conversation_id: str) -> Optional[List[Dict[str, Any]]]:
+        key = self._messages_key(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(key)
+                pipe.lrange(key, 0, -1)
+                pipe.expire(key, self.ttl_seconds)
+                exists, raw_messages, _ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error leyendo la sesión {conversation_id} de Redis: {e}")
+            return None
+        if not exists:
+            return None
+        return [self._loads(raw) for raw in raw_messages]
+
+    async def begin_load(self, conversation_id: str) -> int:
+        try:
+            version = await self.redis.get(self._version_key(conversation_id))
+        except Exception as e:
+            logger.warning(f"Error leyendo la versión de la sesión {conversation_id} de Redis: {e}")
+            return -1
+        return int(version or 0)
+
+    async def set_window(self, conversation_id: str, messages: List[Dict[str, Any]], version: int) -> bool:
+        if version < 0:
+            return False
+        key = self._messages_key(conversation_id)
+        version_key = self._version_key(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(version_key)
+                if int(await pipe.get(version_key) or 0) != version:
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                if messages:
+                    pipe.rpush(key, *[self._dumps(m) for m in messages[-self.window_size:]])
+                    pipe.expire(key, self.ttl_seconds)
+                # Falla (WatchError) si otro worker incrementó la versión tras el WATCH
+                await pipe.execute()
+                return True
+        except Exception as e:
+            logger.debug(f"No se guardó la ventana de la sesión {conversation_id} en Redis: {e}")
+            return False
+
+    async def begin_write(self, conversation_id: str) -> None:
+        version_key = self._version_key(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.incr(version_key)
+                pipe.expire(version_key, self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error actualizando la versión de la sesión {conversation_id} en Redis: {e}")
+
+    async def append(self, conversation_id: str, messages: List[Dict[str, Any]]) -> None:
+        if not messages:
+            return
+        key = self._messages_key(conversation_id)
+        version_key = self._version_key(conversation_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.incr(version_key)
+                pipe.expire(version_key, self.ttl_seconds)
+                # RPUSHX no crea la lista: una ventana que no está cargada no queda incompleta
+                pipe.rpushx(key, *[self._dumps(m) for m in messages])
+                pipe.ltrim(key, -self.window_size, -1)
+                pipe.expire(key, self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Error actualizando la sesión {conversation_id} en Redis: {e}")
+
+    async def get_context(self, conversation_id: str) -> Optional[str]:
+        try:
+            context = await self.redis.get(self._context_key(conversation_id))
+        except Exception as e:
+            logger.warning(f"Error leyendo el contexto de {conversation_id} de Redis: {e}")
+            return None
+        if isinstance(context, bytes):
+            context = context.decode("utf-8")
+        return context
+
+    async def set_context(self, conversation_id: str, context: str) -> None:
+        try:
+            await self.redis.set(self._context_key(conversation_id), context, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"Error guardando el contexto de {conversation_id} en Redis: {e}")
+
+    async def delete(self, conversation_id: str) -> None:
+        try:
+            await self.redis.delete(
+                self._messages_key(conversation_id),
+                self._context_key(conversation_id),
+                self._version_key(conversation_id)
+            )
+        except Exception as e:
+            logger.warning(f"Error eliminando la sesión {conversation_id} de Redis: {e}")
+
+    async def close(self) -> None:
+        close = getattr(self.redis, "aclose", None) or getattr(self.redis, "close", None)
+        if close is not None:
+            await close()
+
+
+def create_hot_session_cache(settings: Any, window_size: Optional[int] = None) -> BaseHotSessionCache:
+    """Crea la caché de sesiones configurada (Redis si está disponible, local si no)."""
+    cache_type = HotSessionCacheTypes(getattr(settings, "hot_session_cache", HotSessionCacheTypes.AUTO.value))
+    window_size = window_size or settings.chat_history_window
+    ttl_seconds = settings.hot_session_ttl
+    redis_url = settings.redis_url.get_secret_value() if settings.redis_url else None
+
+    if cache_type != HotSessionCacheTypes.LOCAL and redis_url:
+        try:
+            # Import diferido: redis solo se carga si está configurado
+            import redis.asyncio as redis_asyncio
+
+            client = redis_asyncio.from_url(redis_url, socket_timeout=1.0, socket_connect_timeout=1.0)
+            logger.info("Caché de sesiones activas en Redis")
+            return RedisHotSessionCache(client, window_size=window_size, ttl_seconds=ttl_seconds)
+        except Exception as e:
+            logger.warning(f"No se pudo crear la caché de sesiones en Redis: {e}. Usando caché local.")
+    elif cache_type == HotSessionCacheTypes.REDIS:
+        logger.warning("HOT_SESSION_CACHE=redis pero REDIS_URL no está configurada. Usando caché local.")
+
+    return LocalHotSessionCache(
+        window_size=window_size,
+        ttl_seconds=ttl_seconds,
+        max_sessions=settings.memory_max_sessions
+    )
@@ -0,0 +1,230 @@
+"""Memoria a largo plazo: índice vectorial de los turnos pasados de cada conversación."""
+import asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..common.constants import USER_ROLE
+from ..rag.embeddings.quantization import normalize_rows
+from .base_memory import BaseChatbotMemory
+
+if TYPE_CHECKING:
+    from ..rag.embeddings.embedding_manager import EmbeddingManager
+
+
+class _TurnIndex:
+    """Embeddings normalizados (float32) de los turnos de una conversación, en orden."""
+
+    def __init__(self, max_turns: int):
+        self.max_turns = max_turns
+        self.texts: List[str] = []
+        self.vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, texts: List[str], vectors: np.ndarray) -> None:
+        vectors = normalize_rows(np.asarray(vectors, dtype=np.float32))
+        self.texts.extend(texts)
+        self.vectors = vectors if self.vectors is None else np.vstack((self.vectors, vectors))
+        if len(self.texts) > self.max_turns:
+            # Se descartan los turnos más antiguos
+            overflow = len(self.texts) - self.max_turns
+            del self.texts[:overflow]
+            self.vectors = self.vectors[overflow:]
+
+    def search(self, query_vector: np.ndarray, top_m: int, exclude_last: int, min_similarity: float) -> List[str]:
+        """Hasta top_m turnos más similares a la consulta, en orden cronológico."""
+        searchable = len(self.texts) - exclude_last
+        if searchable <= 0 or top_m <= 0:
+            return []
+        scores = self.vectors[:searchable] @ normalize_rows(query_vector.reshape(1, -1))[0]
+        if searchable > top_m:
+            candidates = np.argpartition(-scores, top_m - 1)[:top_m]
+        else:
+            candidates = np.arange(searchable)
+        selected = sorted(int(i) for i in candidates if scores[i] >= min_similarity)
+        return [self.texts[i] for i in selected]
+
+
+class LongTermChatbotMemory(BaseChatbotMemory):
+    """Memoria con ventana corta de mensajes recientes y recuperación semántica de turnos pasados.
+
+    Cada turno (mensaje del usuario + respuesta) se codifica con el EmbeddingManager
+    de la aplicación y se añade al índice de su conversación. En get_history solo se
+    devuelven los últimos `recent_messages` mensajes y los `top_m` turnos anteriores
+    más relevantes para la consulta actual, así que el tamaño del prompt no crece con
+    la duración de la sesión.
+    """
+
+    def __init__(
+        self,
+        embedding_manager: Optional["EmbeddingManager"] = None,
+        settings=None,
+        top_m: Optional[int] = None,
+        recent_messages: Optional[int] = None,
+        max_turns: Optional[int] = None,
+        rebuild_turns: Optional[int] = None,
+        min_similarity: Optional[float] = None,
+        **kwargs
+    ):
+        """Inicializa la memoria.
+
+        Args:
+            embedding_manager: EmbeddingManager compartido (sin él solo se usa la ventana reciente).
+            settings: Configuración de la aplicación.
+            top_m: Turnos pasados que se recuperan por consulta.
+            recent_messages: Mensajes recientes que se incluyen siempre.
+            max_turns: Turnos indexados por conversación (se descartan los más antiguos).
+            rebuild_turns: Turnos recientes que se reindexan desde MongoDB al cargar una conversación.
+            min_similarity: Similitud coseno mínima para incluir un turno.
+        """
+        self.top_m = top_m if top_m is not None else getattr(settings, 'long_term_memory_top_m', 4)
+        self.recent_messages = (
+            recent_messages if recent_messages is not None
+            else getattr(settings, 'long_term_memory_recent_messages', 4)
+        )
+        self.max_turns = max_turns if max_turns is not None else getattr(settings, 'long_term_memory_max_turns', 500)
+        self.rebuild_turns = min(self.max_turns, (
+            rebuild_turns if rebuild_turns is not None
+            else getattr(settings, 'long_term_memory_rebuild_turns', 50)
+        ))
+        self.min_similarity = (
+            min_similarity if min_similarity is not None
+            else getattr(settings, 'long_term_memory_min_similarity', 0.25)
+        )
+        # La ventana de mensajes que se envía al prompt es la de mensajes recientes
+        kwargs['k'] = self.recent_messages
+        super().__init__(settings=settings, **kwargs)
+        self.embedding_manager = embedding_manager
+        self._indexes: "OrderedDict[str, _TurnIndex]" = OrderedDict()
+        self._pending_user: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.max_sessions = getattr(settings, 'memory_max_sessions', 10000)
+        # Los índices se liberan junto con la sesión
+        self._message_history.on_evict = self._forget_session
+        if self.conversation_log is not None:
+            self.conversation_log.add_eviction_listener(self._forget_session)
+
+    def _forget_session(self, session_id: str) -> None:
+        self._session_context.pop(session_id, None)
+        self._indexes.pop(session_id, None)
+        self._pending_user.pop(session_id, None)
+        self._locks.pop(session_id, None)
+
+    @staticmethod
+    def _turn_text(user_content: Optional[str], assistant_content: str) -> str:
+        if user_content is None:
+            return f"Asistente: {assistant_content}"
+        return f"Usuario: {user_content}\nAsistente: {assistant_content}"
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        # La codificación es CPU: fuera del event loop
+        return np.asarray(await asyncio.to_thread(self.embedding_manager.embed_documents, texts), dtype=np.float32)
+
+    def _new_index(self, session_id: str) -> _TurnIndex:
+        index = _TurnIndex(self.max_turns)
+        self._indexes[session_id] = index
+        while len(self._indexes) > self.max_sessions:
+            self._forget_session(next(iter(self._indexes)))
+        return index
+
+    async def _get_index(self, session_id: str) -> Optional[_TurnIndex]:
+        """Índice de la conversación; con ConversationLog se reconstruye desde MongoDB la primera vez.
+
+        La reconstrucción ocurre dentro de la petición, así que solo se reindexan los
+        últimos `rebuild_turns` turnos; los turnos nuevos se siguen añadiendo hasta `max_turns`.
+        """
+        index = self._indexes.get(session_id)
+        if index is not None:
+            self._indexes.move_to_end(session_id)
+            return index
+        if self.conversation_log is None:
+            return None
+        async with self._locks.setdefault(session_id, asyncio.Lock()):
+            index = self._indexes.get(session_id)
+            if index is not None:
+                return index
+            messages = await self.conversation_log.get_window(session_id, self.rebuild_turns * 2)
+            texts, user_content = [], None
+            for message in messages:
+                if message["role"] in ("human", USER_ROLE):
+                    user_content = message["content"]
+                else:
+                    texts.append(self._turn_text(user_content, message["content"]))
+                    user_content = None
+            index = self._new_index(session_id)
+            if texts:
+                try:
+                    index.add(texts, await self._embed(texts))
+                except Exception as e:
+                    self.logger.warning(f"No se pudo reconstruir el índice de la sesión {session_id}: {e}")
+            if user_content is not None:
+                self._pending_user[session_id] = user_content
+            return index
+
+    async def add_message(self, session_id: str, role: str, content: str) -> None:
+        await self.add_messages(session_id, [(role, content)])
+
+    async def add_messages(self, session_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Añade los mensajes al historial y indexa los turnos que se completan."""
+        # El índice se reconstruye antes de registrar los mensajes para no indexarlos dos veces
+        index = await self._get_index(session_id) if self.embedding_manager is not None else None
+        await super().add_messages(session_id, messages)
+        if self.embedding_manager is None:
+            return
+        texts = []
+        for role, content in messages:
+            if role in ("human", USER_ROLE):
+                self._pending_user[session_id] = content
+            else:
+                texts.append(self._turn_text(self._pending_user.pop(session_id, None), content))
+        if not texts:
+            return
+        if index is None:
+            index = self._new_index(session_id)
+        try:
+            index.add(texts, await self._embed(texts))
+        except Exception as e:
+            self.logger.warning(f"No se pudo indexar el turno de la sesión {session_id}: {e}")
+
+    async def get_history(self, session_id: str, query: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Contexto de la sesión, turnos pasados relevantes para `query` y mensajes recientes."""
+        history = await super().get_history(session_id)
+        if not query or self.embedding_manager is None or self.top_m <= 0:
+            return history
+        index = await self._get_index(session_id)
+        if not index:
+            return history
+        try:
+            query_vector = (await self._embed([query]))[0]
+        except Exception as e:
+            self.logger.warning(f"No se pudo codificar la consulta de la sesión {session_id}: {e}")
+            return history
+        # Los turnos que ya están en la ventana reciente no se repiten
+        recent_turns = -(-self.recent_messages // 2)
+        relevant = index.search(query_vector, self.top_m, recent_turns, self.min_similarity)
+        if not relevant:
+            return history
+        memory_message = {
+            "role": "system",
+            "content": "Fragmentos relevantes de la conversación anterior:\n" + "\n---\n".join(relevant),
+            "session_id": session_id
+        }
+        # Después del contexto de la sesión (si lo hay) y antes de los mensajes recientes
+        position = 1 if history and history[0]["role"] == "system" else 0
+        history.insert(position, memory_message)
+        return history
+
+    async def clear_history(self, session_id: str) -> None:
+        await super().clear_history(session_id)
+        self._forget_session(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._indexes),
+            "indexed_turns": sum(len(index) for index in self._indexes.values()),
+            "top_m": self.top_m,
+            "recent_messages": self.recent_messages,
+        }
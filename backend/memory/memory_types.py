@@ -2,6 +2,7 @@ from enum import Enum
 from .mongo_memory import MongoChatbotMemory
 from .base_memory import BaseChatbotMemory
 from .custom_memory import CustomMongoChatbotMemory
+from .long_term_memory import LongTermChatbotMemory
 
 
 class MemoryTypes(str, Enum):
@@ -9,12 +10,14 @@ class MemoryTypes(str, Enum):
     BASE_MEMORY = "base-memory"
     MONGO_MEMORY = "mongodb-memory"
     CUSTOM_MEMORY = "custom-memory"
+    LONG_TERM_MEMORY = "long-term-memory"
 
 
 MEM_TO_CLASS = {
     "mongodb-memory": MongoChatbotMemory,
     "base-memory": BaseChatbotMemory,  # Corregido: Ahora usa BaseChatbotMemory para el tipo base
-    "custom-memory": CustomMongoChatbotMemory
+    "custom-memory": CustomMongoChatbotMemory,
+    "long-term-memory": LongTermChatbotMemory
 }
 
 
@@ -0,0 +1,152 @@
+"""Almacenamiento en memoria de mensajes por sesión con ventana fija, TTL y límite de sesiones."""
+import threading
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+
+class SessionMessageStore:
+    """Implementación de MessageStore con un deque de capacidad fija por sesión.
+
+    Añadir un mensaje y leer los últimos N es O(1)/O(N) y no depende del número de
+    sesiones activas. Las sesiones se mantienen en orden de último acceso: las que
+    llevan más de `ttl_seconds` sin usarse se descartan y, si se supera
+    `max_sessions`, se descarta la usada hace más tiempo.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 5,
+        ttl_seconds: Optional[float] = 3600,
+        max_sessions: int = 10000,
+        on_evict: Optional[Callable[[str], Any]] = None
+    ):
+        """Inicializa el almacén.
+
+        Args:
+            capacity: Mensajes que se conservan por sesión (los más antiguos se descartan).
+            ttl_seconds: Segundos de inactividad tras los que se descarta una sesión (None o 0 = sin TTL).
+            max_sessions: Número máximo de sesiones en memoria.
+            on_evict: Función a la que se pasa el session_id de cada sesión descartada
+                por TTL o por límite (p. ej. para liberar su contexto).
+        """
+        self.capacity = max(1, capacity)
+        self.ttl_seconds = ttl_seconds or None
+        self.max_sessions = max(1, max_sessions)
+        self.on_evict = on_evict
+        self._sessions: "OrderedDict[str, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _evict(self, session_id: str) -> None:
+        del self._sessions[session_id]
+        del self._last_access[session_id]
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(session_id)
+
+    def _evict_expired(self, now: float) -> None:
+        """Descarta las sesiones caducadas (están al principio del orden de acceso)."""
+        if self.ttl_seconds is None:
+            return
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._last_access[oldest] <= self.ttl_seconds:
+                break
+            self._evict(oldest)
+
+    def _touch(self, session_id: str, now: float) -> Optional[Deque[Dict[str, Any]]]:
+        messages = self._sessions.get(session_id)
+        if messages is not None:
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = now
+        return messages
+
+    def store(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Añade un mensaje al final de la ventana de la sesión."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            messages = self._touch(session_id, now)
+            if messages is None:
+                if len(self._sessions) >= self.max_sessions:
+                    self._evict(next(iter(self._sessions)))
+                messages = deque(maxlen=self.capacity)
+                self._sessions[session_id] = messages
+                self._last_access[session_id] = now
+            messages.append(message)
+
+    def store_if_present(self, session_id: str, message: Dict[str, Any]) -> bool:
+        """Añade el mensaje solo si la sesión ya está en memoria (para no crear ventanas incompletas)."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            messages = self._touch(session_id, now)
+            if messages is None:
+                return False
+            messages.append(message)
+            return True
+
+    def replace(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Sustituye la ventana de la sesión (p. ej. tras cargarla del almacenamiento persistente)."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            if session_id not in self._sessions and len(self._sessions) >= self.max_sessions:
+                self._evict(next(iter(self._sessions)))
+            self._sessions[session_id] = deque(messages, maxlen=self.capacity)
+            self._sessions.move_to_end(session_id)
+            self._last_access[session_id] = now
+
+    def retrieve(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Últimos `limit` mensajes de la sesión (todos los de la ventana por defecto), en orden."""
+        return self.get(session_id, limit) or []
+
+    def get(self, session_id: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Como retrieve, pero devuelve None si la sesión no está en memoria o ha caducado.
+
+        Distingue una sesión sin mensajes de una que hay que volver a cargar.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            messages = self._touch(session_id, now)
+            if messages is None:
+                return None
+            if limit is None or limit >= len(messages):
+                return list(messages)
+            if limit <= 0:
+                return []
+            recent = list(islice(reversed(messages), limit))
+        recent.reverse()
+        return recent
+
+    def clear(self, session_id: str) -> None:
+        """Elimina la sesión (sin invocar on_evict)."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._last_access.pop(session_id, None)
+
+    def __contains__(self, session_id: object) -> bool:
+        """La sesión está en memoria y no ha caducado (sin renovar su último acceso)."""
+        with self._lock:
+            last_access = self._last_access.get(session_id)
+            if last_access is None:
+                return False
+            return self.ttl_seconds is None or time.monotonic() - last_access <= self.ttl_seconds
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "messages": sum(len(messages) for messages in self._sessions.values()),
+                "capacity_per_session": self.capacity,
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,198 @@
+"""Resumen incremental de conversaciones largas para acotar el historial del prompt."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..common.constants import USER_ROLE
+from ..database.mongodb import approximate_token_count
+from ..prompt import CONVERSATION_SUMMARY_PROMPT
+
+logger = logging.getLogger(__name__)
+
+
+def _message_key(message: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Posición del mensaje en la conversación.
+
+    El id de MongoDB (ConversationLog) o el timestamp (historial en memoria) son
+    únicos, así que un mensaje repetido ("sí", "ok") no se confunde con uno anterior.
+    El timestamp se compara como texto: puede venir como datetime o como cadena ISO.
+    """
+    if message.get("id") is not None:
+        return ("id", str(message["id"]))
+    timestamp = message.get("timestamp")
+    if timestamp is not None:
+        return ("timestamp", timestamp.isoformat() if hasattr(timestamp, "isoformat") else str(timestamp))
+    return ("content", message.get("role"), message.get("content"))
+
+
+class ConversationSummarizer:
+    """Pliega los turnos antiguos de cada conversación en un resumen acumulado.
+
+    Cuando el historial supera `token_budget`, se conservan literalmente los
+    mensajes más recientes (al menos `keep_recent`) y los anteriores se sustituyen
+    por el resumen de la conversación. El resumen se actualiza con el LLM en una
+    tarea en segundo plano (una por conversación), de modo que ninguna petición
+    espera al LLM: mientras tanto se usa el último resumen disponible junto con los
+    mensajes antiguos que aún no incluye, así que nunca se pierde información.
+    """
+
+    def __init__(
+        self,
+        llm: Any,
+        token_budget: int = 1500,
+        keep_recent: int = 6,
+        max_summary_words: int = 200,
+        max_sessions: int = 10000,
+        token_counter: Optional[Callable[[str], int]] = None
+    ):
+        """Inicializa el resumidor.
+
+        Args:
+            llm: Modelo de LangChain (ainvoke) con el que se generan los resúmenes.
+            token_budget: Tokens máximos del historial antes de resumir.
+            keep_recent: Mensajes recientes que nunca se resumen.
+            max_summary_words: Longitud máxima del resumen.
+            max_sessions: Resúmenes que se conservan (se descarta el usado hace más tiempo).
+            token_counter: Función que estima los tokens de un texto.
+        """
+        self.llm = llm
+        self.token_budget = token_budget
+        self.keep_recent = max(1, keep_recent)
+        self.max_summary_words = max_summary_words
+        self.max_sessions = max(1, max_sessions)
+        self.token_counter = token_counter or approximate_token_count
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._last_folded: Dict[str, Tuple[Any, ...]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.stats = {
+            "compactions": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "summaries": 0,
+            "summary_errors": 0,
+            "summary_seconds": 0.0,
+        }
+
+    def _count(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.token_counter(message["content"]) for message in messages)
+
+    def _split(self, messages: List[Dict[str, Any]]) -> int:
+        """Índice desde el que los mensajes recientes caben en el presupuesto."""
+        start = max(0, len(messages) - self.keep_recent)
+        tokens = self._count(messages[start:])
+        while start > 0:
+            tokens += self.token_counter(messages[start - 1]["content"])
+            if tokens > self.token_budget:
+                break
+            start -= 1
+        return start
+
+    def compact(self, session_id: str, history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Historial para el prompt: contexto de sesión, resumen y mensajes recientes.
+
+        Si el historial cabe en el presupuesto se devuelve sin cambios. Los mensajes
+        de sistema (contexto de la sesión) se mantienen al principio y los mensajes
+        antiguos que el resumen aún no incluye se conservan hasta que se actualice.
+        """
+        system = [message for message in history if message["role"] == "system"]
+        messages = [message for message in history if message["role"] != "system"]
+        tokens_before = self._count(messages)
+        if self.token_budget <= 0 or tokens_before <= self.token_budget:
+            return history
+
+        start = self._split(messages)
+        older, recent = messages[:start], messages[start:]
+        pending = self._pending(session_id, older)
+        self._schedule(session_id, pending)
+
+        compacted = list(system)
+        summary = self._summaries.get(session_id)
+        if summary:
+            self._summaries.move_to_end(session_id)
+            compacted.append({"role": "system", "content": f"Resumen de la conversación anterior:\n{summary}"})
+        compacted.extend(pending)
+        compacted.extend(recent)
+
+        self.stats["compactions"] += 1
+        self.stats["tokens_before"] += tokens_before
+        self.stats["tokens_after"] += self._count(compacted[len(system):])
+        return compacted
+
+    def _pending(self, session_id: str, older: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Mensajes antiguos que todavía no forman parte del resumen."""
+        last_key = self._last_folded.get(session_id)
+        if last_key is None:
+            return older
+        for index in range(len(older) - 1, -1, -1):
+            if _message_key(older[index]) == last_key:
+                return older[index + 1:]
+        # El último mensaje resumido ya salió de la ventana: todo lo antiguo es nuevo
+        return older
+
+    def _schedule(self, session_id: str, pending: List[Dict[str, Any]]) -> None:
+        task = self._tasks.get(session_id)
+        if task is not None and not task.done():
+            return
+        # Resumir por bloques (una llamada al LLM cada varios turnos, no en cada uno)
+        if not pending or self._count(pending) < self.token_budget // 4:
+            return
+        self._tasks[session_id] = asyncio.create_task(self._summarize(session_id, pending))
+
+    async def _summarize(self, session_id: str, pending: List[Dict[str, Any]]) -> None:
+        lines = "\n".join(
+            f"{'Usuario' if message['role'] in ('human', USER_ROLE) else 'Asistente'}: {message['content']}"
+            for message in pending
+        )
+        prompt = CONVERSATION_SUMMARY_PROMPT.format(
+            max_words=self.max_summary_words,
+            summary=self._summaries.get(session_id) or "(vacío)",
+            messages=lines
+        )
+        start = time.perf_counter()
+        try:
+            result = await self.llm.ainvoke(prompt)
+            summary = getattr(result, "content", result)
+            self._summaries[session_id] = str(summary).strip()
+            self._summaries.move_to_end(session_id)
+            self._last_folded[session_id] = _message_key(pending[-1])
+            while len(self._summaries) > self.max_sessions:
+                evicted_id, _ = self._summaries.popitem(last=False)
+                self._last_folded.pop(evicted_id, None)
+            self.stats["summaries"] += 1
+        except Exception as e:
+            self.stats["summary_errors"] += 1
+            logger.warning(f"Error resumiendo la conversación {session_id}: {e}")
+        finally:
+            self.stats["summary_seconds"] += time.perf_counter() - start
+            if self._tasks.get(session_id) is asyncio.current_task():
+                del self._tasks[session_id]
+
+    def get_summary(self, session_id: str) -> Optional[str]:
+        return self._summaries.get(session_id)
+
+    def forget(self, session_id: str) -> None:
+        """Descarta el resumen de la conversación (al limpiar su historial o salir de memoria)."""
+        self._summaries.pop(session_id, None)
+        self._last_folded.pop(session_id, None)
+        task = self._tasks.pop(session_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    async def wait_idle(self) -> None:
+        """Espera a que terminen los resúmenes en curso (al apagar o en benchmarks)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        before, after = self.stats["tokens_before"], self.stats["tokens_after"]
+        summaries = self.stats["summaries"]
+        return {
+            **self.stats,
+            "tokens_saved": before - after,
+            "token_reduction": round(1 - after / before, 4) if before else None,
+            "avg_summary_ms": round(self.stats["summary_seconds"] * 1000 / summaries, 1) if summaries else None,
+            "sessions": len(self._summaries),
+            "pending": sum(1 for task in self._tasks.values() if not task.done()),
+        }
@@ -1,7 +1,7 @@
+import importlib
+from collections.abc import Mapping
 from enum import Enum
-from langchain_community.chat_models.vertexai import ChatVertexAI
-from langchain_openai.chat_models.base import ChatOpenAI
-from langchain_community.llms.llamacpp import LlamaCpp
+from typing import Any, Dict, Iterator
 
 
 class ModelTypes(str, Enum):
@@ -10,8 +10,36 @@ class ModelTypes(str, Enum):
     LLAMA_CPP = "LLAMA-CPP"
 
 
-MODEL_TO_CLASS = {
-    "OPENAI": ChatOpenAI,
-    "VERTEX": ChatVertexAI,
-    "LLAMA-CPP": LlamaCpp
-}
+class _LazyModelRegistry(Mapping):
+    """Registro de clases de modelo que importa cada proveedor solo cuando se usa.
+
+    Importar Vertex o LlamaCpp es costoso (y opcional); con este registro solo se
+    importa el módulo del modelo configurado, al pedir su clase por primera vez.
+    """
+
+    def __init__(self, class_paths: Dict[str, str]):
+        self._class_paths = class_paths
+        self._resolved: Dict[str, Any] = {}
+
+    def __getitem__(self, model_type: str) -> Any:
+        key = model_type.value if isinstance(model_type, ModelTypes) else model_type
+        if key not in self._resolved:
+            module_path, class_name = self._class_paths[key].rsplit(".", 1)
+            self._resolved[key] = getattr(importlib.import_module(module_path), class_name)
+        return self._resolved[key]
+
+    def __contains__(self, model_type: object) -> bool:
+        return model_type in self._class_paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._class_paths)
+
+    def __len__(self) -> int:
+        return len(self._class_paths)
+
+
+MODEL_TO_CLASS = _LazyModelRegistry({
+    ModelTypes.OPENAI.value: "langchain_openai.chat_models.base.ChatOpenAI",
+    ModelTypes.VERTEX.value: "langchain_community.chat_models.vertexai.ChatVertexAI",
+    ModelTypes.LLAMA_CPP.value: "langchain_community.llms.llamacpp.LlamaCpp",
+})
@@ -72,3 +72,15 @@ Humano: {input}
 Sheldon: Permíteme analizar esta situación con mi intelecto superior...
 {agent_scratchpad}
 """
+
+CONVERSATION_SUMMARY_PROMPT = """Eres un asistente que resume conversaciones. Actualiza el resumen existente incorporando los nuevos mensajes.
+Conserva los datos del usuario (nombre, carrera, ciclo, preferencias), las preguntas planteadas y las respuestas o acuerdos importantes.
+Responde solo con el resumen actualizado, en ESPAÑOL y en un máximo de {max_words} palabras.
+
+Resumen existente:
+{summary}
+
+Nuevos mensajes:
+{messages}
+
+Resumen actualizado:"""
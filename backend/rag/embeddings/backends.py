@@ -0,0 +1,259 @@
+"""Backends de generación de embeddings usados por EmbeddingManager."""
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class EmbeddingBackendTypes(str, Enum):
+    SENTENCE_TRANSFORMERS = "sentence_transformers"
+    HASHING = "hashing"
+
+
+class BaseEmbeddingBackend(ABC):
+    """Interfaz común de los backends de embeddings."""
+
+    # Los backends que no soportan pool de procesos ignoran start_bulk_pool
+    supports_multi_process: bool = False
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Dimensión de los embeddings."""
+
+    @property
+    @abstractmethod
+    def model(self) -> Any:
+        """Objeto subyacente (lo que devuelve EmbeddingManager.get_embedding_model)."""
+
+    @property
+    @abstractmethod
+    def tokenizer(self) -> Any:
+        """Tokenizer con la API de Hugging Face (encode, __call__, num_special_tokens_to_add)."""
+
+    @property
+    @abstractmethod
+    def max_seq_length(self) -> int:
+        """Longitud máxima de secuencia; los textos más largos se truncan."""
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Codifica los textos y devuelve una matriz (len(texts), dimension)."""
+
+    def get_num_threads(self) -> Optional[int]:
+        """Hilos de cómputo que usa el backend (None si no se pueden ajustar)."""
+        return None
+
+    def set_num_threads(self, threads: int) -> None:
+        """Ajusta los hilos de cómputo (sin efecto si el backend no lo permite)."""
+
+    def start_multi_process_pool(self, workers: int) -> Any:
+        raise NotImplementedError("El backend no soporta pool de procesos")
+
+    def encode_multi_process(self, texts: List[str], pool: Any, batch_size: int, chunk_size: int) -> np.ndarray:
+        raise NotImplementedError("El backend no soporta pool de procesos")
+
+    def stop_multi_process_pool(self, pool: Any) -> None:
+        raise NotImplementedError("El backend no soporta pool de procesos")
+
+
+class SentenceTransformerBackend(BaseEmbeddingBackend):
+    """Backend basado en un modelo de sentence-transformers."""
+
+    supports_multi_process = True
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self._model = SentenceTransformer(model_name)
+
+    @property
+    def dimension(self) -> int:
+        return self._model.get_sentence_embedding_dimension()
+
+    @property
+    def model(self) -> Any:
+        return self._model
+
+    @property
+    def tokenizer(self) -> Any:
+        return self._model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self._model.max_seq_length
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self._model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+    def get_num_threads(self) -> Optional[int]:
+        import torch
+
+        return torch.get_num_threads()
+
+    def set_num_threads(self, threads: int) -> None:
+        import torch
+
+        # Afecta a todo el proceso: torch usa un único pool de hilos intra-op
+        torch.set_num_threads(threads)
+
+    def start_multi_process_pool(self, workers: int) -> Any:
+        return self._model.start_multi_process_pool(target_devices=["cpu"] * workers)
+
+    def encode_multi_process(self, texts: List[str], pool: Any, batch_size: int, chunk_size: int) -> np.ndarray:
+        return self._model.encode_multi_process(texts, pool, batch_size=batch_size, chunk_size=chunk_size)
+
+    def stop_multi_process_pool(self, pool: Any) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        SentenceTransformer.stop_multi_process_pool(pool)
+
+
+_HASHING_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_CLS_TOKEN_ID = 0
+_SEP_TOKEN_ID = 1
+
+
+class HashingTokenizer:
+    """Tokenizer determinista (palabras y signos) con la parte de la API de Hugging Face que usa el proyecto.
+
+    Cada token se identifica con un hash de 64 bits con semilla, estable entre
+    procesos y ejecuciones (no depende de PYTHONHASHSEED).
+    """
+
+    def __init__(self, seed: int = 0, cache_size: int = 262144):
+        self._key = seed.to_bytes(8, "little", signed=True)
+        self.token_id = lru_cache(maxsize=cache_size)(self._token_id)
+
+    def _token_id(self, token: str) -> int:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8, key=self._key).digest()
+        # Los IDs 0 y 1 quedan reservados para los tokens especiales
+        return 2 + int.from_bytes(digest, "little") % (2 ** 64 - 2)
+
+    def tokenize(self, text: str) -> List[str]:
+        return _HASHING_TOKEN_RE.findall(text.lower())
+
+    def num_special_tokens_to_add(self, pair: bool = False) -> int:
+        return 4 if pair else 2
+
+    def encode(
+        self,
+        text: str,
+        add_special_tokens: bool = True,
+        truncation: bool = False,
+        max_length: Optional[int] = None,
+        **kwargs
+    ) -> List[int]:
+        token_id = self.token_id
+        ids = [token_id(token) for token in self.tokenize(text)]
+        if truncation and max_length is not None:
+            ids = ids[:max(0, max_length - (self.num_special_tokens_to_add() if add_special_tokens else 0))]
+        if add_special_tokens:
+            ids = [_CLS_TOKEN_ID] + ids + [_SEP_TOKEN_ID]
+        return ids
+
+    def __call__(
+        self,
+        texts: Union[str, List[str]],
+        add_special_tokens: bool = True,
+        truncation: bool = False,
+        max_length: Optional[int] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        if isinstance(texts, str):
+            return {"input_ids": self.encode(texts, add_special_tokens, truncation, max_length)}
+        return {
+            "input_ids": [self.encode(text, add_special_tokens, truncation, max_length) for text in texts]
+        }
+
+
+class HashingEmbeddingBackend(BaseEmbeddingBackend):
+    """Embeddings deterministas con el truco del hashing, sin descargar ningún modelo.
+
+    Cada token suma ±1 en la posición que le asigna su hash y el vector se
+    normaliza, de modo que textos con vocabulario compartido tienen similitud
+    coseno alta. No captura semántica, pero reproduce el coste y la forma de los
+    datos (dimensión, normalización, truncado a max_seq_length) para ejecutar y
+    perfilar la ingesta y la recuperación en CI sin red.
+    """
+
+    def __init__(self, model_name: str = "", dimension: int = 384, seed: int = 0, max_seq_length: int = 256):
+        """Inicializa el backend.
+
+        Args:
+            model_name: Ignorado (se acepta por compatibilidad con el resto de backends).
+            dimension: Dimensión de los embeddings (384 como all-MiniLM-L6-v2).
+            seed: Semilla del hash; la misma semilla produce siempre los mismos vectores.
+            max_seq_length: Tokens máximos por texto, incluidos los especiales.
+        """
+        self._dimension = dimension
+        self._max_seq_length = max_seq_length
+        self._tokenizer = HashingTokenizer(seed=seed)
+        self._features = lru_cache(maxsize=262144)(self._token_features)
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    @property
+    def model(self) -> Any:
+        return self
+
+    @property
+    def tokenizer(self) -> HashingTokenizer:
+        return self._tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self._max_seq_length
+
+    def _token_features(self, token_id: int) -> Tuple[int, float]:
+        """Posición y signo del token en el vector (bits independientes del hash)."""
+        return (token_id & 0xFFFFFFFF) % self._dimension, 1.0 if (token_id >> 63) & 1 else -1.0
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        ids = self._tokenizer.encode(
+            text, add_special_tokens=False, truncation=True,
+            max_length=self._max_seq_length - self._tokenizer.num_special_tokens_to_add()
+        )
+        vector = np.zeros(self._dimension, dtype=np.float32)
+        if not ids:
+            return vector
+        features = [self._features(token_id) for token_id in ids]
+        positions = np.fromiter((position for position, _ in features), dtype=np.int64, count=len(features))
+        signs = np.fromiter((sign for _, sign in features), dtype=np.float32, count=len(features))
+        vector += np.bincount(positions, weights=signs, minlength=self._dimension).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def encode(self, texts: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Codifica los textos (acepta los argumentos de SentenceTransformer.encode y los ignora)."""
+        if isinstance(texts, str):
+            return self._encode_one(texts)
+        embeddings = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            embeddings[row] = self._encode_one(text)
+        return embeddings
+
+
+EMBEDDING_BACKEND_TO_CLASS = {
+    EmbeddingBackendTypes.SENTENCE_TRANSFORMERS.value: SentenceTransformerBackend,
+    EmbeddingBackendTypes.HASHING.value: HashingEmbeddingBackend,
+}
+
+
+def get_embedding_backend(backend_type: str, model_name: str, **kwargs) -> BaseEmbeddingBackend:
+    """Instancia el backend de embeddings configurado."""
+    try:
+        backend_class = EMBEDDING_BACKEND_TO_CLASS[EmbeddingBackendTypes(backend_type).value]
+    except ValueError:
+        raise ValueError(
+            f"Backend de embeddings '{backend_type}' no válido. "
+            f"Opciones: {[b.value for b in EmbeddingBackendTypes]}"
+        )
+    return backend_class(model_name, **kwargs)
@@ -1,16 +1,265 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Union
 import numpy as np
 
+from .backends import BaseEmbeddingBackend, get_embedding_backend
+from ...config import settings
+
 class EmbeddingManager:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        """Inicializa el gestor de embeddings."""
-        print(f"\nCargando modelo de embeddings: {model_name}")
-        self.model = SentenceTransformer(model_name)
-        print("Modelo de embeddings cargado")
-
-    def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        """Genera embeddings para una lista de textos."""
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        length_bucketing: Optional[bool] = None,
+        backend: Union[str, BaseEmbeddingBackend, None] = None
+    ):
+        """Inicializa el gestor de embeddings.
+
+        El modelo no se carga aquí sino en el primer uso (o al llamar a load()), para
+        no bloquear el arranque de la aplicación.
+
+        Args:
+            model_name: Modelo de sentence-transformers.
+            length_bucketing: Agrupar los textos por longitud en tokens antes de codificar
+                (por defecto settings.embedding_length_bucketing).
+            backend: Tipo de backend (EmbeddingBackendTypes) o instancia ya creada
+                (por defecto settings.embedding_backend).
+        """
+        self.model_name = model_name
+        if isinstance(backend, BaseEmbeddingBackend):
+            self._backend = backend
+            self.backend_type = type(backend).__name__
+        else:
+            self._backend = None
+            self.backend_type = backend or settings.embedding_backend
+        self._load_lock = threading.Lock()
+        self.length_bucketing = settings.embedding_length_bucketing if length_bucketing is None else length_bucketing
+        # Pool de procesos para ingestas masivas (ver start_bulk_pool)
+        self._bulk_pool = None
+        self._bulk_workers = 0
+        self._bulk_lock = threading.Lock()
+        # Resultado del último warmup() (configuración elegida y latencias)
+        self.warmup_report: Optional[Dict[str, Any]] = None
+        # Los hilos de torch son globales: el ajuste espera a que no haya codificaciones
+        # en curso y las nuevas esperan a que termine (ver _encoding y _exclusive_threads)
+        self._encode_cond = threading.Condition()
+        self._active_encodes = 0
+        self._tuning_threads = False
+
+    @property
+    def backend(self) -> BaseEmbeddingBackend:
+        """Backend de embeddings; se carga en el primer acceso."""
+        if self._backend is None:
+            self.load()
+        return self._backend
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._backend is not None
+
+    def load(self) -> None:
+        """Carga el modelo si aún no está cargado (seguro entre hilos)."""
+        if self._backend is not None:
+            return
+        with self._load_lock:
+            if self._backend is not None:
+                return
+            print(f"\nCargando modelo de embeddings: {self.model_name} (backend={self.backend_type})")
+            self._backend = get_embedding_backend(self.backend_type, self.model_name)
+            print("Modelo de embeddings cargado")
+
+    @property
+    def dimension(self) -> int:
+        """Dimensión de los embeddings del modelo (lo carga si hace falta)."""
+        return self.backend.dimension
+
+    @property
+    def _fallback_dimension(self) -> int:
+        """Dimensión para los vectores de ceros de respaldo (sin forzar la carga del modelo)."""
+        return self._backend.dimension if self._backend is not None else 384  # Dimensión típica de all-MiniLM-L6-v2
+
+    def warmup(
+        self,
+        batch_sizes: Optional[Sequence[int]] = None,
+        seq_lengths: Optional[Sequence[int]] = None,
+        tune_threads: Optional[bool] = None,
+        num_threads: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Carga el modelo, lo ejercita con cargas representativas y ajusta los hilos.
+
+        La primera codificación de cada forma (lote x longitud) paga la inicialización
+        perezosa de torch y del tokenizer; hacerla aquí evita que la pague la primera
+        consulta real. Si el backend permite ajustar los hilos, se mide el throughput
+        con varios valores sobre el lote más grande y se fija el menor número de hilos
+        que queda a un 5% del mejor.
+
+        Args:
+            batch_sizes: Tamaños de lote a ejercitar (por defecto settings.embedding_warmup_batch_sizes).
+            seq_lengths: Longitudes aproximadas en tokens (por defecto settings.embedding_warmup_seq_lengths).
+            tune_threads: Medir y elegir el número de hilos (por defecto settings.embedding_warmup_tune_threads).
+            num_threads: Hilos fijos; si es > 0 no se ajustan (por defecto settings.embedding_num_threads).
+
+        Returns:
+            Configuración elegida, throughput por número de hilos y latencia por forma.
+        """
+        start = time.perf_counter()
+        self.load()
+        backend = self.backend
+        batch_sizes = sorted({max(1, b) for b in (batch_sizes or settings.embedding_warmup_batch_sizes)})
+        seq_lengths = sorted({
+            max(1, min(length, backend.max_seq_length))
+            for length in (seq_lengths or settings.embedding_warmup_seq_lengths)
+        })
+        tune_threads = settings.embedding_warmup_tune_threads if tune_threads is None else tune_threads
+        num_threads = settings.embedding_num_threads if num_threads is None else num_threads
+        texts = {length: self._warmup_text(length) for length in seq_lengths}
+
+        # Primera pasada por cada forma: inicialización perezosa
+        for batch_size in batch_sizes:
+            for length in seq_lengths:
+                backend.encode([texts[length]] * batch_size, batch_size=batch_size)
+
+        throughput: Dict[int, float] = {}
+        if num_threads and num_threads > 0:
+            with self._exclusive_threads():
+                backend.set_num_threads(num_threads)
+        elif tune_threads and backend.get_num_threads() is not None:
+            largest_batch = [texts[seq_lengths[-1]]] * batch_sizes[-1]
+            with self._exclusive_threads():
+                for threads in self._thread_candidates(backend.get_num_threads()):
+                    backend.set_num_threads(threads)
+                    elapsed = self._time_encode(largest_batch, batch_sizes[-1])
+                    throughput[threads] = round(len(largest_batch) / elapsed, 1)
+                best = max(throughput.values())
+                backend.set_num_threads(min(t for t, value in throughput.items() if value >= 0.95 * best))
+
+        latencies_ms = {
+            f"{batch_size}x{length}": round(self._time_encode([texts[length]] * batch_size, batch_size) * 1000, 2)
+            for batch_size in batch_sizes for length in seq_lengths
+        }
+        self.warmup_report = {
+            "backend": self.backend_type,
+            "num_threads": backend.get_num_threads(),
+            "thread_throughput": throughput,
+            "latency_ms": latencies_ms,
+            "query_latency_ms": latencies_ms[f"{batch_sizes[0]}x{seq_lengths[0]}"],
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        print(
+            f"Warmup de embeddings completado en {self.warmup_report['seconds']:.2f}s: "
+            f"hilos={self.warmup_report['num_threads']}, latencias (lote x tokens, ms)={latencies_ms}"
+        )
+        return self.warmup_report
+
+    @contextmanager
+    def _encoding(self):
+        """Codificación de la aplicación: espera mientras warmup() ajusta los hilos."""
+        with self._encode_cond:
+            self._encode_cond.wait_for(lambda: not self._tuning_threads)
+            self._active_encodes += 1
+        try:
+            yield
+        finally:
+            with self._encode_cond:
+                self._active_encodes -= 1
+                self._encode_cond.notify_all()
+
+    @contextmanager
+    def _exclusive_threads(self):
+        """Cambia los hilos de torch sin codificaciones concurrentes que alteren la medida."""
+        with self._encode_cond:
+            # Las codificaciones nuevas esperan; las que están en curso terminan
+            self._tuning_threads = True
+            self._encode_cond.wait_for(lambda: self._active_encodes == 0)
+        try:
+            yield
+        finally:
+            with self._encode_cond:
+                self._tuning_threads = False
+                self._encode_cond.notify_all()
+
+    @staticmethod
+    def _thread_candidates(current: int) -> List[int]:
+        """Números de hilos a probar: potencias de dos, el actual y todos los núcleos."""
+        cpus = os.cpu_count() or current
+        candidates = {1, current, cpus}
+        threads = 2
+        while threads < cpus:
+            candidates.add(threads)
+            threads *= 2
+        return sorted(candidates)
+
+    def _time_encode(self, texts: List[str], batch_size: int, repeats: int = 2) -> float:
+        """Mejor tiempo (segundos) de varias codificaciones del mismo lote."""
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            self.backend.encode(texts, batch_size=batch_size)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    @staticmethod
+    def _warmup_text(tokens: int) -> str:
+        """Texto en español de aproximadamente `tokens` tokens (una palabra por token)."""
+        words = ("la universidad ofrece programas de pregrado y posgrado con requisitos de admisión "
+                 "becas matrícula y plazos definidos por la oficina académica").split()
+        return " ".join(words[i % len(words)] for i in range(tokens))
+
+    @property
+    def bulk_workers(self) -> int:
+        """Número de procesos del pool de embeddings masivos (0 si no está activo)."""
+        return self._bulk_workers
+
+    def start_bulk_pool(self, workers: int) -> bool:
+        """Arranca N procesos, cada uno con su copia del modelo, para ingestas masivas.
+
+        Mientras el pool está activo, embed_documents reparte los lotes grandes entre
+        los procesos conservando el orden. Cada proceso limita sus hilos de torch para
+        que entre todos no sobresuscriban los núcleos.
+
+        Returns:
+            True si esta llamada arrancó el pool (y le corresponde detenerlo); False si
+            ya estaba activo o el backend no admite pool de procesos.
+        """
+        if workers < 2 or not self.backend.supports_multi_process:
+            return False
+        with self._bulk_lock:
+            if self._bulk_pool is not None:
+                return False
+            threads_per_worker = str(max(1, (os.cpu_count() or workers) // workers))
+            previous = os.environ.get("OMP_NUM_THREADS")
+            # Los procesos hijos se crean con "spawn" y heredan el entorno en ese momento
+            os.environ["OMP_NUM_THREADS"] = threads_per_worker
+            try:
+                self._bulk_pool = self.backend.start_multi_process_pool(workers)
+            finally:
+                if previous is None:
+                    os.environ.pop("OMP_NUM_THREADS", None)
+                else:
+                    os.environ["OMP_NUM_THREADS"] = previous
+            self._bulk_workers = workers
+        print(f"Pool de embeddings iniciado con {workers} procesos ({threads_per_worker} hilos cada uno)")
+        return True
+
+    def stop_bulk_pool(self) -> None:
+        """Detiene el pool de procesos de embeddings si está activo."""
+        with self._bulk_lock:
+            if self._bulk_pool is None:
+                return
+            self.backend.stop_multi_process_pool(self._bulk_pool)
+            self._bulk_pool = None
+            self._bulk_workers = 0
+        print("Pool de embeddings detenido")
+
+    def embed_documents(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Genera embeddings para una lista de textos.
+
+        Args:
+            texts: Textos a codificar.
+            batch_size: Tamaño de lote del modelo (por defecto settings.embedding_batch_size).
+        """
         if not texts:
             print("No hay textos para generar embeddings")
             return []
@@ -25,29 +274,82 @@ class EmbeddingManager:
                 
         try:
             print(f"\nGenerando embeddings para {len(filtered_texts)} textos")
-            embeddings = self.model.encode(filtered_texts, convert_to_tensor=False)
+            batch_size = batch_size or settings.embedding_batch_size
+            with self._encoding():
+                if self._bulk_pool is not None and len(filtered_texts) >= 2 * batch_size:
+                    embeddings = self._encode_multi_process(filtered_texts, batch_size)
+                elif self.length_bucketing:
+                    embeddings = self._encode_length_bucketed(filtered_texts, batch_size)
+                else:
+                    embeddings = self.backend.encode(filtered_texts, batch_size=batch_size)
             
             # Asegurar que los resultados son listas, no ndarrays
-            result_embeddings = []
-            for emb in embeddings:
-                if isinstance(emb, np.ndarray):
-                    result_embeddings.append(emb.tolist())
-                else:
-                    result_embeddings.append(emb)
+            result_embeddings = embeddings.tolist() if isinstance(embeddings, np.ndarray) else list(embeddings)
                     
             print("Embeddings generados exitosamente")
             return result_embeddings
         except Exception as e:
             print(f"Error al generar embeddings: {e}")
             # Fallback: devolver vectores de ceros
-            vector_dim = 384  # Dimensión típica de all-MiniLM-L6-v2
+            vector_dim = self._fallback_dimension
             return [[0.0] * vector_dim for _ in range(len(texts))]
 
+    def _token_lengths(self, texts: List[str]) -> np.ndarray:
+        """Longitud en tokens de cada texto (acotada a la longitud máxima del modelo)."""
+        encoded = self.backend.tokenizer(
+            texts, add_special_tokens=False, truncation=True,
+            max_length=self.backend.max_seq_length, verbose=False
+        )
+        return np.fromiter((len(ids) for ids in encoded["input_ids"]), dtype=np.int64, count=len(texts))
+
+    def _encode_length_bucketed(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Codifica los textos en lotes de longitud similar y restaura el orden original.
+
+        Cada lote se rellena hasta su texto más largo, así que ordenar por tokens antes
+        de formar los lotes reduce el cómputo desperdiciado en padding. encode() ya ordena
+        por caracteres dentro de cada llamada, pero la longitud en caracteres no refleja
+        bien la longitud en tokens; aquí cada lote es una llamada con textos ya agrupados.
+        """
+        if len(texts) <= batch_size:
+            return self.backend.encode(texts, batch_size=batch_size)
+        order = np.argsort(self._token_lengths(texts), kind="stable")
+        embeddings = None
+        for start in range(0, len(texts), batch_size):
+            bucket = order[start:start + batch_size]
+            bucket_embeddings = self.backend.encode([texts[i] for i in bucket], batch_size=batch_size)
+            if embeddings is None:
+                embeddings = np.empty((len(texts), bucket_embeddings.shape[1]), dtype=bucket_embeddings.dtype)
+            embeddings[bucket] = bucket_embeddings
+        return embeddings
+
+    def _encode_multi_process(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Reparte los textos entre los procesos del pool y devuelve los embeddings en orden.
+
+        Los textos se ordenan por longitud en tokens antes de repartirlos para que cada
+        proceso reciba lotes homogéneos; el resultado se reordena al final.
+        """
+        order = np.argsort(self._token_lengths(texts), kind="stable") if self.length_bucketing else None
+        sorted_texts = [texts[i] for i in order] if order is not None else texts
+        # El pool usa colas compartidas: una sola llamada a la vez
+        with self._bulk_lock:
+            if self._bulk_pool is None:
+                return self.backend.encode(texts, batch_size=batch_size)
+            chunk_size = max(batch_size, -(-len(texts) // self._bulk_workers))
+            encoded = self.backend.encode_multi_process(
+                sorted_texts, self._bulk_pool, batch_size=batch_size, chunk_size=chunk_size
+            )
+        if order is None:
+            return encoded
+        embeddings = np.empty_like(encoded)
+        embeddings[order] = encoded
+        return embeddings
+
     def embed_query(self, query: str) -> List[float]:
         """Genera embedding para una consulta."""
         print(f"\nGenerando embedding para consulta: {query}")
         try:
-            embedding = self.model.encode([query], convert_to_tensor=False)[0]
+            with self._encoding():
+                embedding = self.backend.encode([query])[0]
             # Asegurar que el resultado es una lista, no un ndarray
             if isinstance(embedding, np.ndarray):
                 embedding = embedding.tolist()
@@ -56,7 +358,7 @@ class EmbeddingManager:
         except Exception as e:
             print(f"Error al generar embedding para consulta: {e}")
             # Fallback: devolver un vector de ceros si hay algún error
-            vector_dim = 384  # Dimensión típica de all-MiniLM-L6-v2
+            vector_dim = self._fallback_dimension
             return [0.0] * vector_dim
         
     async def embed_text(self, text: str) -> List[float]:
@@ -64,7 +366,7 @@ class EmbeddingManager:
         # Optimizar para textos vacíos o muy cortos
         if not text or len(text) < 3:
             # Devolver un vector de ceros como fallback para textos muy cortos
-            vector_dim = 384  # Dimensión típica de all-MiniLM-L6-v2
+            vector_dim = self._fallback_dimension
             return [0.0] * vector_dim
             
         try:
@@ -73,9 +375,17 @@ class EmbeddingManager:
         except Exception as e:
             print(f"Error al generar embedding para texto: {e}")
             # Fallback en caso de error
-            vector_dim = 384  # Dimensión típica de all-MiniLM-L6-v2
+            vector_dim = self._fallback_dimension
             return [0.0] * vector_dim
 
     def get_embedding_model(self):
         """Retorna el modelo de embeddings para uso directo."""
-        return self.model 
\ No newline at end of file
+        return self.backend.model
+
+    def get_tokenizer(self):
+        """Retorna el tokenizer del modelo (para medir textos en tokens)."""
+        return self.backend.tokenizer
+
+    def get_max_seq_length(self) -> int:
+        """Longitud máxima de secuencia del modelo; los textos más largos se truncan."""
+        return self.backend.max_seq_length 
\ No newline at end of file
@@ -0,0 +1,268 @@
+"""Caché en memoria de embeddings con precisión reducida (float16/int8)."""
+import threading
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class EmbeddingPrecisions(str, Enum):
+    FLOAT32 = "float32"
+    FLOAT16 = "float16"
+    INT8 = "int8"
+
+
+_PRECISION_DTYPES = {
+    EmbeddingPrecisions.FLOAT32: np.float32,
+    EmbeddingPrecisions.FLOAT16: np.float16,
+    EmbeddingPrecisions.INT8: np.int8,
+}
+_INT8_MAX = 127.0
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza cada fila a norma 1 (las filas nulas se dejan a cero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1.0)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Cuantización simétrica por fila: v ≈ q * escala, con q en [-127, 127]."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / _INT8_MAX
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    quantized = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales
+
+
+class QuantizedEmbeddingCache:
+    """Caché LRU de embeddings normalizados almacenados en float32, float16 o int8.
+
+    Los vectores se guardan en una única matriz contigua (sin un objeto por
+    vector), de modo que la memoria por entrada es dim * bytes_por_componente más
+    una escala float32 en int8: 1536 bytes en float32, 768 en float16 y 388 en
+    int8 para dim=384. Como se guardan normalizados, el producto escalar es
+    directamente la similitud coseno.
+
+    La similitud se calcula de dos formas:
+      - descuantizando las filas a float32 y multiplicando (float16/int8),
+      - en int8, con producto escalar entero (acumulado en int32) de la consulta
+        cuantizada contra las filas, reescalado al final.
+    """
+
+    def __init__(
+        self,
+        precision: str = EmbeddingPrecisions.FLOAT32.value,
+        max_entries: int = 5000,
+        initial_capacity: int = 1024
+    ):
+        """Inicializa la caché.
+
+        Args:
+            precision: Precisión de almacenamiento (float32, float16 o int8).
+            max_entries: Número máximo de vectores; al superarlo se descartan los menos usados.
+            initial_capacity: Filas reservadas inicialmente (la matriz crece duplicándose).
+        """
+        self.precision = EmbeddingPrecisions(precision)
+        self.max_entries = max(1, max_entries)
+        self._dtype = _PRECISION_DTYPES[self.precision]
+        self._initial_capacity = max(1, min(initial_capacity, self.max_entries))
+        self._slots: "OrderedDict[Hashable, int]" = OrderedDict()
+        self._free_slots: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def dimension(self) -> Optional[int]:
+        return None if self._matrix is None else self._matrix.shape[1]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def missing_keys(self, keys: Sequence[Hashable]) -> List[Hashable]:
+        """Claves (sin repetir) que no están en la caché; contabiliza aciertos y fallos."""
+        with self._lock:
+            missing = list(dict.fromkeys(key for key in keys if key not in self._slots))
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        return missing
+
+    def _ensure_capacity(self, dimension: int, needed: int) -> None:
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, min(needed, self.max_entries))
+            self._matrix = np.zeros((capacity, dimension), dtype=self._dtype)
+            self._scales = np.ones(capacity, dtype=np.float32)
+            self._free_slots = list(range(capacity - 1, -1, -1))
+            return
+        if dimension != self._matrix.shape[1]:
+            raise ValueError(
+                f"Dimensión de embedding {dimension} distinta de la de la caché ({self._matrix.shape[1]})"
+            )
+        capacity = self._matrix.shape[0]
+        if len(self._free_slots) >= needed or capacity >= self.max_entries:
+            return
+        new_capacity = capacity
+        while new_capacity - len(self._slots) < needed and new_capacity < self.max_entries:
+            new_capacity = min(new_capacity * 2, self.max_entries)
+        matrix = np.zeros((new_capacity, dimension), dtype=self._dtype)
+        matrix[:capacity] = self._matrix
+        scales = np.ones(new_capacity, dtype=np.float32)
+        scales[:capacity] = self._scales
+        self._matrix, self._scales = matrix, scales
+        self._free_slots.extend(range(new_capacity - 1, capacity - 1, -1))
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Convierte vectores normalizados a la precisión de almacenamiento."""
+        if self.precision == EmbeddingPrecisions.INT8:
+            return quantize_int8(vectors)
+        return vectors.astype(self._dtype), np.ones(len(vectors), dtype=np.float32)
+
+    def put_many(self, keys: Sequence[Hashable], embeddings: Any) -> None:
+        """Guarda (o reemplaza) los embeddings de las claves indicadas."""
+        if not len(keys):
+            return
+        vectors = normalize_rows(embeddings)
+        if len(vectors) != len(keys):
+            raise ValueError("El número de claves y de embeddings no coincide")
+        encoded, scales = self._encode(vectors)
+        with self._lock:
+            self._ensure_capacity(vectors.shape[1], len(keys))
+            for key, row, scale in zip(keys, encoded, scales):
+                slot = self._slots.get(key)
+                if slot is None:
+                    if not self._free_slots:
+                        _, slot = self._slots.popitem(last=False)
+                        self.evictions += 1
+                    else:
+                        slot = self._free_slots.pop()
+                    self._slots[key] = slot
+                else:
+                    self._slots.move_to_end(key)
+                self._matrix[slot] = row
+                self._scales[slot] = scale
+
+    def _lookup(self, keys: Sequence[Hashable]) -> Tuple[List[int], List[int]]:
+        """Posiciones encontradas (en keys) y sus filas; marca los accesos como recientes.
+
+        Debe llamarse con el lock tomado, junto con la lectura de las filas.
+        """
+        found, slots = [], []
+        for position, key in enumerate(keys):
+            slot = self._slots.get(key)
+            if slot is None:
+                continue
+            self._slots.move_to_end(key)
+            found.append(position)
+            slots.append(slot)
+        return found, slots
+
+    def _dequantize(self, slots: List[int]) -> np.ndarray:
+        rows = self._matrix[slots].astype(np.float32)
+        if self.precision == EmbeddingPrecisions.INT8:
+            rows *= self._scales[slots][:, None]
+        return rows
+
+    def get_many(self, keys: Sequence[Hashable]) -> Tuple[List[int], np.ndarray]:
+        """Recupera los embeddings (normalizados, en float32) de las claves presentes.
+
+        Returns:
+            (posiciones en keys de las claves encontradas, matriz float32 con sus vectores).
+        """
+        with self._lock:
+            found, slots = self._lookup(keys)
+            if not found:
+                return [], np.empty((0, self.dimension or 0), dtype=np.float32)
+            return found, self._dequantize(slots)
+
+    def similarities(
+        self,
+        query: Any,
+        keys: Sequence[Hashable],
+        integer_dot: Optional[bool] = None
+    ) -> Tuple[List[int], np.ndarray]:
+        """Similitud coseno entre la consulta y los embeddings de las claves presentes.
+
+        Args:
+            query: Embedding de la consulta.
+            keys: Claves de los vectores a puntuar.
+            integer_dot: En int8, usar producto escalar entero en lugar de descuantizar
+                (por defecto, sí en int8).
+
+        Returns:
+            (posiciones en keys de las claves encontradas, similitudes).
+        """
+        query_vector = normalize_rows(query)
+        if integer_dot is None:
+            integer_dot = self.precision == EmbeddingPrecisions.INT8
+        integer_dot = integer_dot and self.precision == EmbeddingPrecisions.INT8
+        if integer_dot:
+            query_quantized, query_scale = quantize_int8(query_vector)
+        with self._lock:
+            found, slots = self._lookup(keys)
+            if not found:
+                return [], np.empty(0, dtype=np.float32)
+            if integer_dot:
+                # Acumulación en int32: |q·r| <= dim * 127² no desborda para dimensiones habituales
+                dots = self._matrix[slots].astype(np.int32) @ query_quantized[0].astype(np.int32)
+                return found, dots.astype(np.float32) * (self._scales[slots] * query_scale[0])
+            return found, self._dequantize(slots) @ query_vector[0]
+
+    def discard(self, keys: Sequence[Hashable]) -> None:
+        """Elimina las claves indicadas de la caché."""
+        with self._lock:
+            for key in keys:
+                slot = self._slots.pop(key, None)
+                if slot is not None:
+                    self._free_slots.append(slot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._matrix = None
+            self._scales = None
+            self._free_slots = []
+
+    def memory_bytes(self) -> int:
+        """Bytes ocupados por los vectores almacenados (más las escalas en int8)."""
+        matrix = self._matrix
+        if matrix is None:
+            return 0
+        row_bytes = matrix.shape[1] * matrix.itemsize
+        if self.precision == EmbeddingPrecisions.INT8:
+            row_bytes += np.dtype(np.float32).itemsize
+        return len(self._slots) * row_bytes
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché.
+
+        `cache_savings_vs_float32` compara el tamaño de esta caché con el que tendría
+        la misma caché en float32; no mide la memoria del proceso (el índice de Chroma
+        se mantiene en float32 aparte).
+        """
+        float32_cache_bytes = len(self._slots) * (self.dimension or 0) * 4
+        memory = self.memory_bytes()
+        lookups = self.hits + self.misses
+        return {
+            "precision": self.precision.value,
+            "entries": len(self._slots),
+            "max_entries": self.max_entries,
+            "dimension": self.dimension,
+            "memory_bytes": memory,
+            "float32_cache_bytes": float32_cache_bytes,
+            "cache_savings_vs_float32": round(1 - memory / float32_cache_bytes, 4) if float32_cache_bytes else 0.0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,21 @@
+"""Similitud coseno con numpy (sin depender de scikit-learn)."""
+from typing import Any
+
+import numpy as np
+
+from .quantization import normalize_rows
+
+
+def cosine_similarity(x: Any, y: Any = None) -> np.ndarray:
+    """Matriz de similitud coseno entre las filas de x y las de y (equivale a sklearn).
+
+    Args:
+        x: Matriz (n, d) o lista de vectores.
+        y: Matriz (m, d) o lista de vectores; por defecto, x.
+
+    Returns:
+        Matriz (n, m) de similitudes.
+    """
+    x_normalized = normalize_rows(x)
+    y_normalized = x_normalized if y is None else normalize_rows(y)
+    return x_normalized @ y_normalized.T
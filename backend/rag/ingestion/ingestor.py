@@ -1,21 +1,108 @@
 """Módulo optimizado para la ingesta de documentos en el sistema RAG."""
 import asyncio
 from pathlib import Path
-from typing import List, Optional, Dict, Set
+from typing import Any, Callable, List, Optional, Dict, Set, Tuple
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 from langchain_core.documents import Document
 
 from ...file_system.pdf_file_manager import PDFFileManager
+from ...file_system.file_hash import compute_file_hash
 from ..pdf_processor.pdf_loader import PDFContentLoader
+from ..pdf_processor.token_counter import token_length_histogram
 from ..embeddings.embedding_manager import EmbeddingManager
 from ..vector_store.vector_store import VectorStore
+from .manifest import IngestionManifest
 from ...config import settings
 
 logger = logging.getLogger(__name__)
 
+# Callback de progreso: recibe la etapa ("pages_parsed", "chunks_total",
+# "chunks_embedded", "chunks_written") y el valor acumulado de esa etapa.
+ProgressCallback = Callable[[str, int], None]
+
+
+class _AdaptiveBatchSizer:
+    """Ajusta el tamaño de lote del pipeline de ingesta con la latencia medida.
+
+    Con doble buffer cada etapa dura lo que la más lenta entre codificar y escribir.
+    Se busca que esa etapa ronde ``target_seconds``: lotes grandes amortizan el coste
+    fijo de cada escritura en Chroma y lotes pequeños hacen que el solapamiento
+    empiece antes. El tamaño se redondea a múltiplos del lote del modelo.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        granularity: int,
+        target_seconds: float = 1.0,
+        max_multiplier: int = 8,
+        smoothing: float = 0.5
+    ):
+        self.granularity = max(1, granularity)
+        self.minimum = self.granularity
+        self.maximum = max(initial * max_multiplier, self.granularity)
+        self.initial = self._round(initial)
+        self.target_seconds = target_seconds
+        self.smoothing = smoothing
+        self._seconds_per_item: Dict[str, float] = {}
+
+    def _round(self, size: float) -> int:
+        size = int(size) // self.granularity * self.granularity
+        return min(max(size, self.minimum), self.maximum)
+
+    def observe(self, stage: str, items: int, seconds: float) -> None:
+        """Registra la latencia de una etapa ("encode" o "write") para ``items`` chunks."""
+        if items <= 0:
+            return
+        rate = seconds / items
+        previous = self._seconds_per_item.get(stage)
+        self._seconds_per_item[stage] = rate if previous is None else (
+            self.smoothing * rate + (1 - self.smoothing) * previous
+        )
+
+    @property
+    def size(self) -> int:
+        slowest = max(self._seconds_per_item.values(), default=0.0)
+        if slowest <= 0:
+            return self.initial
+        return self._round(self.target_seconds / slowest)
+
+
+class _IncrementalDeduplicator:
+    """Deduplicación incremental por content_hash y por similitud coseno con los chunks ya aceptados."""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._content_hashes: Set[str] = set()
+        self._matrix: Optional[np.ndarray] = None
+        self._count = 0
+
+    def add(self, chunk: Document, embedding) -> bool:
+        """Acepta el chunk si no es duplicado. Devuelve False si se descarta."""
+        content_hash = chunk.metadata.get('content_hash')
+        if content_hash in self._content_hashes:
+            return False
+        vector = np.asarray(embedding, dtype=np.float64)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        if self._count and np.max(self._matrix[:self._count] @ vector) > self.threshold:
+            return False
+        if self._matrix is None:
+            self._matrix = np.empty((64, vector.shape[0]), dtype=np.float64)
+        elif self._count == self._matrix.shape[0]:
+            self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+        self._matrix[self._count] = vector
+        self._count += 1
+        if content_hash:
+            self._content_hashes.add(content_hash)
+        return True
+
+
 class RAGIngestor:
     """Gestor optimizado de ingesta de documentos para RAG."""
 
@@ -26,7 +113,8 @@ class RAGIngestor:
         embedding_manager: EmbeddingManager,
         vector_store: VectorStore,
         batch_size: int = 100,
-        max_workers: int = 4
+        max_workers: int = 4,
+        manifest: Optional[IngestionManifest] = None
     ):
         """Inicializa el gestor de ingesta.
         
@@ -37,6 +125,7 @@ class RAGIngestor:
             vector_store: Almacenamiento vectorial.
             batch_size: Tamaño del lote para procesamiento.
             max_workers: Número máximo de workers para procesamiento paralelo.
+            manifest: Manifiesto local de ingesta. Si no se indica, se abre el configurado en settings.
         """
         self.pdf_file_manager = pdf_file_manager
         self.pdf_content_loader = pdf_content_loader
@@ -44,15 +133,24 @@ class RAGIngestor:
         self.vector_store = vector_store
         self.batch_size = batch_size
         self.max_workers = max_workers
+        self.manifest = manifest or IngestionManifest(settings.ingestion_manifest_path)
         self._processed_hashes: Set[str] = set()
         logger.info(f"RAGIngestor inicializado con batch_size={batch_size}, max_workers={max_workers}")
 
-    async def ingest_single_pdf(self, pdf_path: Path, force_update: bool = False) -> Dict:
+    async def ingest_single_pdf(
+        self,
+        pdf_path: Path,
+        force_update: bool = False,
+        progress_callback: Optional[ProgressCallback] = None,
+        resume: bool = False
+    ) -> Dict:
         """Procesa un PDF individual con optimizaciones.
         
         Args:
             pdf_path: Ruta al archivo PDF.
             force_update: Forzar actualización aunque exista.
+            progress_callback: Función opcional para reportar el progreso por etapas.
+            resume: Reanudar una ingesta interrumpida conservando los chunks ya escritos.
             
         Returns:
             Diccionario con resultados de la ingesta.
@@ -65,8 +163,10 @@ class RAGIngestor:
             if not pdf_path.exists() or not pdf_path.is_file():
                 return self._error_result(filename, "❌ Archivo no encontrado")
             
+            file_hash = await asyncio.to_thread(compute_file_hash, pdf_path)
+
             # Verificar si ya está procesado
-            if not force_update and await self._is_already_processed(pdf_path):
+            if not force_update and await self._is_already_processed(pdf_path, file_hash):
                 logger.info(f"⏭️ PDF {filename} ya procesado anteriormente. Omitiendo.")
                 return {
                     "filename": filename,
@@ -74,66 +174,120 @@ class RAGIngestor:
                     "reason": "already_processed"
                 }
             
-            # Procesar PDF
-            chunks = self.pdf_content_loader.load_and_split_pdf(pdf_path)
+            # Procesar PDF (parseo síncrono fuera del event loop)
+            chunks = await asyncio.to_thread(
+                self.pdf_content_loader.load_and_split_pdf, pdf_path, progress_callback, file_hash
+            )
             if not chunks:
                 return self._error_result(filename, "❌ No se pudo extraer contenido del PDF")
             
             logger.info(f"📄 PDF procesado: {len(chunks)} fragmentos de texto extraídos")
             
-            # Deduplicar chunks
-            unique_chunks, unique_embeddings = await self._deduplicate_chunks(chunks, return_embeddings=True)
+            # Checkpoint: chunks ya escritos por una ingesta interrumpida del mismo archivo
+            resumed_ids = self._get_resumable_chunk_ids(filename, file_hash) if resume else set()
+            precomputed_embeddings = self.vector_store.get_embeddings(list(resumed_ids)) if resumed_ids else {}
+            if resumed_ids:
+                logger.info(f"♻️ Reanudando {filename}: {len(resumed_ids)} fragmentos ya escritos")
+            
+            self._report_progress(progress_callback, "chunks_total", len(chunks))
+            
+            if resumed_ids:
+                self.manifest.begin(filename, file_hash, reset=False)
+            else:
+                # Descartar los chunks de una versión anterior del archivo y registrar el inicio
+                stale_ids = self.manifest.get_chunk_ids(filename)
+                if stale_ids:
+                    await self.vector_store.delete_documents_by_ids(stale_ids)
+                self.manifest.begin(filename, file_hash)
+            
+            # Embeddings, deduplicación y escritura solapados por lotes
+            unique_chunks, total_added, chunks_resumed = await self._embed_and_write(
+                filename, chunks, precomputed_embeddings, resumed_ids, progress_callback
+            )
             if not unique_chunks:
+                self.manifest.fail(filename, "No quedaron fragmentos después de eliminar duplicados")
                 return self._error_result(filename, "❌ No quedaron fragmentos después de eliminar duplicados")
-            
             logger.info(f"🔄 Fragmentos únicos después de deduplicación: {len(unique_chunks)}")
+            self._report_progress(progress_callback, "chunks_total", len(unique_chunks))
             
-            # Procesar en lotes
-            total_added = 0
-            for i in range(0, len(unique_chunks), self.batch_size):
-                batch = unique_chunks[i:i + self.batch_size]
-                batch_embeddings = unique_embeddings[i:i + self.batch_size] if unique_embeddings else None
-                try:
-                    for doc in batch:
-                        content_hash = doc.metadata.get('content_hash')
-                        if content_hash:
-                            await self.vector_store.delete_documents(filter={"content_hash": content_hash})
-                    if not isinstance(batch, list):
-                        raise TypeError(f"Batch is not a list before adding to vector store. Type: {type(batch)}")
-                    if not batch:
-                        logger.warning(f"⚠️ Lote vacío. Omitiendo lote {i//self.batch_size + 1}.")
-                        continue
-                    
-                    try:
-                        await self._add_batch_to_vector_store(batch, i//self.batch_size + 1, embeddings=batch_embeddings)
-                        total_added += len(batch)
-                        logger.info(f"✅ Lote {i//self.batch_size + 1} procesado: {len(batch)} fragmentos agregados al vector store")
-                    except Exception as add_err:
-                        logger.error(f"❌ Error procesando lote {i//self.batch_size + 1}: {add_err}", exc_info=True)
-                except Exception as e:
-                    logger.error(f"❌ Error en lote {i//self.batch_size + 1}: {str(e)}", exc_info=True)
+            # Si falta algún chunk el archivo queda como fallido y la siguiente ingesta lo reanuda
+            missing = len(unique_chunks) - (total_added + chunks_resumed)
+            if missing > 0:
+                raise RuntimeError(f"{missing} de {len(unique_chunks)} fragmentos no se escribieron en el vector store")
             
+            # El PDF pudo eliminarse durante la ingesta (remove_pdf ya se ejecutó o está en
+            # curso): descartar lo escrito en lugar de registrar un archivo que no existe
+            if not pdf_path.exists():
+                removed = await self._discard_removed_pdf(filename)
+                logger.info(f"🗑️ {filename} se eliminó durante la ingesta: {removed} fragmentos descartados")
+                return {
+                    "filename": filename,
+                    "status": "cancelled",
+                    "error": "El PDF se eliminó durante la ingesta"
+                }
+
             # Actualizar hashes procesados
             self._update_processed_hashes(unique_chunks)
+            self.manifest.complete(filename)
             
             logger.info(f"✨ Procesamiento completado para {filename}: {total_added} fragmentos agregados al vector store")
             
+            token_histogram = token_length_histogram(
+                doc.metadata["token_count"] for doc in unique_chunks if "token_count" in doc.metadata
+            )
+            if token_histogram:
+                logger.info(f"📊 Histograma de tokens por chunk para {filename}: {token_histogram}")
+            
             return {
                 "filename": filename,
                 "status": "success",
                 "chunks_original": len(chunks),
                 "chunks_unique": len(unique_chunks),
-                "chunks_added": total_added
+                "chunks_added": total_added,
+                "chunks_resumed": chunks_resumed,
+                "token_histogram": token_histogram
             }
             
         except Exception as e:
+            if self.manifest.get_entry(filename):
+                self.manifest.fail(filename, str(e))
             return self._error_result(filename, str(e))
 
+    async def remove_pdf(self, filename: str) -> int:
+        """Elimina del vector store los chunks de un PDF usando el manifiesto.
+
+        Args:
+            filename: Nombre del archivo PDF.
+
+        Returns:
+            Número de chunks eliminados por ID (0 si se recurrió al filtro por metadatos).
+        """
+        chunk_ids = self.manifest.remove(filename)
+        if chunk_ids:
+            await self.vector_store.delete_documents_by_ids(chunk_ids)
+            logger.info(f"🗑️ {len(chunk_ids)} fragmentos de {filename} eliminados del vector store")
+            return len(chunk_ids)
+        # PDF ingestado antes de existir el manifiesto: borrar por metadatos
+        await self.vector_store.delete_documents(filter={"source": filename})
+        return 0
+
+    async def _discard_removed_pdf(self, filename: str) -> int:
+        """Elimina del manifiesto y del vector store los chunks escritos para un PDF ya borrado."""
+        chunk_ids = self.manifest.remove(filename)
+        if chunk_ids:
+            await self.vector_store.delete_documents_by_ids(chunk_ids)
+        return len(chunk_ids)
+
+    def get_ingestion_status(self) -> List[Dict]:
+        """Devuelve el estado de ingesta registrado en el manifiesto para cada PDF."""
+        return self.manifest.list_entries()
+
     async def ingest_pdfs_from_directory(
         self,
         specific_directory: Optional[Path] = None,
         parallel: bool = True,
-        force_update: bool = False
+        force_update: bool = False,
+        bulk_workers: Optional[int] = None
     ) -> List[Dict]:
         """Procesa PDFs de un directorio con paralelización opcional.
         
@@ -141,6 +295,8 @@ class RAGIngestor:
             specific_directory: Directorio específico a procesar.
             parallel: Si usar procesamiento paralelo.
             force_update: Forzar actualización de documentos existentes.
+            bulk_workers: Procesos de embeddings para la carga masiva
+                (por defecto settings.embedding_bulk_workers; 0 o 1 lo desactiva).
             
         Returns:
             Lista de resultados de ingesta.
@@ -154,26 +310,38 @@ class RAGIngestor:
             logger.warning(f"No se encontraron PDFs en {source_dir}")
             return []
         
+        # Carga masiva: repartir los embeddings entre varios procesos
+        bulk_workers = settings.embedding_bulk_workers if bulk_workers is None else bulk_workers
+        started_pool = False
+        if bulk_workers > 1 and len(pdf_files) > 1:
+            logger.info(f"🧵 Iniciando pool de embeddings con {bulk_workers} procesos")
+            started_pool = await asyncio.to_thread(self.embedding_manager.start_bulk_pool, bulk_workers)
+
         results = []
-        if parallel and len(pdf_files) > 1:
-            # Procesamiento paralelo
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # Crear tareas
-                tasks = [
-                    self._process_pdf_parallel(pdf_info, force_update)
-                    for pdf_info in pdf_files
-                ]
-                # Ejecutar y esperar resultados
-                results = await asyncio.gather(*tasks)
-        else:
-            # Procesamiento secuencial
-            for pdf_info in pdf_files:
-                result = await self.ingest_single_pdf(
-                    Path(pdf_info["path"]),
-                    force_update=force_update
-                )
-                results.append(result)
-        
+        try:
+            if parallel and len(pdf_files) > 1:
+                # Procesamiento paralelo
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    # Crear tareas
+                    tasks = [
+                        self._process_pdf_parallel(pdf_info, force_update)
+                        for pdf_info in pdf_files
+                    ]
+                    # Ejecutar y esperar resultados
+                    results = await asyncio.gather(*tasks)
+            else:
+                # Procesamiento secuencial
+                for pdf_info in pdf_files:
+                    result = await self.ingest_single_pdf(
+                        Path(pdf_info["path"]),
+                        force_update=force_update
+                    )
+                    results.append(result)
+        finally:
+            # Solo se detiene el pool que arrancó esta ingesta (otra concurrente puede estar usándolo)
+            if started_pool:
+                await asyncio.to_thread(self.embedding_manager.stop_bulk_pool)
+
         # Resumen
         successful = sum(1 for r in results if r["status"] == "success")
         failed = sum(1 for r in results if r["status"] == "error")
@@ -209,47 +377,137 @@ class RAGIngestor:
             ]
         return self.pdf_file_manager.list_pdfs()
 
-    async def _is_already_processed(self, pdf_path: Path) -> bool:
-        """Verifica si un PDF ya está procesado en el vector store."""
+    async def _is_already_processed(self, pdf_path: Path, file_hash: Optional[str] = None) -> bool:
+        """Verifica si un PDF ya está procesado consultando el manifiesto de ingesta."""
         try:
-            # Verificar si hay documentos con la misma fuente (nombre de archivo)
-            # La operación de get en Chroma es síncrona
-            existing_docs = self.vector_store.store._collection.get(
-                where={"source": pdf_path.name},
-            )
-            # Si la lista de IDs no está vacía, significa que ya existen documentos para esta fuente.
-            return bool(existing_docs.get("ids"))
+            entry = self.manifest.get_entry(pdf_path.name)
+            if entry is not None:
+                return self.manifest.is_processed(pdf_path.name, file_hash)
+            # Sin entrada en el manifiesto: el PDF pudo ingestarse antes de que existiera.
+            # Basta con comprobar un único ID, sin traer documentos ni metadatos.
+            return self.vector_store.has_documents({"source": pdf_path.name})
         except Exception as e:
             logger.error(f"Error verificando PDF procesado: {str(e)}")
             return False
 
-    async def _deduplicate_chunks(self, chunks: List[Document], return_embeddings: bool = False) -> (List[Document], list):
-        """Elimina chunks duplicados o muy similares y retorna también los embeddings si se solicita."""
-        if not chunks:
-            return ([], []) if return_embeddings else []
-        unique_chunks = []
-        unique_embeddings = []
-        content_hashes = set()
-        chunk_texts = [c.page_content for c in chunks]
-        embeddings = self.embedding_manager.embed_documents(chunk_texts)
-        from sklearn.metrics.pairwise import cosine_similarity
-        import numpy as np
-        for i, chunk in enumerate(chunks):
-            content_hash = chunk.metadata.get('content_hash')
-            if content_hash in content_hashes:
-                continue
-            if unique_chunks:
-                existing_embeddings = [embeddings[chunks.index(c)] for c in unique_chunks]
-                similarities = cosine_similarity([embeddings[i]], existing_embeddings)[0]
-                if np.max(similarities) > settings.deduplication_threshold:
-                    continue
-            unique_chunks.append(chunk)
-            unique_embeddings.append(embeddings[i])
-            if content_hash:
-                content_hashes.add(content_hash)
-        if return_embeddings:
-            return unique_chunks, unique_embeddings
-        return unique_chunks
+    def _get_resumable_chunk_ids(self, filename: str, file_hash: str) -> Set[str]:
+        """IDs ya escritos por una ingesta no completada del mismo contenido de archivo."""
+        entry = self.manifest.get_entry(filename)
+        if not entry or entry["status"] == "completed" or entry["file_hash"] != file_hash:
+            return set()
+        return set(self.manifest.get_chunk_ids(filename))
+
+    @staticmethod
+    def _report_progress(progress_callback: Optional[ProgressCallback], stage: str, value: int) -> None:
+        """Reporta progreso sin dejar que un fallo del callback interrumpa la ingesta."""
+        if progress_callback is None:
+            return
+        try:
+            progress_callback(stage, value)
+        except Exception as e:
+            logger.warning(f"Error reportando progreso ({stage}): {e}")
+
+    async def _embed_and_write(
+        self,
+        filename: str,
+        chunks: List[Document],
+        precomputed_embeddings: Dict[str, Any],
+        resumed_ids: Set[str],
+        progress_callback: Optional[ProgressCallback] = None
+    ) -> Tuple[List[Document], int, int]:
+        """Genera embeddings, deduplica y escribe los chunks con doble buffer.
+
+        Mientras el lote N se escribe en el vector store, el lote N+1 se codifica en un
+        hilo. Los chunks cuyo ID aparece en ``precomputed_embeddings`` (p. ej. los ya
+        escritos antes de una interrupción) reutilizan su embedding.
+
+        Returns:
+            Tupla (chunks únicos, chunks añadidos, chunks ya escritos previamente).
+        """
+        deduplicator = _IncrementalDeduplicator(settings.deduplication_threshold)
+        # Con el pool de procesos activo cada lote debe alcanzar para todos los procesos
+        granularity = settings.embedding_batch_size * max(1, self.embedding_manager.bulk_workers)
+        sizer = _AdaptiveBatchSizer(initial=max(self.batch_size, granularity), granularity=granularity)
+        unique_chunks: List[Document] = []
+        total_added = chunks_resumed = chunks_embedded = batch_number = 0
+        position = 0
+
+        def take_batch() -> List[Document]:
+            nonlocal position
+            batch = chunks[position:position + sizer.size]
+            position += len(batch)
+            return batch
+
+        def start_encoding(batch: List[Document]) -> Optional[asyncio.Task]:
+            if not batch:
+                return None
+            return asyncio.create_task(asyncio.to_thread(self._encode_batch, batch, precomputed_embeddings))
+
+        batch = take_batch()
+        encoding = start_encoding(batch)
+        try:
+            while encoding is not None:
+                embeddings, encode_seconds, encoded = await encoding
+                sizer.observe("encode", encoded, encode_seconds)
+                chunks_embedded += len(batch)
+                self._report_progress(progress_callback, "chunks_embedded", chunks_embedded)
+
+                # Doble buffer: el siguiente lote se codifica mientras se escribe este
+                next_batch = take_batch()
+                encoding = start_encoding(next_batch)
+
+                to_write, to_write_embeddings = [], []
+                for chunk, embedding in zip(batch, embeddings):
+                    if not deduplicator.add(chunk, embedding):
+                        continue
+                    unique_chunks.append(chunk)
+                    if self._chunk_id(chunk) in resumed_ids:
+                        chunks_resumed += 1
+                        continue
+                    to_write.append(chunk)
+                    to_write_embeddings.append(embedding)
+
+                if to_write:
+                    batch_number += 1
+                    write_start = time.perf_counter()
+                    try:
+                        added_ids = await self._add_batch_to_vector_store(
+                            to_write, batch_number, embeddings=to_write_embeddings
+                        )
+                        sizer.observe("write", len(to_write), time.perf_counter() - write_start)
+                        self.manifest.add_chunks(filename, added_ids)
+                        total_added += len(added_ids)
+                        if len(added_ids) < len(to_write):
+                            logger.error(f"❌ Lote {batch_number}: solo se escribieron {len(added_ids)} de {len(to_write)} fragmentos")
+                        logger.info(f"✅ Lote {batch_number} procesado: {len(added_ids)} fragmentos agregados al vector store")
+                    except Exception as add_err:
+                        # Se siguen escribiendo los demás lotes; process_pdf detecta los que faltan
+                        logger.error(f"❌ Error procesando lote {batch_number}: {add_err}", exc_info=True)
+                self._report_progress(progress_callback, "chunks_written", total_added + chunks_resumed)
+                batch = next_batch
+        finally:
+            if encoding is not None and not encoding.done():
+                encoding.cancel()
+        return unique_chunks, total_added, chunks_resumed
+
+    def _encode_batch(
+        self,
+        batch: List[Document],
+        precomputed_embeddings: Dict[str, Any]
+    ) -> Tuple[list, float, int]:
+        """Codifica (en un hilo) los chunks del lote sin embedding previo.
+
+        Returns:
+            Tupla (embeddings en el orden del lote, segundos de codificación, chunks codificados).
+        """
+        embeddings = [precomputed_embeddings.get(self._chunk_id(chunk)) for chunk in batch]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        start = time.perf_counter()
+        if missing:
+            computed = self.embedding_manager.embed_documents([batch[i].page_content for i in missing])
+            for i, embedding in zip(missing, computed):
+                embeddings[i] = embedding
+        return embeddings, time.perf_counter() - start, len(missing)
 
     def _update_processed_hashes(self, chunks: List[Document]) -> None:
         """Actualiza el conjunto de hashes procesados."""
@@ -272,31 +530,46 @@ class RAGIngestor:
         logger.info("Limpiando vector store...")
         try:
             await self.vector_store.delete_collection()
+            self.manifest.clear()
             self._processed_hashes.clear()
             logger.info("Vector store limpiado exitosamente")
         except Exception as e:
             logger.error(f"Error limpiando vector store: {str(e)}")
             raise
 
-    async def _add_batch_to_vector_store(self, batch: List[Document], batch_number: int, embeddings: list = None):
-        """Función auxiliar asíncrona para añadir un lote de documentos al vector store, permitiendo pasar embeddings."""
+    async def _add_batch_to_vector_store(self, batch: List[Document], batch_number: int, embeddings: list = None) -> List[str]:
+        """Función auxiliar asíncrona para añadir un lote de documentos al vector store, permitiendo pasar embeddings.
+
+        Returns:
+            IDs de los chunks añadidos.
+        """
         if not batch:
             logger.warning(f"_add_batch_to_vector_store llamado con lote vacío para el lote {batch_number}.")
-            return # No hacer nada si el lote está vacío
+            return [] # No hacer nada si el lote está vacío
         if not isinstance(batch, list):
             raise TypeError(f"Batch is not a list inside _add_batch_to_vector_store for batch {batch_number}. Type: {type(batch)}")
         if not batch[0] or not isinstance(batch[0], Document):
              raise TypeError(f"First element in batch is not a valid Document inside _add_batch_to_vector_store for batch {batch_number}. Type: {type(batch[0])}")
         logger.debug(f"Attempting to add batch {batch_number} to vector store. Batch size: {len(batch)}.")
         try:
-            await self.vector_store.add_documents(batch, embeddings=embeddings)
+            ids = [self._chunk_id(doc) for doc in batch]
+            added_ids = await self.vector_store.add_documents(batch, embeddings=embeddings, ids=ids)
             logger.debug(f"vector_store.add_documents completed successfully for batch {batch_number}.")
+            return added_ids
         except TypeError as te:
             raise TypeError(f"TypeError during vector_store.add_documents for batch {batch_number}. Error: {te}") from te
         except Exception as ex:
             logger.error(f"Unexpected error during vector_store.add_documents for batch {batch_number}: {ex}", exc_info=True)
             raise ex # Re-lanzar la excepción principal si ocurre un error no manejado aquí
 
+    @staticmethod
+    def _chunk_id(doc: Document) -> Optional[str]:
+        """ID determinista de un chunk: fuente + hash de contenido."""
+        content_hash = doc.metadata.get('content_hash')
+        if not content_hash:
+            return None
+        return f"{doc.metadata.get('source', 'unknown')}_{content_hash}"
+
     # Ejemplo de cómo se instanciaría (no va aquí):
     # from ...config import Settings
     # settings_instance = Settings()
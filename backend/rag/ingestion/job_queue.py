@@ -0,0 +1,235 @@
+"""Cola persistente de trabajos de ingesta con un pool acotado de workers."""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from .ingestor import RAGIngestor
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_SKIPPED = "skipped"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+_PROGRESS_FIELDS = ("pages_parsed", "chunks_total", "chunks_embedded", "chunks_written")
+
+
+class IngestionJobQueue:
+    """Cola de ingesta persistida en SQLite.
+
+    Los trabajos se guardan antes de encolarse, de modo que los que estaban en cola
+    o en ejecución al caerse el proceso se reanudan al arrancar. Un número fijo de
+    workers consume la cola, limitando la carga sobre el modelo de embeddings.
+    """
+
+    def __init__(
+        self,
+        rag_ingestor: RAGIngestor,
+        db_path: Union[str, Path],
+        max_workers: int = 2,
+        max_attempts: int = 3
+    ):
+        """Inicializa la cola.
+
+        Args:
+            rag_ingestor: Ingestor que procesa cada PDF.
+            db_path: Ruta al archivo SQLite de trabajos.
+            max_workers: Número de trabajos de ingesta concurrentes.
+            max_attempts: Intentos máximos por trabajo; un trabajo que sigue 'running'
+                tras tantos intentos (p. ej. un PDF que tumba el proceso) se marca fallido.
+        """
+        self.rag_ingestor = rag_ingestor
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._initialize_schema()
+        logger.info(f"IngestionJobQueue inicializada en {self.db_path} con {self.max_workers} workers")
+
+    def _initialize_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    force_update INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    pages_parsed INTEGER NOT NULL DEFAULT 0,
+                    chunks_total INTEGER NOT NULL DEFAULT 0,
+                    chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                    chunks_written INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    async def start(self) -> None:
+        """Arranca los workers y reencola los trabajos pendientes de una ejecución anterior."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING)
+            ).fetchall()
+        for row in pending:
+            self._queue.put_nowait(row["id"])
+        if pending:
+            logger.info(f"Reanudando {len(pending)} trabajos de ingesta pendientes")
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self.max_workers)
+        ]
+
+    async def submit(self, file_path: Path, force_update: bool = False) -> Dict:
+        """Registra un trabajo de ingesta y lo encola.
+
+        Si la cola aún no arrancó, el trabajo queda registrado y start() lo encola.
+
+        Args:
+            file_path: Ruta del PDF a ingestar.
+            force_update: Forzar la reingesta aunque el PDF ya esté procesado.
+
+        Returns:
+            Estado inicial del trabajo.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (id, filename, file_path, force_update, status, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (job_id, Path(file_path).name, str(file_path), int(force_update), JOB_QUEUED, now, now)
+            )
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+        logger.info(f"Trabajo de ingesta {job_id} encolado para {Path(file_path).name}")
+        return self.get_job(job_id)
+
+    def cancel_file(self, filename: str) -> int:
+        """Cancela los trabajos en cola de un archivo (al eliminarlo).
+
+        Los que ya están en ejecución no se interrumpen: el ingestor comprueba que el
+        archivo siga existiendo antes de completarlo y, si no, descarta lo escrito.
+
+        Returns:
+            Número de trabajos cancelados.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE filename = ? AND status = ?",
+                (JOB_CANCELLED, "El PDF se eliminó antes de procesarse", time.time(), filename, JOB_QUEUED)
+            )
+        if cursor.rowcount:
+            logger.info(f"{cursor.rowcount} trabajos de ingesta de {filename} cancelados")
+        return cursor.rowcount
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Obtiene el estado y progreso de un trabajo."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict]:
+        """Lista los trabajos más recientes."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def _update_job(self, job_id: str, **fields) -> None:
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            if self._closed:
+                # Progreso que llega de un hilo de ingesta después de close()
+                return
+            with self._conn:
+                self._conn.execute(
+                    f"UPDATE jobs SET {assignments} WHERE id = ?",
+                    (*fields.values(), job_id)
+                )
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: error inesperado en trabajo {job_id}: {e}", exc_info=True)
+                self._update_job(job_id, status=JOB_FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = self.get_job(job_id)
+        if not job or job["status"] not in (JOB_QUEUED, JOB_RUNNING):
+            return
+        if job["attempts"] >= self.max_attempts:
+            # Interrumpido en cada intento (p. ej. el PDF tumba el proceso): no reintentar en bucle
+            error = f"Se superó el máximo de {self.max_attempts} intentos"
+            self._update_job(job_id, status=JOB_FAILED, error=error)
+            logger.error(f"Trabajo de ingesta {job_id} ({job['filename']}) marcado como fallido: {error}")
+            return
+        # Un trabajo que ya estaba 'running' quedó interrumpido: se reanuda desde su checkpoint
+        resume = job["status"] == JOB_RUNNING
+        self._update_job(job_id, status=JOB_RUNNING, attempts=job["attempts"] + 1, error=None)
+
+        loop = asyncio.get_running_loop()
+
+        def on_progress(stage: str, value: int) -> None:
+            # Se llama desde los hilos de parseo/embeddings: la escritura se hace en el event loop
+            if stage in _PROGRESS_FIELDS and not loop.is_closed():
+                loop.call_soon_threadsafe(partial(self._update_job, job_id, **{stage: value}))
+
+        result = await self.rag_ingestor.ingest_single_pdf(
+            Path(job["file_path"]),
+            force_update=bool(job["force_update"]),
+            progress_callback=on_progress,
+            resume=resume
+        )
+        status = {
+            "success": JOB_COMPLETED,
+            "skipped": JOB_SKIPPED,
+            "cancelled": JOB_CANCELLED,
+        }.get(result.get("status"), JOB_FAILED)
+        self._update_job(job_id, status=status, error=result.get("error"))
+        logger.info(f"Trabajo de ingesta {job_id} ({job['filename']}) finalizado con estado '{status}'")
+
+    async def close(self) -> None:
+        """Detiene los workers. Los trabajos en curso quedan 'running' y se reanudan al reiniciar."""
+        for task in self._workers:
+            task.cancel()
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        with self._lock:
+            self._closed = True
+            self._conn.close()
+        logger.info("IngestionJobQueue cerrada")
@@ -0,0 +1,193 @@
+"""Manifiesto local de ingesta respaldado por SQLite.
+
+Mantiene, por cada PDF ingestado, el hash del archivo, su estado de ingesta y los
+IDs de los chunks escritos en el vector store. Permite responder en O(1) si un PDF
+ya fue procesado, cuántos chunks tiene o qué IDs borrar, sin escanear la colección
+de Chroma.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class IngestionManifest:
+    """Índice local (SQLite) de archivos ingestados y sus chunks."""
+
+    def __init__(self, db_path: Union[str, Path]):
+        """Inicializa el manifiesto.
+
+        Args:
+            db_path: Ruta al archivo SQLite del manifiesto.
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._initialize_schema()
+        logger.info(f"IngestionManifest inicializado en {self.db_path}")
+
+    def _initialize_schema(self) -> None:
+        """Crea las tablas e índices si no existen."""
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    source TEXT PRIMARY KEY,
+                    file_hash TEXT,
+                    status TEXT NOT NULL,
+                    chunk_count INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    chunk_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source)")
+
+    def get_entry(self, source: str) -> Optional[Dict]:
+        """Obtiene la entrada del manifiesto para una fuente.
+
+        Args:
+            source: Nombre del archivo (metadato 'source' de los chunks).
+
+        Returns:
+            Diccionario con los datos de la entrada o None si no existe.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source, file_hash, status, chunk_count, error, updated_at FROM files WHERE source = ?",
+                (source,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_processed(self, source: str, file_hash: Optional[str] = None) -> bool:
+        """Indica si una fuente terminó su ingesta (y con el mismo contenido, si se da el hash)."""
+        entry = self.get_entry(source)
+        if not entry or entry["status"] != STATUS_COMPLETED:
+            return False
+        return file_hash is None or entry["file_hash"] == file_hash
+
+    def begin(self, source: str, file_hash: Optional[str], reset: bool = True) -> None:
+        """Marca el inicio de la ingesta de una fuente.
+
+        Args:
+            source: Nombre del archivo.
+            file_hash: Hash SHA-256 del archivo.
+            reset: Si descartar los chunks registrados previamente para la fuente.
+        """
+        with self._lock, self._conn:
+            if reset:
+                self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._conn.execute(
+                """
+                INSERT INTO files (source, file_hash, status, chunk_count, error, updated_at)
+                VALUES (?, ?, ?, 0, NULL, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    file_hash = excluded.file_hash,
+                    status = excluded.status,
+                    error = NULL,
+                    updated_at = excluded.updated_at,
+                    chunk_count = CASE WHEN ? THEN 0 ELSE files.chunk_count END
+                """,
+                (source, file_hash, STATUS_PROCESSING, time.time(), int(reset))
+            )
+
+    def add_chunks(self, source: str, chunk_ids: Iterable[str]) -> None:
+        """Registra los IDs de chunks escritos en el vector store para una fuente."""
+        rows = [(chunk_id, source) for chunk_id in chunk_ids]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, source) VALUES (?, ?)",
+                rows
+            )
+            self._conn.execute(
+                """
+                UPDATE files
+                SET chunk_count = (SELECT COUNT(*) FROM chunks WHERE source = ?), updated_at = ?
+                WHERE source = ?
+                """,
+                (source, time.time(), source)
+            )
+
+    def complete(self, source: str) -> None:
+        """Marca la ingesta de una fuente como completada."""
+        self._set_status(source, STATUS_COMPLETED)
+
+    def fail(self, source: str, error: str) -> None:
+        """Marca la ingesta de una fuente como fallida."""
+        self._set_status(source, STATUS_FAILED, error)
+
+    def _set_status(self, source: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE files SET status = ?, error = ?, updated_at = ? WHERE source = ?",
+                (status, error, time.time(), source)
+            )
+
+    def get_chunk_ids(self, source: str) -> List[str]:
+        """Devuelve los IDs de chunks registrados para una fuente."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+        return [row["chunk_id"] for row in rows]
+
+    def remove(self, source: str) -> List[str]:
+        """Elimina una fuente del manifiesto.
+
+        Returns:
+            Lista de IDs de chunks que estaban registrados para la fuente.
+        """
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE source = ?", (source,)
+            ).fetchall()
+            self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM files WHERE source = ?", (source,))
+        return [row["chunk_id"] for row in rows]
+
+    def list_entries(self) -> List[Dict]:
+        """Lista todas las entradas del manifiesto."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, file_hash, status, chunk_count, error, updated_at FROM files ORDER BY source"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def total_chunks(self) -> int:
+        """Número total de chunks registrados."""
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(SUM(chunk_count), 0) AS total FROM files").fetchone()
+        return int(row["total"])
+
+    def clear(self) -> None:
+        """Vacía el manifiesto."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM files")
+        logger.info("Manifiesto de ingesta vaciado")
+
+    def close(self) -> None:
+        """Cierra la conexión a SQLite."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,196 @@
+"""Cálculo rápido de la calidad de los chunks."""
+import re
+from typing import Iterable, List, Set
+
+# Grupos de palabras clave que introducen términos importantes. Cada grupo conserva
+# su propio patrón para reproducir exactamente las coincidencias no solapadas que
+# producía un finditer independiente por grupo.
+_KEYWORD_GROUPS = (
+    ("importante", "requisito", "necesario", "requiere", "debe", "obligatorio"),
+    ("proceso", "procedimiento", "instrucciones"),
+    ("nota", "atención", "consideración"),
+    ("requisitos", "documentación"),
+    ("definición", "concepto", "término"),
+    ("objetivo", "meta", "propósito"),
+    ("característica", "propiedad", "atributo"),
+    ("clasificación", "categoría", "tipo"),
+)
+_GROUP_PATTERNS = tuple(
+    re.compile(r"(?:" + "|".join(group) + r")[:\s]+([^.\n]+)") for group in _KEYWORD_GROUPS
+)
+_KEYWORD_TO_GROUP = {keyword: index for index, group in enumerate(_KEYWORD_GROUPS) for keyword in group}
+
+_BULLETS = ("•", "-", "*")
+_LINE_BULLETS = tuple("\n" + bullet for bullet in _BULLETS)
+_LIST_ITEM_RE = re.compile(r"(?:^|\n)[•\-\*]\s*([^.\n]+)")
+_COLON_TERM_RE = re.compile(r":\s*([^.\n]+)")
+_EMPHASIS_RE = re.compile(r"\*\*([^*]+)\*\*|\*([^*]+)\*")
+# Caracteres de palabra o espacio (\w, \s); lo que queda al borrarlos son los especiales
+_WORD_OR_SPACE_RUN_RE = re.compile(r"[\w\s]+")
+_WORD_OR_SPACE_BYTES = bytes(
+    code for code in range(256) if chr(code).isalnum() or chr(code) == "_" or chr(code).isspace()
+)
+
+_DEFINITION_MARKERS = ("es", "son", "se define", "se refiere")
+# "por ejemplo" contiene "ejemplo" y "tales como" contiene "como"
+_EXAMPLE_MARKERS = ("ejemplo", "como")
+_SATURATION_BOUND = 1.0 + 1e-9
+
+
+class ChunkQualityScorer:
+    """Puntúa la calidad de los chunks con las mismas reglas que PDFContentLoader.
+
+    El score se satura en 1.0, por lo que la extracción de términos (lo más caro)
+    solo se ejecuta en los chunks penalizados que no alcanzan ese tope con el resto
+    de bonus. Cuando se ejecuta, el texto se pasa a minúsculas una única vez, las
+    palabras clave se localizan con búsquedas de subcadena en lugar de ocho
+    recorridos con regex, y se omiten las regex cuyo carácter disparador ("*", ":",
+    viñetas) no aparece en el texto.
+    """
+
+    @staticmethod
+    def _keyword_positions(lower: str):
+        """Posiciones (ordenadas) donde aparece alguna palabra clave de cada grupo."""
+        positions = None
+        for keyword, group in _KEYWORD_TO_GROUP.items():
+            position = lower.find(keyword)
+            while position != -1:
+                if positions is None:
+                    positions = [[] for _ in _KEYWORD_GROUPS]
+                positions[group].append(position)
+                position = lower.find(keyword, position + 1)
+        if positions is not None:
+            for group_positions in positions:
+                group_positions.sort()
+        return positions
+
+    @staticmethod
+    def _count_special_chars(content: str) -> int:
+        """Cuenta los caracteres que coinciden con [^\\w\\s]."""
+        try:
+            # Texto latin-1 (el caso habitual en español): se borran en C los bytes de palabra/espacio
+            return len(content.encode("latin-1").translate(None, _WORD_OR_SPACE_BYTES))
+        except UnicodeEncodeError:
+            return len(_WORD_OR_SPACE_RUN_RE.sub("", content))
+
+    @staticmethod
+    def _has_list_structure(content: str) -> bool:
+        """Equivale a re.search(r'(?:^|\\n)[•\\-\\*]|\\d+\\.', content)."""
+        if content.startswith(_BULLETS) or ("\n" in content and any(b in content for b in _LINE_BULLETS)):
+            return True
+        # \d+\. coincide si y solo si algún dígito decimal va seguido de un punto
+        position = content.find(".")
+        while position != -1:
+            if position and content[position - 1].isdecimal():
+                return True
+            position = content.find(".", position + 1)
+        return False
+
+    def extract_important_terms(self, text: str, lower: str = None) -> Set[str]:
+        """Extrae términos importantes del texto basándose en patrones y contexto."""
+        if lower is None:
+            lower = text.lower()
+        important_terms = set()
+
+        # Solo se intenta el patrón de un grupo donde empieza una de sus palabras clave,
+        # reproduciendo el recorrido de finditer (tras una coincidencia, continúa desde su final)
+        candidates = self._keyword_positions(lower)
+        if candidates is not None:
+            for pattern, positions in zip(_GROUP_PATTERNS, candidates):
+                next_start = 0
+                for position in positions:
+                    if position < next_start:
+                        continue
+                    match = pattern.match(lower, position)
+                    if match:
+                        term = match.group(1).strip()
+                        if len(term.split(None, 4)) <= 4:
+                            important_terms.add(term)
+                        next_start = match.end()
+
+        if text.startswith(_BULLETS) or ("\n" in text and any(b in text for b in _LINE_BULLETS)):
+            important_terms.update(item.strip() for item in _LIST_ITEM_RE.findall(text))
+
+        if ":" in text:
+            important_terms.update(
+                term.strip() for term in _COLON_TERM_RE.findall(text) if len(term.split(None, 4)) <= 4
+            )
+
+        if "*" in text:
+            for bold, italic in _EMPHASIS_RE.findall(text):
+                term = bold or italic
+                if term and len(term.split(None, 4)) <= 4:
+                    important_terms.add(term.strip())
+
+        return important_terms
+
+    def score(self, content: str) -> float:
+        """Calcula la calidad de un chunk.
+
+        Todos los factores posteriores a las penalizaciones son >= 1 y el resultado se
+        limita a 1.0, así que en cuanto el producto alcanza 1.0 se devuelve sin calcular
+        el resto (en particular, sin extraer términos). Cuando hay que calcularlo todo,
+        los factores se aplican en el mismo orden que la implementación original para
+        obtener exactamente el mismo valor en coma flotante.
+        """
+        score = 1.0
+
+        # Penalización por chunks muy cortos
+        if len(content) < 50:
+            score *= 0.7
+
+        # Penalización por densidad de palabras baja (basta con contar hasta 10 palabras)
+        if len(content.split(None, 10)) < 10:
+            score *= 0.8
+
+        # Penalización por alta proporción de caracteres especiales
+        if self._count_special_chars(content) / len(content) > 0.3:
+            score *= 0.8
+
+        if score >= 1.0:
+            return 1.0
+
+        # Bonus por estructura gramatical correcta
+        if content[0].isupper() and content[-1] in '.!?':
+            score *= 1.1
+
+        lower = content.lower()
+        has_list = self._has_list_structure(content)
+        has_definition = any(marker in lower for marker in _DEFINITION_MARKERS)
+        has_example = any(marker in lower for marker in _EXAMPLE_MARKERS)
+
+        # Cota inferior sin el bonus por términos (>= 1); el margen cubre el redondeo
+        bound = score
+        if has_list:
+            bound *= 1.2
+        if has_definition:
+            bound *= 1.1
+        if has_example:
+            bound *= 1.1
+        if bound >= _SATURATION_BOUND:
+            return 1.0
+
+        # Bonus por términos importantes
+        important_terms = self.extract_important_terms(content, lower)
+        if important_terms:
+            score *= (1 + len(important_terms) * 0.1)
+
+        # Bonus por estructura de lista o numeración
+        if has_list:
+            score *= 1.2
+
+        # Bonus por presencia de definiciones o conceptos
+        if has_definition:
+            score *= 1.1
+
+        # Bonus por presencia de ejemplos
+        if has_example:
+            score *= 1.1
+
+        # Asegurar que el score no exceda 1.0
+        return min(score, 1.0)
+
+    def score_batch(self, contents: Iterable[str]) -> List[float]:
+        """Calcula la calidad de varios chunks."""
+        score = self.score
+        return [score(content) for content in contents]
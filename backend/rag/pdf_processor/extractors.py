@@ -0,0 +1,143 @@
+"""Backends de extracción de texto de PDFs."""
+import logging
+import tempfile
+from abc import ABC, abstractmethod
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractorTypes(str, Enum):
+    TEXT_LAYER = "text-layer"
+    UNSTRUCTURED = "unstructured"
+
+
+class BasePDFExtractor(ABC):
+    """Interfaz común de los extractores de texto."""
+
+    # Identifica la salida del extractor; cambia cuando cambia el texto que produce.
+    version: str = ""
+
+    @abstractmethod
+    def extract_pages(self, pdf_path: Path) -> List[Document]:
+        """Extrae el texto del PDF como una lista de Documents."""
+
+
+class UnstructuredPDFExtractor(BasePDFExtractor):
+    """Extractor basado en UnstructuredPDFLoader (lento, pero soporta PDFs escaneados)."""
+
+    version = "unstructured-single-v1"
+
+    def extract_pages(self, pdf_path: Path) -> List[Document]:
+        from langchain_community.document_loaders import UnstructuredPDFLoader
+
+        loader = UnstructuredPDFLoader(str(pdf_path))
+        return loader.load()
+
+    def extract_page_texts(self, pdf_path: Path, page_numbers: Iterable[int]) -> Dict[int, str]:
+        """Extrae únicamente el texto de las páginas indicadas (numeradas desde 1).
+
+        Las páginas se copian a un PDF temporal con pypdf, así que Unstructured solo
+        procesa (y aplica OCR a) esas páginas y no al documento completo.
+        """
+        from langchain_community.document_loaders import UnstructuredPDFLoader
+        from pypdf import PdfReader, PdfWriter
+
+        wanted = sorted(set(page_numbers))
+        if not wanted:
+            return {}
+        reader = PdfReader(str(pdf_path))
+        writer = PdfWriter()
+        for page in wanted:
+            writer.add_page(reader.pages[page - 1])
+
+        texts: Dict[int, List[str]] = {page: [] for page in wanted}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            subset_path = Path(tmp_dir) / pdf_path.name
+            with open(subset_path, "wb") as subset_file:
+                writer.write(subset_file)
+            loader = UnstructuredPDFLoader(str(subset_path), mode="elements")
+            for element in loader.load():
+                # page_number es la posición en el PDF temporal
+                position = element.metadata.get("page_number")
+                if position and 1 <= position <= len(wanted) and element.page_content:
+                    texts[wanted[position - 1]].append(element.page_content)
+        return {page: "\n\n".join(parts) for page, parts in texts.items()}
+
+
+class TextLayerPDFExtractor(BasePDFExtractor):
+    """Extractor rápido de la capa de texto con pdfminer.
+
+    Las páginas sin texto que contienen imágenes (escaneadas) se delegan a
+    Unstructured; las que no tienen ni texto ni imágenes están en blanco y se omiten.
+    """
+
+    version = "pdfminer-text-v2"
+
+    def __init__(self, fallback_extractor: Optional[UnstructuredPDFExtractor] = None):
+        self.fallback_extractor = fallback_extractor or UnstructuredPDFExtractor()
+
+    def extract_pages(self, pdf_path: Path) -> List[Document]:
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        page_texts = []
+        scanned_pages = []
+        for number, page_layout in enumerate(extract_pages(str(pdf_path)), start=1):
+            text = "".join(
+                element.get_text() for element in page_layout if isinstance(element, LTTextContainer)
+            )
+            page_texts.append(text)
+            if not text.strip() and self._has_images(page_layout):
+                scanned_pages.append(number)
+
+        blank_pages = sum(1 for text in page_texts if not text.strip()) - len(scanned_pages)
+        if blank_pages:
+            logger.debug(f"{blank_pages} páginas en blanco en {pdf_path.name}")
+        if scanned_pages:
+            logger.info(f"{len(scanned_pages)} páginas sin capa de texto en {pdf_path.name}, usando Unstructured")
+            try:
+                fallback_texts = self.fallback_extractor.extract_page_texts(pdf_path, scanned_pages)
+                for number, text in fallback_texts.items():
+                    page_texts[number - 1] = text
+            except Exception as e:
+                logger.warning(f"Fallback a Unstructured falló para {pdf_path.name}: {e}")
+
+        return [
+            Document(page_content=text, metadata={"source": str(pdf_path), "page_number": number})
+            for number, text in enumerate(page_texts, start=1)
+            if text.strip()
+        ]
+
+
+    @staticmethod
+    def _has_images(layout) -> bool:
+        """Si la página (o alguna figura suya) contiene imágenes que puedan tener texto."""
+        from pdfminer.layout import LTContainer, LTFigure, LTImage
+
+        for element in layout:
+            if isinstance(element, (LTImage, LTFigure)):
+                return True
+            if isinstance(element, LTContainer) and TextLayerPDFExtractor._has_images(element):
+                return True
+        return False
+
+
+EXTRACTOR_TO_CLASS = {
+    ExtractorTypes.TEXT_LAYER.value: TextLayerPDFExtractor,
+    ExtractorTypes.UNSTRUCTURED.value: UnstructuredPDFExtractor,
+}
+
+
+def get_extractor(extractor_type: str) -> BasePDFExtractor:
+    """Instancia el extractor configurado."""
+    try:
+        return EXTRACTOR_TO_CLASS[ExtractorTypes(extractor_type).value]()
+    except ValueError:
+        raise ValueError(
+            f"Extractor '{extractor_type}' no válido. Opciones: {[e.value for e in ExtractorTypes]}"
+        )
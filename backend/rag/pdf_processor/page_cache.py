@@ -0,0 +1,73 @@
+"""Caché en disco del texto limpio por página de cada PDF."""
+import gzip
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Union
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+
+class ParsedPageCache:
+    """Guarda las páginas ya extraídas y limpiadas en JSON comprimido con gzip.
+
+    La clave es el SHA-256 del archivo más la versión del pipeline de extracción,
+    de modo que cambiar el extractor o la limpieza invalida las entradas antiguas
+    mientras que cambiar los parámetros de chunking las reutiliza.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path]):
+        """Inicializa la caché.
+
+        Args:
+            cache_dir: Directorio donde se guardan las entradas.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, file_hash: str, version: str) -> Path:
+        return self.cache_dir / f"{file_hash}-{version}.json.gz"
+
+    def get(self, file_hash: str, version: str) -> Optional[List[Document]]:
+        """Devuelve las páginas cacheadas o None si no hay entrada válida."""
+        path = self._entry_path(file_hash, version)
+        if not path.exists():
+            self.misses += 1
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                pages = json.load(f)
+            self.hits += 1
+            return [Document(page_content=p["page_content"], metadata=p["metadata"]) for p in pages]
+        except Exception as e:
+            logger.warning(f"Entrada de caché de páginas corrupta ({path.name}): {e}. Se descarta.")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+    def put(self, file_hash: str, version: str, pages: List[Document]) -> None:
+        """Guarda las páginas de un archivo (escritura atómica)."""
+        path = self._entry_path(file_hash, version)
+        payload = [{"page_content": p.page_content, "metadata": p.metadata} for p in pages]
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la caché de páginas para {file_hash[:12]}: {e}")
+            if tmp_path:
+                Path(tmp_path).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Elimina todas las entradas de la caché."""
+        for entry in self.cache_dir.glob("*.json.gz"):
+            entry.unlink(missing_ok=True)
+        logger.info("Caché de páginas vaciada")
@@ -1,76 +1,169 @@
 """Módulo para cargar y procesar contenido de PDFs."""
 import re
 import hashlib
-from typing import List, Optional, Dict
+from enum import Enum
+from typing import Callable, List, Optional, Dict
 from pathlib import Path
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-from langchain_community.document_loaders import UnstructuredPDFLoader
 import logging
 
+from .chunk_scorer import ChunkQualityScorer
+from .extractors import ExtractorTypes, get_extractor
+from .page_cache import ParsedPageCache
+from .text_normalizer import normalize_page_text
+from .token_counter import TokenCounter
+from ...file_system.file_hash import compute_file_hash
+
+# Versión de la limpieza/normalización de páginas. Forma parte de la clave de la
+# caché de páginas: incrementarla si cambia el texto producido por _preprocess_documents.
+TEXT_PIPELINE_VERSION = "clean-v1"
+
 logger = logging.getLogger(__name__)
 
+TEXT_SEPARATORS = [
+    "\n\n",  # Párrafos
+    "\n",    # Líneas
+    ".",     # Oraciones
+    ";",     # Cláusulas
+    ":",     # Listas/definiciones
+    "!",     # Exclamaciones
+    "?",     # Preguntas
+    ",",     # Frases
+    " ",     # Palabras
+    ""       # Caracteres
+]
+
+
+class ChunkingModes(str, Enum):
+    """Unidad con la que se mide el tamaño de los chunks."""
+    CHARACTERS = "characters"
+    TOKENS = "tokens"
+
+
 class PDFContentLoader:
     """Cargador optimizado de contenido PDF con pre y post procesamiento."""
     
     def __init__(self, 
                  chunk_size: int = 700, 
                  chunk_overlap: int = 150,
-                 min_chunk_length: int = 100):
+                 min_chunk_length: int = 100,
+                 extractor_type: str = ExtractorTypes.TEXT_LAYER.value,
+                 page_cache: Optional[ParsedPageCache] = None,
+                 chunking_mode: str = ChunkingModes.CHARACTERS.value,
+                 token_counter: Optional[TokenCounter] = None):
         """Inicializa el cargador con parámetros mejorados.
         
         Args:
-            chunk_size: Tamaño de los chunks para la división de texto.
-            chunk_overlap: Solapamiento entre chunks.
-            min_chunk_length: Longitud mínima para considerar un chunk válido.
+            chunk_size: Tamaño de los chunks (caracteres o tokens según chunking_mode).
+            chunk_overlap: Solapamiento entre chunks (misma unidad que chunk_size).
+            min_chunk_length: Longitud mínima en caracteres para considerar un chunk válido.
+            extractor_type: Backend de extracción de texto ("text-layer" o "unstructured").
+            page_cache: Caché opcional de páginas limpias por hash de archivo.
+            chunking_mode: "characters" o "tokens" (tokenizer del modelo de embeddings).
+            token_counter: Contador de tokens. Obligatorio en modo "tokens"; en modo
+                "characters" se usa solo para anotar token_count en cada chunk.
         """
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=[
-                "\n\n",  # Párrafos
-                "\n",    # Líneas
-                ".",     # Oraciones
-                ";",     # Cláusulas
-                ":",     # Listas/definiciones
-                "!",     # Exclamaciones
-                "?",     # Preguntas
-                ",",     # Frases
-                " ",     # Palabras
-                ""       # Caracteres
-            ]
-        )
+        self.chunking_mode = ChunkingModes(chunking_mode)
+        if self.chunking_mode == ChunkingModes.TOKENS and token_counter is None:
+            raise ValueError("El modo de chunking 'tokens' requiere un TokenCounter")
+        self.extractor = get_extractor(extractor_type)
+        self.page_cache = page_cache
+        self.page_cache_version = f"{self.extractor.version}-{TEXT_PIPELINE_VERSION}"
+        self.token_counter = token_counter
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._text_splitter = None
         self.min_chunk_length = min_chunk_length
+        self.quality_scorer = ChunkQualityScorer()
         logger.info(
             f"PDFContentLoader inicializado con chunk_size={chunk_size}, "
-            f"chunk_overlap={chunk_overlap}, min_chunk_length={min_chunk_length}"
+            f"chunk_overlap={chunk_overlap}, min_chunk_length={min_chunk_length}, "
+            f"chunking_mode={self.chunking_mode.value}, extractor={self.extractor.version}"
+        )
+
+    @property
+    def text_splitter(self) -> RecursiveCharacterTextSplitter:
+        """Splitter de texto; en modo tokens se crea al primer uso para no cargar el tokenizer antes."""
+        if self._text_splitter is None:
+            self._text_splitter = self._build_text_splitter()
+        return self._text_splitter
+
+    def _build_text_splitter(self) -> RecursiveCharacterTextSplitter:
+        if self.chunking_mode != ChunkingModes.TOKENS:
+            return RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+                separators=TEXT_SEPARATORS
+            )
+        
+        chunk_size, chunk_overlap = self.chunk_size, self.chunk_overlap
+        max_tokens = self.token_counter.max_content_tokens
+        if max_tokens is not None and chunk_size > max_tokens:
+            logger.warning(
+                f"chunk_size de {chunk_size} tokens supera el máximo del modelo ({max_tokens}); "
+                f"se usará {max_tokens} para evitar truncamiento"
+            )
+            chunk_size = max_tokens
+        if chunk_overlap >= chunk_size:
+            chunk_overlap = chunk_size // 4
+            logger.warning(f"chunk_overlap ajustado a {chunk_overlap} tokens (debe ser menor que chunk_size)")
+        logger.info(f"Splitter por tokens: chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
+        # Los segmentos se tokenizan una sola vez gracias a la memoización de TokenCounter
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=self.token_counter.count,
+            separators=TEXT_SEPARATORS
         )
 
-    def load_and_split_pdf(self, pdf_path: Path) -> List[Document]:
+    def load_and_split_pdf(
+        self,
+        pdf_path: Path,
+        progress_callback: Optional[Callable[[str, int], None]] = None,
+        file_hash: Optional[str] = None
+    ) -> List[Document]:
         """Carga un PDF, lo divide en chunks y aplica pre/post procesamiento.
         
+        Si hay caché de páginas, el parseo y la limpieza se omiten cuando el archivo
+        (por su SHA-256) ya fue procesado con el mismo extractor.
+        
         Args:
             pdf_path: Ruta al archivo PDF.
+            progress_callback: Función opcional que recibe ("pages_parsed", n).
+            file_hash: SHA-256 del archivo si ya se calculó (evita releerlo).
             
         Returns:
             Lista de Documents procesados y optimizados.
         """
         logger.info(f"Procesando PDF: {pdf_path.name}")
         try:
-            # Usar UnstructuredPDFLoader para mejor extracción
-            loader = UnstructuredPDFLoader(str(pdf_path))
-            documents = loader.load()
+            processed_docs = None
+            if self.page_cache is not None:
+                file_hash = file_hash or compute_file_hash(pdf_path)
+                processed_docs = self.page_cache.get(file_hash, self.page_cache_version)
+                if processed_docs is not None:
+                    logger.info(f"Páginas de {pdf_path.name} recuperadas de la caché ({len(processed_docs)} páginas)")
             
-            if not documents:
-                logger.warning(f"No se pudo extraer contenido de: {pdf_path.name}")
-                return []
+            if processed_docs is None:
+                documents = self.extractor.extract_pages(pdf_path)
                 
-            logger.info(f"PDF cargado: {len(documents)} páginas desde {pdf_path.name}")
+                if not documents:
+                    logger.warning(f"No se pudo extraer contenido de: {pdf_path.name}")
+                    return []
+                    
+                logger.info(f"PDF cargado: {len(documents)} páginas desde {pdf_path.name}")
+                
+                # Pre-procesar documentos
+                processed_docs = self._preprocess_documents(documents)
+                logger.info(f"Documentos pre-procesados para {pdf_path.name}")
+                
+                if self.page_cache is not None:
+                    self.page_cache.put(file_hash, self.page_cache_version, processed_docs)
             
-            # Pre-procesar documentos
-            processed_docs = self._preprocess_documents(documents)
-            logger.info(f"Documentos pre-procesados para {pdf_path.name}")
+            if progress_callback:
+                progress_callback("pages_parsed", len(processed_docs))
             
             # Dividir en chunks
             chunks = self.text_splitter.split_documents(processed_docs)
@@ -97,69 +190,12 @@ class PDFContentLoader:
         """
         processed_docs = []
         for doc in documents:
-            text = doc.page_content
-            
-            # Limpiar el texto
-            text = self._clean_text(text)
-            
-            # Normalizar espacios y puntuación
-            text = self._normalize_text(text)
-            
-            # Detectar y preservar estructuras importantes
-            text = self._preserve_structures(text)
-            
-            # Actualizar el contenido procesado
-            doc.page_content = text
+            # Limpieza, normalización de puntuación/comillas/guiones en una sola pasada
+            doc.page_content = normalize_page_text(doc.page_content)
             processed_docs.append(doc)
             
         return processed_docs
 
-    def _clean_text(self, text: str) -> str:
-        """Limpia el texto de caracteres y patrones no deseados."""
-        # Eliminar caracteres de control excepto saltos de línea
-        text = ''.join(char for char in text if char == '\n' or char.isprintable())
-        
-        # Eliminar múltiples espacios en blanco
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Eliminar líneas vacías múltiples
-        text = re.sub(r'\n\s*\n\s*\n', '\n\n', text)
-        
-        # Eliminar espacios al inicio y final de líneas
-        text = '\n'.join(line.strip() for line in text.splitlines())
-        
-        return text.strip()
-
-    def _normalize_text(self, text: str) -> str:
-        """Normaliza espacios, puntuación y formato del texto."""
-        # Normalizar puntuación
-        text = re.sub(r'[\s]*([.,!?;:])', r'\1', text)
-        
-        # Asegurar espacio después de puntuación
-        text = re.sub(r'([.,!?;:])([^\s])', r'\1 \2', text)
-        
-        # Normalizar guiones
-        text = re.sub(r'[\u2010-\u2015]', '-', text)
-        
-        # Normalizar comillas
-        text = re.sub(r'[\u2018\u2019]', "'", text)
-        text = re.sub(r'[\u201C\u201D]', '"', text)
-        
-        return text
-
-    def _preserve_structures(self, text: str) -> str:
-        """Detecta y preserva estructuras importantes en el texto."""
-        # Preservar listas numeradas
-        text = re.sub(r'(\d+\.\s*)(\n\s*)', r'\1', text)
-        
-        # Preservar listas con viñetas
-        text = re.sub(r'([\u2022\-*]\s*)(\n\s*)', r'\1', text)
-        
-        # Preservar títulos y encabezados
-        text = re.sub(r'([A-Z][^.!?]*:)(\n\s*)', r'\1 ', text)
-        
-        return text
-
     def _postprocess_chunks(self, chunks: List[Document], pdf_path: Path) -> List[Document]:
         """Mejora y filtra los chunks después de la división.
         
@@ -170,117 +206,55 @@ class PDFContentLoader:
         Returns:
             Lista de chunks procesados y filtrados.
         """
+        # Filtrar chunks muy cortos o sin contenido significativo
+        candidates = [
+            chunk for chunk in chunks
+            if len(chunk.page_content.strip()) >= self.min_chunk_length
+        ]
+        # Calcular métricas de calidad en lote
+        quality_scores = self.quality_scorer.score_batch(chunk.page_content for chunk in candidates)
+        file_path = str(pdf_path.resolve())
+        max_tokens = self.token_counter.max_content_tokens if self.token_counter else None
+        truncated = 0
+
         final_chunks = []
-        for chunk in chunks:
-            # Filtrar chunks muy cortos o sin contenido significativo
-            if len(chunk.page_content.strip()) < self.min_chunk_length:
-                continue
-            
-            # Calcular métricas de calidad
-            content = chunk.page_content
-            quality_score = self._calculate_chunk_quality(content)
-            
+        for chunk, quality_score in zip(candidates, quality_scores):
             if quality_score < 0.3:  # Umbral mínimo de calidad
                 continue
-                
+
+            content = chunk.page_content
             # Mejorar metadata
             chunk.metadata.update({
                 "source": pdf_path.name,
-                "file_path": str(pdf_path.resolve()),
+                "file_path": file_path,
                 "chunk_type": self._detect_chunk_type(content),
                 "content_hash": self._generate_content_hash(content),
                 "quality_score": quality_score,
                 "word_count": len(content.split()),
                 "char_count": len(content)
             })
+            if self.token_counter is not None:
+                token_count = self.token_counter.count(content)
+                chunk.metadata["token_count"] = token_count
+                if max_tokens is not None and token_count > max_tokens:
+                    truncated += 1
             
             final_chunks.append(chunk)
         
+        if truncated:
+            logger.warning(
+                f"{truncated} chunks de {pdf_path.name} superan {max_tokens} tokens "
+                f"y serán truncados por el modelo de embeddings"
+            )
         return final_chunks
 
     def _extract_important_terms(self, text: str) -> List[str]:
         """Extrae términos importantes del texto basándose en patrones y contexto."""
-        important_terms = set()
-        
-        # Patrones genéricos para identificar términos importantes
-        patterns = [
-            r'(?:importante|requisito|necesario|requiere|debe|obligatorio)[:\s]+([^.\n]+)',
-            r'(?:proceso|procedimiento|instrucciones)[:\s]+([^.\n]+)',
-            r'(?:nota|atención|consideración)[:\s]+([^.\n]+)',
-            r'(?:requisitos|documentación)[:\s]+([^.\n]+)',
-            r'(?:definición|concepto|término)[:\s]+([^.\n]+)',
-            r'(?:objetivo|meta|propósito)[:\s]+([^.\n]+)',
-            r'(?:característica|propiedad|atributo)[:\s]+([^.\n]+)',
-            r'(?:clasificación|categoría|tipo)[:\s]+([^.\n]+)'
-        ]
-        
-        # Buscar términos usando patrones
-        for pattern in patterns:
-            matches = re.finditer(pattern, text.lower())
-            for match in matches:
-                term = match.group(1).strip()
-                if len(term.split()) <= 4:  # Limitar a frases de hasta 4 palabras
-                    important_terms.add(term)
-        
-        # Extraer términos de listas numeradas o con viñetas
-        list_items = re.findall(r'(?:^|\n)[•\-\*]\s*([^.\n]+)', text)
-        important_terms.update(item.strip() for item in list_items)
-        
-        # Extraer términos después de dos puntos
-        colon_terms = re.findall(r':\s*([^.\n]+)', text)
-        important_terms.update(term.strip() for term in colon_terms if len(term.split()) <= 4)
-        
-        # Extraer términos en negrita o cursiva si están disponibles en el PDF
-        emphasis_terms = re.findall(r'\*\*([^*]+)\*\*|\*([^*]+)\*', text)
-        for term in emphasis_terms:
-            if isinstance(term, tuple):
-                term = term[0] or term[1]
-            if term and len(term.split()) <= 4:
-                important_terms.add(term.strip())
-        
-        return list(important_terms)
+        return list(self.quality_scorer.extract_important_terms(text))
 
     def _calculate_chunk_quality(self, content: str) -> float:
         """Calcula la calidad de un chunk basándose en varios factores."""
-        score = 1.0
-        
-        # Penalización por chunks muy cortos
-        if len(content) < 50:
-            score *= 0.7
-        
-        # Penalización por densidad de palabras baja
-        words = content.split()
-        if len(words) < 10:
-            score *= 0.8
-        
-        # Penalización por alta proporción de caracteres especiales
-        special_chars = len(re.findall(r'[^\w\s]', content))
-        if special_chars / len(content) > 0.3:
-            score *= 0.8
-        
-        # Bonus por estructura gramatical correcta
-        if content[0].isupper() and content[-1] in '.!?':
-            score *= 1.1
-        
-        # Bonus por términos importantes
-        important_terms = self._extract_important_terms(content)
-        if important_terms:
-            score *= (1 + len(important_terms) * 0.1)
-        
-        # Bonus por estructura de lista o numeración
-        if re.search(r'(?:^|\n)[•\-\*]|\d+\.', content):
-            score *= 1.2
-        
-        # Bonus por presencia de definiciones o conceptos
-        if re.search(r'(?:es|son|se define|se refiere)', content.lower()):
-            score *= 1.1
-        
-        # Bonus por presencia de ejemplos
-        if re.search(r'(?:por ejemplo|ejemplo|como|tales como)', content.lower()):
-            score *= 1.1
-        
-        # Asegurar que el score no exceda 1.0
-        return min(score, 1.0)
+        return self.quality_scorer.score(content)
 
     def _detect_chunk_type(self, content: str) -> str:
         """Detecta el tipo de contenido del chunk."""
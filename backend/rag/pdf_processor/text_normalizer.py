@@ -0,0 +1,59 @@
+"""Normalización compilada del texto de cada página de un PDF.
+
+Equivale exactamente a la antigua secuencia ``_clean_text`` → ``_normalize_text`` →
+``_preserve_structures`` de PDFContentLoader:
+
+- Los caracteres no imprimibles se eliminan y los saltos de línea pasan a espacio.
+  Tras colapsar ``\\s+`` el texto queda en una sola línea, por lo que las reglas que
+  dependían de ``\\n`` (líneas vacías, listas, encabezados) nunca aplicaban y se omiten.
+- Guiones y comillas tipográficas se normalizan en la misma tabla de traducción;
+  ninguno es espacio ni signo de puntuación, así que el orden no altera el resultado.
+- Se colapsan los espacios y se quitan los previos a la puntuación con operaciones
+  de cadena, y una única regex compilada asegura el espacio tras la puntuación.
+"""
+import re
+
+
+class _NormalizationTable(dict):
+    """Tabla para ``str.translate`` que resuelve (y memoriza) cada carácter bajo demanda.
+
+    Unicode tiene demasiados caracteres no imprimibles para precalcularlos todos, así
+    que la primera vez que aparece un carácter se decide si se conserva o se elimina.
+    """
+
+    def __missing__(self, code: int):
+        value = code if chr(code).isprintable() else None
+        self[code] = value
+        return value
+
+
+_TRANSLATION_TABLE = _NormalizationTable({
+    ord("\n"): " ",
+    **{code: "-" for code in range(0x2010, 0x2016)},
+    0x2018: "'",
+    0x2019: "'",
+    0x201C: '"',
+    0x201D: '"',
+})
+
+_PUNCTUATION = ".,!?;:"
+_SPACE_AFTER_PUNCT_RE = re.compile(r"([.,!?;:])([^\s])")
+
+
+def normalize_page_text(text: str) -> str:
+    """Limpia y normaliza el texto de una página.
+
+    Args:
+        text: Texto extraído de la página.
+
+    Returns:
+        Texto normalizado en una sola línea.
+    """
+    text = text.translate(_TRANSLATION_TABLE)
+    # Tras la traducción el único espacio en blanco posible es " ": split/join colapsa y recorta
+    text = " ".join(text.split())
+    # Con espacios simples, quitar el espacio previo a cada signo no depende del orden
+    for mark in _PUNCTUATION:
+        if " " + mark in text:
+            text = text.replace(" " + mark, mark)
+    return _SPACE_AFTER_PUNCT_RE.sub(r"\1 \2", text)
@@ -0,0 +1,75 @@
+"""Conteo de tokens con el tokenizer del modelo de embeddings."""
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """Cuenta tokens con el tokenizer del modelo y memoiza el resultado por segmento.
+
+    RecursiveCharacterTextSplitter mide repetidamente los mismos fragmentos (al
+    dividir recursivamente y al volver a unirlos), por lo que cada texto solo se
+    tokeniza la primera vez. El tokenizer se obtiene bajo demanda.
+    """
+
+    def __init__(
+        self,
+        tokenizer_provider: Callable[[], Any],
+        max_seq_length_provider: Optional[Callable[[], int]] = None,
+        cache_size: int = 65536
+    ):
+        """Inicializa el contador.
+
+        Args:
+            tokenizer_provider: Función que devuelve el tokenizer (Hugging Face) del modelo.
+            max_seq_length_provider: Función que devuelve la longitud máxima de secuencia
+                del modelo (incluye los tokens especiales).
+            cache_size: Número máximo de segmentos memoizados.
+        """
+        self._tokenizer_provider = tokenizer_provider
+        self._max_seq_length_provider = max_seq_length_provider
+        self._tokenizer = None
+        self.count = lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def tokenizer(self) -> Any:
+        if self._tokenizer is None:
+            self._tokenizer = self._tokenizer_provider()
+        return self._tokenizer
+
+    @property
+    def max_content_tokens(self) -> Optional[int]:
+        """Tokens de contenido que caben en una secuencia sin truncar, o None si no se conoce."""
+        if self._max_seq_length_provider is None:
+            return None
+        return self._max_seq_length_provider() - self.tokenizer.num_special_tokens_to_add(pair=False)
+
+    def _count(self, text: str) -> int:
+        return len(self.tokenizer.encode(text, add_special_tokens=False, verbose=False))
+
+    def cache_info(self):
+        """Estadísticas de la memoización (hits, misses, tamaño)."""
+        return self.count.cache_info()
+
+    def clear_cache(self) -> None:
+        self.count.cache_clear()
+
+
+def token_length_histogram(token_counts: Iterable[int], bucket_size: int = 32) -> Dict[str, int]:
+    """Agrupa longitudes en tokens en intervalos de tamaño fijo.
+
+    Args:
+        token_counts: Longitud en tokens de cada chunk.
+        bucket_size: Amplitud de cada intervalo.
+
+    Returns:
+        Diccionario ordenado {"0-31": n, "32-63": n, ...} con los intervalos no vacíos.
+    """
+    buckets = Counter(count // bucket_size for count in token_counts)
+    return {
+        f"{bucket * bucket_size}-{(bucket + 1) * bucket_size - 1}": buckets[bucket]
+        for bucket in sorted(buckets)
+    }
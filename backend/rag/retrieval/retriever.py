@@ -5,19 +5,18 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import time
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from functools import wraps
 import statistics
 import asyncio
 
 from langchain_core.documents import Document
 # from langchain_community.vectorstores import Chroma # VectorStore lo abstrae
-from langchain_huggingface import HuggingFaceEmbeddings # Puede ser necesario para _initialize_embeddings si se mantiene
 # from langchain.text_splitter import RecursiveCharacterTextSplitter # Movido a PDFContentLoader
 # from langchain_community.document_loaders import PyPDFLoader # Movido a PDFContentLoader
 
 # from ...utils.pdf_utils import PDFProcessor # Eliminado, ya no se usa aquí
 # from ..embeddings.embedding_manager import EmbeddingManager # Necesario si se inicializa aquí explícitamente
+from ..embeddings.similarity import cosine_similarity
 from ..vector_store.vector_store import VectorStore
 from ...config import settings
 
@@ -240,13 +239,14 @@ class RAGRetriever:
         try:
             # Generar embedding de la consulta
             query_embedding = self.embedding_manager.embed_query(query)
+            # Similitud con cada documento sobre la caché de embeddings del vector store
+            semantic_scores = await self.vector_store.score_documents(query_embedding, docs)
             
             # Calcular scores para cada documento
             scored_docs = []
-            for doc in docs:
+            for doc, semantic_score in zip(docs, semantic_scores):
                 # 1. Score de similitud semántica
-                doc_embedding = self.embedding_manager.embed_query(doc.page_content)
-                semantic_score = float(cosine_similarity([query_embedding], [doc_embedding])[0][0])
+                semantic_score = float(semantic_score)
                 
                 # 2. Score de calidad del chunk
                 quality_score = float(doc.metadata.get('quality_score', 0.5))
@@ -306,10 +306,7 @@ class RAGRetriever:
         try:
             # Obtener embeddings
             query_embedding = self.embedding_manager.embed_query(query)
-            doc_embeddings = [
-                self.embedding_manager.embed_query(doc.page_content)
-                for doc in docs
-            ]
+            doc_embeddings = await self.vector_store.get_document_embeddings(docs)
 
             # Inicializar selección MMR
             selected_indices = []
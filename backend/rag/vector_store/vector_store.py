@@ -3,17 +3,16 @@ import logging
 from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import time
 from datetime import datetime
 import asyncio
+import hashlib
 from functools import lru_cache
-import redis
-from fastapi import HTTPException
 import uuid
 
 from langchain_core.documents import Document
 from langchain_community.vectorstores import Chroma
+from ..embeddings.quantization import QuantizedEmbeddingCache, normalize_rows
 from ...config import settings
 
 logger = logging.getLogger(__name__)
@@ -28,7 +27,9 @@ class VectorStore:
         distance_strategy: str = "cosine",
         cache_enabled: bool = True,
         cache_ttl: int = 3600,
-        batch_size: int = 100
+        batch_size: int = 100,
+        embedding_cache_precision: Optional[str] = None,
+        embedding_cache_max_entries: Optional[int] = None
     ):
         """Inicializa el almacenamiento vectorial.
         
@@ -39,6 +40,10 @@ class VectorStore:
             cache_enabled: Si habilitar caché.
             cache_ttl: Tiempo de vida del caché en segundos.
             batch_size: Tamaño del lote para operaciones por lotes.
+            embedding_cache_precision: Precisión de la caché de embeddings de documentos
+                (float32, float16 o int8; por defecto settings.embedding_cache_precision).
+            embedding_cache_max_entries: Máximo de embeddings en la caché
+                (por defecto settings.embedding_cache_max_entries).
         """
         self.persist_directory = Path(persist_directory)
         self.embedding_function = embedding_function
@@ -46,13 +51,23 @@ class VectorStore:
         self.cache_enabled = cache_enabled
         self.cache_ttl = cache_ttl
         self.batch_size = batch_size
+        # Embeddings (por content_hash) de los candidatos de MMR y reranking recientes, para
+        # no volver a leerlos de Chroma; se llena bajo demanda y está acotada por max_entries
+        self.embedding_cache = QuantizedEmbeddingCache(
+            precision=embedding_cache_precision or settings.embedding_cache_precision,
+            max_entries=embedding_cache_max_entries or settings.embedding_cache_max_entries
+        )
         
         # Inicializar Redis con manejo de errores mejorado
         self._query_cache = {}  # Caché en memoria como alternativa
         self.redis_client = None
+        self._redis_errors: Tuple[type, ...] = ()
         
         if settings.redis_url:
             try:
+                # Import diferido: redis solo se carga si está configurado
+                import redis
+                self._redis_errors = (redis.RedisError,)
                 self.redis_client = redis.from_url(
                     settings.redis_url.get_secret_value(),
                     socket_timeout=1.0,  # Timeout corto para evitar bloqueos
@@ -68,7 +83,8 @@ class VectorStore:
         self._initialize_store()
         logger.info(
             f"VectorStore inicializado en {persist_directory} "
-            f"con strategy={distance_strategy}, cache={'enabled' if cache_enabled else 'disabled'}"
+            f"con strategy={distance_strategy}, cache={'enabled' if cache_enabled else 'disabled'}, "
+            f"embedding_cache={self.embedding_cache.precision.value}"
         )
 
     def _initialize_store(self) -> None:
@@ -101,30 +117,12 @@ class VectorStore:
             except Exception as e:
                 logger.warning(f"No se pudo eliminar dummy: {e}")
             
-            # Verificar si la colección está vacía
+            # Verificar si la colección está vacía. No se inserta un documento de
+            # inicialización: exigiría cargar el modelo de embeddings en el arranque y
+            # las búsquedas ya devuelven [] con la colección vacía.
             count = self.store._collection.count()
             if count == 0:
                 logger.info("Colección vacía, se creará al añadir documentos")
-                
-                # Opcionalmente añadir un documento de inicialización para que la colección exista
-                # y se puedan hacer búsquedas sin errores
-                try:
-                    dummy_text = "Documento de inicialización del sistema"
-                    dummy_embedding = None
-                    if hasattr(self.embedding_function, 'embed_query'):
-                        dummy_embedding = self.embedding_function.embed_query(dummy_text)
-                    else:
-                        dummy_embedding = self.embedding_function.encode([dummy_text])[0].tolist()
-                    
-                    self.store._collection.add(
-                        embeddings=[dummy_embedding],
-                        documents=[dummy_text],
-                        metadatas=[{"source": "system", "is_dummy": True}],
-                        ids=["system_dummy_doc"]
-                    )
-                    logger.info("Documento de inicialización añadido a la colección")
-                except Exception as e:
-                    logger.warning(f"No se pudo añadir documento de inicialización: {e}")
             else:
                 logger.info(f"Colección existente con {count} documentos")
                 
@@ -132,49 +130,154 @@ class VectorStore:
             logger.error(f"Error inicializando vector store: {str(e)}", exc_info=True)
             raise
 
-    async def add_documents(self, documents: List[Document], embeddings: list = None) -> None:
-        """Añade documentos al almacenamiento de forma optimizada, permitiendo pasar embeddings explícitos."""
+    async def add_documents(
+        self,
+        documents: List[Document],
+        embeddings: list = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        """Añade documentos al almacenamiento de forma optimizada, permitiendo pasar embeddings e IDs explícitos.
+
+        Las escrituras en Chroma se ejecutan en un hilo para no bloquear el event loop
+        (y poder solaparlas con la generación de embeddings durante la ingesta).
+
+        Returns:
+            Lista de IDs efectivamente añadidos a la colección.
+        """
         if not documents:
-            return
+            return []
+        added_ids: List[str] = []
         try:
             # Procesar en lotes para optimizar memoria
             for i in range(0, len(documents), self.batch_size):
                 batch = documents[i:i + self.batch_size]
-                processed_batch = []
-                for doc in batch:
-                    try:
-                        content_hash = doc.metadata.get('content_hash')
-                        if content_hash:
-                            try:
-                                await self.delete_documents(filter={"content_hash": content_hash})
-                            except Exception as delete_err:
-                                logger.error(f"Error deleting document with hash {content_hash}: {delete_err}", exc_info=True)
-                        processed_batch.append(doc)
-                    except Exception as doc_process_err:
-                        logger.error(f"Error processing document in batch {i//self.batch_size + 1}: {doc_process_err}", exc_info=True)
-                        continue
-                if processed_batch:
-                    texts = [doc.page_content for doc in processed_batch]
-                    metadatas = [doc.metadata for doc in processed_batch]
-                    ids = [doc.metadata.get('id') or f"{doc.metadata.get('source','unknown')}_{hash(doc.page_content)}" for doc in processed_batch]
-                    ids = [str(uuid.uuid4()) if id is None else str(id) for id in ids]
-                    try:
-                        add_kwargs = dict(documents=texts, metadatas=metadatas, ids=ids)
-                        if embeddings is not None:
-                            # Si se pasan embeddings, usar solo el slice correspondiente al batch
-                            batch_embeddings = embeddings[i:i + self.batch_size]
-                            add_kwargs['embeddings'] = batch_embeddings
-                        self.store._collection.add(**add_kwargs)
-                        logger.debug(f"Successfully added {len(processed_batch)} documents to Chroma collection for batch {i//self.batch_size + 1}.")
-                    except Exception as add_err:
-                        logger.error(f"Error adding documents to Chroma collection for batch {i//self.batch_size + 1}: {add_err}", exc_info=True)
+                batch_ids = ids[i:i + self.batch_size] if ids is not None else None
+                batch_embeddings = embeddings[i:i + self.batch_size] if embeddings is not None else None
+                try:
+                    added_ids.extend(
+                        await asyncio.to_thread(self._write_batch, batch, batch_ids, batch_embeddings)
+                    )
+                    logger.debug(f"Successfully added {len(batch)} documents to Chroma collection for batch {i//self.batch_size + 1}.")
+                except Exception as add_err:
+                    logger.error(f"Error adding documents to Chroma collection for batch {i//self.batch_size + 1}: {add_err}", exc_info=True)
             await self._invalidate_cache()
             logger.info(f"Ingestion process completed for {len(documents)} documents. Added to vector store.")
-            return None
+            return added_ids
         except Exception as e:
             logger.error(f"Error general añadiendo documentos al vector store: {str(e)}", exc_info=True)
             raise
 
+    def _write_batch(
+        self,
+        batch: List[Document],
+        batch_ids: Optional[List[str]],
+        batch_embeddings: Optional[list]
+    ) -> List[str]:
+        """Escribe un lote en Chroma (upsert por ID).
+
+        Los IDs son deterministas (fuente + content_hash): reescribir un chunk de la misma
+        fuente lo reemplaza, y el mismo contenido en otra fuente es un documento distinto,
+        así que el manifiesto de cada archivo sigue reflejando lo que hay en la colección.
+        """
+        doc_ids = [
+            (batch_ids[j] if batch_ids is not None else None)
+            or doc.metadata.get('id') or f"{doc.metadata.get('source','unknown')}_{self._embedding_cache_key(doc)}"
+            for j, doc in enumerate(batch)
+        ]
+        doc_ids = [str(uuid.uuid4()) if id is None else str(id) for id in doc_ids]
+        add_kwargs = dict(
+            documents=[doc.page_content for doc in batch],
+            metadatas=[doc.metadata for doc in batch],
+            ids=doc_ids
+        )
+        if batch_embeddings is not None:
+            add_kwargs['embeddings'] = batch_embeddings
+        # La caché de embeddings no se llena aquí: solo guarda candidatos de reranking
+        # (ver _ensure_cached_embeddings), no una segunda copia de toda la colección
+        self.store._collection.upsert(**add_kwargs)
+        return doc_ids
+
+    @staticmethod
+    def _embedding_cache_key(doc: Document) -> str:
+        """Clave del embedding de un documento en la caché (su content_hash)."""
+        return doc.metadata.get('content_hash') or hashlib.md5(doc.page_content.encode()).hexdigest()
+
+    def _fetch_stored_embeddings(self, content_hashes: List[str]) -> Dict[str, List[float]]:
+        """Embeddings guardados en Chroma para los content_hash indicados."""
+        result = self.store._collection.get(
+            where={"content_hash": {"$in": content_hashes}},
+            include=["embeddings", "metadatas"]
+        )
+        return {
+            meta['content_hash']: embedding
+            for meta, embedding in zip(result.get("metadatas") or [], result.get("embeddings") or [])
+            if meta and meta.get('content_hash') and embedding is not None
+        }
+
+    async def _ensure_cached_embeddings(self, docs: List[Document]) -> List[str]:
+        """Garantiza que los embeddings de los documentos estén en la caché y devuelve sus claves.
+
+        Los que faltan se leen de Chroma en una sola consulta por content_hash; solo los
+        documentos sin embedding almacenado se vuelven a codificar.
+        """
+        keys = [self._embedding_cache_key(doc) for doc in docs]
+        missing_keys = set(self.embedding_cache.missing_keys(keys))
+        if not missing_keys:
+            return keys
+        missing = {key: doc for key, doc in zip(keys, docs) if key in missing_keys}
+        stored_hashes = [key for key, doc in missing.items() if doc.metadata.get('content_hash')]
+        if stored_hashes:
+            try:
+                stored = await asyncio.to_thread(self._fetch_stored_embeddings, stored_hashes)
+                if stored:
+                    self.embedding_cache.put_many(list(stored), list(stored.values()))
+                    for key in stored:
+                        missing.pop(key, None)
+            except Exception as e:
+                logger.warning(f"No se pudieron leer embeddings almacenados: {e}")
+        if missing:
+            texts = [doc.page_content for doc in missing.values()]
+            if hasattr(self.embedding_function, 'embed_documents'):
+                embeddings = await asyncio.to_thread(self.embedding_function.embed_documents, texts)
+            else:
+                embeddings = [await self._get_document_embedding(text) for text in texts]
+            self.embedding_cache.put_many(list(missing), embeddings)
+        return keys
+
+    async def get_document_embeddings(self, docs: List[Document]) -> np.ndarray:
+        """Embeddings normalizados (float32) de los documentos, en el mismo orden.
+
+        Se sirven desde la caché cuantizada; las filas que no se puedan obtener quedan a cero.
+        """
+        keys = await self._ensure_cached_embeddings(docs)
+        found, vectors = self.embedding_cache.get_many(keys)
+        dimension = vectors.shape[1] or self._embedding_dimension()
+        embeddings = np.zeros((len(docs), dimension), dtype=np.float32)
+        embeddings[found] = vectors
+        return embeddings
+
+    def _embedding_dimension(self) -> int:
+        """Dimensión de los embeddings del modelo (para las filas sin embedding)."""
+        dimension = getattr(self.embedding_function, "dimension", None)
+        if dimension is None:
+            dimension = len(self.embedding_function.embed_query("dimension"))
+        return int(dimension)
+
+    async def score_documents(self, query_embedding: Any, docs: List[Document]) -> np.ndarray:
+        """Similitud coseno entre la consulta y cada documento, calculada sobre la caché.
+
+        En precisión int8 se usa producto escalar entero sin descuantizar los vectores.
+        """
+        keys = await self._ensure_cached_embeddings(docs)
+        found, similarities = self.embedding_cache.similarities(query_embedding, keys)
+        scores = np.zeros(len(docs), dtype=np.float32)
+        scores[found] = similarities
+        return scores
+
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la caché de embeddings (tamaño, precisión, aciertos)."""
+        return self.embedding_cache.get_stats()
+
     async def _get_document_embedding(self, content: str) -> np.ndarray:
         """Obtiene el embedding de un documento, asegurando np.ndarray."""
         try:
@@ -367,99 +470,35 @@ class VectorStore:
                 logger.info("No hay candidatos para MMR.")
                 return []
                 
-            # Extraer documentos y obtener/verificar embeddings como np.ndarray
-            docs = []
-            scores = []
-            # Usaremos una lista temporal para recolectar embeddings asegurando que sean np.ndarray
-            temp_embeddings_list = []
-            
-            for doc, score in candidates:
-                docs.append(doc)
-                scores.append(score)
-                
-                # Intentar obtener embedding de metadatos primero
-                doc_emb = doc.metadata.get("embedding")
-                
-                if doc_emb is None:
-                    # Si no está en metadatos, calcularlo. _get_document_embedding ya devuelve np.ndarray
-                    try:
-                         doc_emb = await self._get_document_embedding(doc.page_content)
-                    except Exception as e:
-                         logger.warning(f"Error al calcular embedding para documento en MMR: {e}. Omitiendo documento.")
-                         # Si falla, omitir este documento de los candidatos MMR
-                         continue
-                
-                # Asegurarse de que doc_emb es un np.ndarray antes de añadirlo
-                if isinstance(doc_emb, list):
-                    doc_emb = np.array(doc_emb)
-                elif not isinstance(doc_emb, np.ndarray):
-                    logger.warning(f"Embedding de tipo inesperado ({type(doc_emb)}) en MMR para doc: {doc.metadata.get('source', 'N/A')}. Omitiendo documento.")
-                    continue # Omitir si no es lista ni ndarray
-                
-                temp_embeddings_list.append(doc_emb)
+            docs = [doc for doc, _ in candidates]
+            scores = [score for _, score in candidates]
 
-            # Convertir la lista de arrays a un único array 2D de NumPy
-            if not temp_embeddings_list:
-                 logger.info("No hay embeddings válidos después de la extracción/verificación en MMR.")
-                 return []
+            # Embeddings normalizados desde la caché (o Chroma) en lugar de re-generarlos
+            doc_embeddings = await self.get_document_embeddings(docs)
+            query_vector = normalize_rows(query_embedding)[0]
             
-            doc_embeddings = np.vstack(temp_embeddings_list)
-            
-            # Verificar dimensiones
-            if query_embedding.ndim == 1:
-                 query_embedding = query_embedding.reshape(1, -1)
-            if doc_embeddings.ndim == 1:
-                 doc_embeddings = doc_embeddings.reshape(1, -1)
-            
-            if query_embedding.shape[1] != doc_embeddings.shape[1]:
-                 logger.error(f"Dimensiones de embedding no coinciden en MMR: Query {query_embedding.shape}, Docs {doc_embeddings.shape}")
+            if query_vector.shape[0] != doc_embeddings.shape[1]:
+                 logger.error(f"Dimensiones de embedding no coinciden en MMR: Query {query_vector.shape}, Docs {doc_embeddings.shape}")
                  return [(docs[i], scores[i]) for i in range(min(k, len(docs)))] # Fallback a top K por similitud si hay error de dimensión
 
-            # Calcular MMR
+            # Calcular MMR: relevancia de todos los candidatos de una vez y, tras cada
+            # selección, actualizar la similitud máxima de cada candidato con los elegidos
+            relevance = doc_embeddings @ query_vector
+            max_similarity = np.full(len(docs), -np.inf, dtype=np.float32)
+            available = np.ones(len(docs), dtype=bool)
             selected_indices = []
-            remaining_indices = list(range(len(docs)))
             
             # Asegurar que k no excede el número de documentos válidos
             k = min(k, len(docs))
 
             for _ in range(k):
-                if not remaining_indices:
-                    break
-                    
-                # Calcular scores MMR
-                mmr_scores = []
-                for i_idx, doc_idx in enumerate(remaining_indices):
-                    try:
-                        # Relevancia con la consulta
-                        relevance = cosine_similarity(query_embedding, doc_embeddings[doc_idx].reshape(1, -1))[0][0]
-                        
-                        # Diversidad respecto a documentos seleccionados
-                        if selected_indices:
-                            selected_embeddings = doc_embeddings[selected_indices]
-                            similarities = cosine_similarity(doc_embeddings[doc_idx].reshape(1, -1), selected_embeddings)[0]
-                            diversity = 1 - np.max(similarities)
-                        else:
-                            diversity = 1.0
-
-                        # Combinar con lambda
-                        mmr_score = lambda_mult * relevance + (1 - lambda_mult) * diversity
-                        mmr_scores.append((doc_idx, mmr_score))
-
-                    except Exception as e:
-                        logger.warning(f"Error calculando score MMR para índice original {doc_idx}: {e}. Omitiendo.")
-                        # Si hay error, este documento no participa en la selección de esta iteración
-                        continue
-                
-                if not mmr_scores:
-                    # Si no se pudieron calcular scores para los restantes, salimos
-                    break
-
-                # Seleccionar documento con mayor score MMR de los restantes
-                # max() lanzará error si mmr_scores está vacío, manejado arriba
-                selected_original_idx = max(mmr_scores, key=lambda x: x[1])[0]
-                selected_indices.append(selected_original_idx)
-                # Eliminar el índice original de la lista de restantes
-                remaining_indices.remove(selected_original_idx)
+                diversity = 1 - max_similarity if selected_indices else np.ones(len(docs), dtype=np.float32)
+                mmr_scores = lambda_mult * relevance + (1 - lambda_mult) * diversity
+                mmr_scores[~available] = -np.inf
+                selected_idx = int(np.argmax(mmr_scores))
+                selected_indices.append(selected_idx)
+                available[selected_idx] = False
+                np.maximum(max_similarity, doc_embeddings @ doc_embeddings[selected_idx], out=max_similarity)
 
             # Devolver documentos en orden MMR con sus scores originales
             # Solo devolvemos los 'k' documentos seleccionados
@@ -528,7 +567,7 @@ class VectorStore:
                             self.redis_client.delete(key)
                             return None
                         return result
-                except redis.RedisError as e:
+                except self._redis_errors as e:
                     logger.warning(f"Error accediendo al caché Redis: {e}. Usando caché en memoria.")
                     self.redis_client = None  # Deshabilitar Redis para evitar más errores
             # Caché en memoria
@@ -561,7 +600,7 @@ class VectorStore:
                     serialized = self._serialize_documents(docs)
                     self.redis_client.setex(key, min(self.cache_ttl, 3600), serialized)  # Max 1 hora
                     return
-                except redis.RedisError as e:
+                except self._redis_errors as e:
                     logger.warning(f"Error guardando en caché Redis: {e}. Usando caché en memoria.")
                     self.redis_client = None  # Deshabilitar Redis para evitar más errores
             # Caché en memoria como fallback
@@ -639,6 +678,39 @@ class VectorStore:
             logger.error(f"Error eliminando documentos: {str(e)}")
             raise
 
+    async def delete_documents_by_ids(self, ids: List[str]) -> None:
+        """Elimina documentos por sus IDs sin consultar la colección por metadatos."""
+        if not ids:
+            return
+        try:
+            for i in range(0, len(ids), self.batch_size):
+                self.store._collection.delete(ids=ids[i:i + self.batch_size])
+            logger.info(f"Se eliminaron {len(ids)} documentos por ID")
+            await self._invalidate_cache()
+        except Exception as e:
+            logger.error(f"Error eliminando documentos por ID: {str(e)}")
+            raise
+
+    def get_embeddings(self, ids: List[str]) -> Dict[str, List[float]]:
+        """Obtiene los embeddings almacenados para los IDs indicados."""
+        if not ids:
+            return {}
+        result = self.store._collection.get(ids=ids, include=["embeddings"])
+        return {
+            doc_id: list(embedding)
+            for doc_id, embedding in zip(result.get("ids") or [], result.get("embeddings") or [])
+            if embedding is not None
+        }
+
+    def count_documents(self) -> int:
+        """Número de documentos que hay realmente en la colección."""
+        return self.store._collection.count()
+
+    def has_documents(self, filter: Dict[str, Any]) -> bool:
+        """Comprueba si existe al menos un documento que cumpla el filtro (sin traer contenidos)."""
+        result = self.store._collection.get(where=filter, limit=1, include=[])
+        return bool(result.get("ids"))
+
     async def delete_collection(self) -> None:
         """Elimina toda la colección."""
         try:
@@ -646,6 +718,7 @@ class VectorStore:
             client = self.store._client if hasattr(self.store, '_client') else self.store._collection._client
             client.delete_collection("rag_collection")
             self._initialize_store()
+            self.embedding_cache.clear()
             await self._invalidate_cache()
             logger.info("Colección eliminada y reinicializada")
         except Exception as e:
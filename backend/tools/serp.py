@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Any, Optional
 
 import asyncio # Añadido para run_in_executor
 from langchain_core.tools import BaseTool
@@ -6,7 +6,6 @@ from langchain_core.callbacks.manager import (
     CallbackManagerForToolRun,
     AsyncCallbackManagerForToolRun, # Añadido para _arun
 )
-from langchain_community.utilities.serpapi import SerpAPIWrapper
 from ..config import settings # Corregido: ..config en lugar de ..common.config
 
 
@@ -15,11 +14,13 @@ class CustomSearchTool(BaseTool):
     description: str = (
         "Useful for when you need to answer questions about current or newest events, date, ..."
     )
-    _search_instance: Optional[SerpAPIWrapper] = None
+    _search_instance: Optional[Any] = None  # SerpAPIWrapper (importado solo si hay API key)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if settings.serpapi_api_key:
+            from langchain_community.utilities.serpapi import SerpAPIWrapper
+
             self._search_instance = SerpAPIWrapper(
                 serpapi_api_key=settings.serpapi_api_key.get_secret_value(),
                 params={
@@ -1,6 +1,5 @@
-import langdetect
+import threading
 from typing import Dict, Any, Optional
-from langchain_experimental.data_anonymizer import PresidioReversibleAnonymizer
 from langchain_core.runnables import RunnableLambda
 
 from ..common.constants import ANONYMIZED_FIELDS, NLP_CONFIG
@@ -17,13 +16,23 @@ class BotAnonymizer:
         self.settings = settings if settings is not None else get_settings()
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        self._anonymizer = PresidioReversibleAnonymizer(
-            languages_config=NLP_CONFIG,
-            analyzed_fields=ANONYMIZED_FIELDS
-        )
+        # Presidio carga los modelos de spaCy al construirse: se crea en el primer uso
+        self._anonymizer = None
+        self._anonymizer_lock = threading.Lock()
 
     @property
     def anonymizer(self):
+        if self._anonymizer is None:
+            with self._anonymizer_lock:
+                if self._anonymizer is None:
+                    # Import diferido: langchain_experimental/Presidio tardan en importarse
+                    from langchain_experimental.data_anonymizer import PresidioReversibleAnonymizer
+
+                    self.logger.info("Inicializando PresidioReversibleAnonymizer")
+                    self._anonymizer = PresidioReversibleAnonymizer(
+                        languages_config=NLP_CONFIG,
+                        analyzed_fields=ANONYMIZED_FIELDS
+                    )
         return self._anonymizer
 
     @property
@@ -37,6 +46,8 @@ class BotAnonymizer:
             if not input_text:
                 return {"language": "en", **input_dict}
             
+            import langdetect
+
             language = langdetect.detect(input_text)
             if language not in self.supported_lang:
                 self.logger.warning(
@@ -4,29 +4,21 @@ from typing import Optional, Any, Dict
 from langchain_community.cache import InMemoryCache, RedisCache
 from langchain.globals import set_llm_cache
 import hashlib
-import redis
+import importlib.util
 import json
 import logging
 from datetime import datetime, timedelta
 
 from ..config import Settings, get_settings
 
-try:
-    from langchain_community.cache import GPTCache
-    from gptcache import Cache as GPTCacheType
-    from gptcache.adapter.api import init_similar_cache
-    GPTCACHE_AVAILABLE = True
-except ImportError:
-    GPTCACHE_AVAILABLE = False
-    GPTCacheType = Any
+# GPTCache es opcional: se comprueba si está instalado sin importarlo (se importa al usarlo)
+GPTCACHE_AVAILABLE = importlib.util.find_spec("gptcache") is not None
+GPTCacheType = Any
 
 CACHE_TYPE: Dict[str, Any] = {
     "in_memory": InMemoryCache,
 }
 
-if GPTCACHE_AVAILABLE:
-    CACHE_TYPE["GPTCache"] = GPTCache
-
 
 class CacheTypes(str, Enum):
     GPTCache = "gptcache"
@@ -41,6 +33,8 @@ def get_hashed_name(name: str) -> str:
 def init_gptcache(cache_obj: GPTCacheType, llm: str) -> None:
     if not GPTCACHE_AVAILABLE:
         raise ImportError("GPTCache is not available. Please install gptcache package.")
+    from gptcache.adapter.api import init_similar_cache
+
     hashed_llm = get_hashed_name(llm)
     init_similar_cache(cache_obj=cache_obj, data_dir=f"similar_cache_{hashed_llm}")
 
@@ -70,6 +64,8 @@ class ChatbotCache:
                         data_str = str(data)
                     return hashlib.sha256(data_str.encode()).hexdigest()
 
+                from langchain_community.cache import GPTCache
+
                 cache_obj = GPTCache(pre_embedding_function)
             elif self.cache_type == CacheTypes.InMemoryCache:
                 cache_obj = InMemoryCache()
@@ -78,6 +74,8 @@ class ChatbotCache:
                     self.logger.warning("RedisCache selected but REDIS_URL is not configured. Falling back to InMemoryCache.")
                     cache_obj = InMemoryCache()
                 else:
+                    import redis
+
                     try:
                         # Configurar Redis con timeout y reintentos
                         redis_client = redis.from_url(
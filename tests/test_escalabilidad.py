@@ -2,6 +2,8 @@
 Script para evaluar la escalabilidad del chatbot RAG.
 Simula usuarios concurrentes, mide latencia en consultas a la base de datos,
 monitorea recursos y realiza pruebas de estrés.
+Para ejecutarlo sin red ni descarga del modelo de embeddings, arrancar el API con
+EMBEDDING_BACKEND=hashing.
 """
 import os
 import sys
@@ -1,6 +1,8 @@
 """
 Script para evaluar la integración del chatbot RAG con otros componentes.
 Prueba la interacción entre diferentes módulos y servicios.
+Para ejecutarlo sin red ni descarga del modelo de embeddings, arrancar el API con
+EMBEDDING_BACKEND=hashing.
 """
 import time
 import json
@@ -1,7 +1,10 @@
 """
 Script para evaluar el rendimiento del chatbot RAG.
 Mide tiempos de respuesta, uso de memoria y eficiencia de las consultas.
+Las consultas se codifican con el EmbeddingManager usando el backend de hashing
+(EMBEDDING_BACKEND=hashing), así que se ejecuta sin red ni descarga del modelo.
 """
+import sys
 import time
 import psutil
 import statistics
@@ -12,6 +15,15 @@ from typing import Dict, List, Any
 PROJECT_ROOT = Path(__file__).parent.parent
 REPORT_FILE = PROJECT_ROOT / "performance_report.txt"
 
+# Agregar el directorio raíz al path para importaciones
+sys.path.append(str(PROJECT_ROOT))
+
+from backend.rag.embeddings.backends import EmbeddingBackendTypes
+from backend.rag.embeddings.embedding_manager import EmbeddingManager
+
+# Codificación real y determinista sin descargar el modelo
+EMBEDDING_MANAGER = EmbeddingManager(backend=EmbeddingBackendTypes.HASHING.value)
+
 def medir_tiempo_ejecucion(func):
     """Decorador para medir el tiempo de ejecución de una función."""
     def wrapper(*args, **kwargs):
@@ -29,12 +41,11 @@ def medir_uso_memoria():
 @medir_tiempo_ejecucion
 def ejecutar_consulta(query: str) -> Dict[str, Any]:
     """
-    Simula la ejecución de una consulta al chatbot.
-    En una implementación real, esto se conectaría al API del chatbot.
+    Codifica la consulta como lo hace el recuperador antes de buscar en el vector store.
+    Para medir el chatbot completo, usar test_integracion.py contra el API.
     """
-    # Simulación de procesamiento
-    time.sleep(0.1)  # Simular tiempo de procesamiento
-    return {"respuesta": f"Respuesta simulada para: {query}"}
+    embedding = EMBEDDING_MANAGER.embed_query(query)
+    return {"respuesta": f"Embedding de {len(embedding)} dimensiones para: {query}"}
 
 def ejecutar_pruebas_rendimiento():
     """Ejecuta una serie de pruebas de rendimiento."""